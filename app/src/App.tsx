@@ -1,5 +1,13 @@
 import { useEffect, useState } from 'react';
-import { socket, InboundEvent, OutboundEvent } from './socket';
+import {
+  socket,
+  InboundEvent,
+  OutboundEvent,
+  sessionFromUrl,
+  observingFromUrl,
+  setSessionInUrl,
+} from './socket';
+import { decodeActivity, Grid } from './activity';
 import { Col, Row } from 'react-bootstrap';
 
 import 'react-bootstrap-range-slider/dist/react-bootstrap-range-slider.css';
@@ -49,35 +57,59 @@ export default function App() {
   const [longTermDepression, setLongTermDepression] = useState<number[]>([]);
 
   // neural activity (1 area, 2d)
-  const [sensoryInput1, setSensoryInput1] = useState<number[][]>(full);
-  const [motorInput1, setMotorInput1] = useState<number[][]>(full);
+  const [sensoryInput1, setSensoryInput1] = useState<Grid>(full);
+  const [motorInput1, setMotorInput1] = useState<Grid>(full);
 
   // neural activity (1 area, 2d)
-  const [area1Potentials, setArea1Potentials] = useState<number[][]>(silence);
-  const [area2Potentials, setArea2Potentials] = useState<number[][]>(silence);
-  const [area3Potentials, setArea3Potentials] = useState<number[][]>(silence);
-  const [area4Potentials, setArea4Potentials] = useState<number[][]>(silence);
-  const [area5Potentials, setArea5Potentials] = useState<number[][]>(silence);
-  const [area6Potentials, setArea6Potentials] = useState<number[][]>(silence);
+  const [area1Potentials, setArea1Potentials] = useState<Grid>(silence);
+  const [area2Potentials, setArea2Potentials] = useState<Grid>(silence);
+  const [area3Potentials, setArea3Potentials] = useState<Grid>(silence);
+  const [area4Potentials, setArea4Potentials] = useState<Grid>(silence);
+  const [area5Potentials, setArea5Potentials] = useState<Grid>(silence);
+  const [area6Potentials, setArea6Potentials] = useState<Grid>(silence);
 
   // cell assembly overlaps (6 areas, 2d - 12x12)
-  const [area1CaOverlaps, setArea1CaOverlaps] = useState<number[][]>(silence);
-  const [area2CaOverlaps, setArea2CaOverlaps] = useState<number[][]>(silence);
-  const [area3CaOverlaps, setArea3CaOverlaps] = useState<number[][]>(silence);
-  const [area4CaOverlaps, setArea4CaOverlaps] = useState<number[][]>(silence);
-  const [area5CaOverlaps, setArea5CaOverlaps] = useState<number[][]>(silence);
-  const [area6CaOverlaps, setArea6CaOverlaps] = useState<number[][]>(silence);
+  const [area1CaOverlaps, setArea1CaOverlaps] = useState<Grid>(silence);
+  const [area2CaOverlaps, setArea2CaOverlaps] = useState<Grid>(silence);
+  const [area3CaOverlaps, setArea3CaOverlaps] = useState<Grid>(silence);
+  const [area4CaOverlaps, setArea4CaOverlaps] = useState<Grid>(silence);
+  const [area5CaOverlaps, setArea5CaOverlaps] = useState<Grid>(silence);
+  const [area6CaOverlaps, setArea6CaOverlaps] = useState<Grid>(silence);
 
   useEffect(() => {
     const onConnect = () => {
       setConnected(true);
+
+      // each simulation runs in its own server-side session
+      // (with ?observe in the URL, only watch it: for demos & teaching)
+      const sessionId = sessionFromUrl();
+      if (sessionId) {
+        socket.emit(
+          OutboundEvent.AttachSession,
+          sessionId,
+          observingFromUrl() ? 'observer' : 'controller',
+        );
+      } else {
+        socket.emit(OutboundEvent.CreateSession);
+      }
+    };
+
+    const onSession = (data: { id: string; role: string }) => {
+      setSessionInUrl(data.id);
+      if (data.role === 'observer') {
+        setInfoNotification({
+          show: true,
+          msg: 'Observing: another client controls this simulation',
+        });
+      }
     };
 
     const onDisconnect = () => {
       setConnected(false);
     };
 
-    const onNewActivity = (data: any) => {
+    const onNewActivity = (frame: ArrayBuffer) => {
+      const data = decodeActivity(frame);
       setCurrentStep(data.currentStep);
       console.log(data.config);
 
@@ -124,12 +156,15 @@ export default function App() {
       setArea5Potentials(data.potentials.area5);
       setArea6Potentials(data.potentials.area6);
 
-      setArea1CaOverlaps(data.cellAssemblyOverlaps.area1);
-      setArea2CaOverlaps(data.cellAssemblyOverlaps.area2);
-      setArea3CaOverlaps(data.cellAssemblyOverlaps.area3);
-      setArea4CaOverlaps(data.cellAssemblyOverlaps.area4);
-      setArea5CaOverlaps(data.cellAssemblyOverlaps.area5);
-      setArea6CaOverlaps(data.cellAssemblyOverlaps.area6);
+      // (left out of the frames where they did not change)
+      if (data.cellAssemblyOverlaps) {
+        setArea1CaOverlaps(data.cellAssemblyOverlaps.area1);
+        setArea2CaOverlaps(data.cellAssemblyOverlaps.area2);
+        setArea3CaOverlaps(data.cellAssemblyOverlaps.area3);
+        setArea4CaOverlaps(data.cellAssemblyOverlaps.area4);
+        setArea5CaOverlaps(data.cellAssemblyOverlaps.area5);
+        setArea6CaOverlaps(data.cellAssemblyOverlaps.area6);
+      }
     };
 
     const onErrorNotification = (data: { msg: string }) => {
@@ -150,11 +185,21 @@ export default function App() {
       }, 3000);
     };
 
+    const onInitProgress = (data: { done: number; total: number }) => {
+      // the 'info-notification' sent once the network is ready then replaces it
+      setInfoNotification({
+        show: true,
+        msg: `Initialising network: ${data.done}/${data.total} projections`,
+      });
+    };
+
     socket.on(InboundEvent.Connect, onConnect);
     socket.on(InboundEvent.Disconnect, onDisconnect);
     socket.on(InboundEvent.NewActivity, onNewActivity);
     socket.on(InboundEvent.ErrorNotification, onErrorNotification);
     socket.on(InboundEvent.InfoNotification, onInfoNotification);
+    socket.on(InboundEvent.InitProgress, onInitProgress);
+    socket.on(InboundEvent.Session, onSession);
 
     return () => {
       socket.off(InboundEvent.Connect, onConnect);
@@ -162,6 +207,8 @@ export default function App() {
       socket.off(InboundEvent.NewActivity, onNewActivity);
       socket.off(InboundEvent.ErrorNotification, onErrorNotification);
       socket.off(InboundEvent.InfoNotification, onInfoNotification);
+      socket.off(InboundEvent.InitProgress, onInitProgress);
+      socket.off(InboundEvent.Session, onSession);
     };
   }, []);
 
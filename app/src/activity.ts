@@ -0,0 +1,120 @@
+// decodes the binary 'new-activity' frames (see server/simulation/activity_encoding.py):
+// header length (uint32, little endian) | JSON header | arrays (aligned, C-ordered)
+
+export type Grid = ArrayLike<number>[];
+
+type ArraySchema = {
+  name: string;
+  dtype: 'float32' | 'float16' | 'uint8';
+  shape: number[];
+  offset: number;
+  min?: number;
+  scale?: number;
+};
+
+export type Activity = {
+  currentStep: number;
+  config: {
+    patternNumber: number;
+    learningRate: number;
+    shouldSaveNetwork: boolean;
+    networkTrainingActivated: boolean;
+    computeCaOverlaps: boolean;
+  };
+  totalActivity: number;
+  sensoryInput1: Grid;
+  motorInput1: Grid;
+  globalInhibition: Record<string, number>;
+  longTermPotentiation: Record<string, number>;
+  longTermDepression: Record<string, number>;
+  potentials: Record<string, Grid>;
+  // only in the frames where the overlaps changed (and every few frames): else, keep the last
+  cellAssemblyOverlaps?: Record<string, Grid>;
+  cellAssemblyOverlapsVersion: number;
+};
+
+const ACTIVITY_FRAME_VERSION = 1;
+
+// IEEE 754 half precision -> number
+const halfToFloat = (half: number) => {
+  const sign = half & 0x8000 ? -1 : 1;
+  const exponent = (half >> 10) & 0x1f;
+  const fraction = half & 0x03ff;
+  if (exponent === 0) {
+    return sign * 2 ** -14 * (fraction / 1024);
+  }
+  if (exponent === 0x1f) {
+    return fraction ? NaN : sign * Infinity;
+  }
+  return sign * 2 ** (exponent - 15) * (1 + fraction / 1024);
+};
+
+// the values of an array of the frame; float32 arrays are viewed in place, not copied
+const readArray = (buffer: ArrayBuffer, schema: ArraySchema) => {
+  const count = schema.shape.reduce((a, b) => a * b, 1);
+
+  if (schema.dtype === 'float32') {
+    return new Float32Array(buffer, schema.offset, count);
+  }
+
+  const values = new Float32Array(count);
+  if (schema.dtype === 'float16') {
+    const halves = new Uint16Array(buffer, schema.offset, count);
+    for (let i = 0; i < count; i++) {
+      values[i] = halfToFloat(halves[i]);
+    }
+  } else {
+    const quantised = new Uint8Array(buffer, schema.offset, count);
+    const min = schema.min ?? 0;
+    const scale = schema.scale ?? 1;
+    for (let i = 0; i < count; i++) {
+      values[i] = min + quantised[i] * scale;
+    }
+  }
+  return values;
+};
+
+// splits a (rows x cols) map, stored row after row, into its rows (views, not copies)
+const toGrid = (values: Float32Array, rows: number, cols: number, start = 0) =>
+  Array.from(Array(rows)).map((_, row) =>
+    values.subarray(start + row * cols, start + (row + 1) * cols),
+  );
+
+// one map per area: area1, area2, ...
+const byArea = <T>(values: T[]) =>
+  Object.fromEntries(values.map((value, area) => [`area${area + 1}`, value]));
+
+export const decodeActivity = (frame: ArrayBuffer): Activity => {
+  const headerLength = new DataView(frame).getUint32(0, true);
+  const header = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(frame, 4, headerLength)),
+  );
+  if (header.version !== ACTIVITY_FRAME_VERSION) {
+    throw new Error(`Unsupported activity frame version ${header.version}`);
+  }
+
+  const grids: Record<string, Grid[]> = {};
+  for (const schema of header.arrays as ArraySchema[]) {
+    const values = readArray(frame, schema);
+    const [rows, cols] = schema.shape.slice(-2);
+    const maps = schema.shape.length > 2 ? schema.shape[0] : 1;
+    grids[schema.name] = Array.from(Array(maps)).map((_, map) =>
+      toGrid(values, rows, cols, map * rows * cols),
+    );
+  }
+
+  return {
+    currentStep: header.currentStep,
+    config: header.config,
+    totalActivity: header.totalActivity,
+    sensoryInput1: grids.sensoryInput1[0],
+    motorInput1: grids.motorInput1[0],
+    globalInhibition: byArea(header.globalInhibition),
+    longTermPotentiation: byArea(header.longTermPotentiation),
+    longTermDepression: byArea(header.longTermDepression),
+    potentials: byArea(grids.potentials),
+    cellAssemblyOverlaps:
+      grids.cellAssemblyOverlaps && byArea(grids.cellAssemblyOverlaps),
+    cellAssemblyOverlapsVersion: header.cellAssemblyOverlapsVersion,
+  };
+};
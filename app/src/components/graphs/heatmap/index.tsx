@@ -1,4 +1,5 @@
 import Plot from 'react-plotly.js';
+import { Grid } from '../../../activity';
 
 export const Heatmap = ({
   activity,
@@ -6,7 +7,7 @@ export const Heatmap = ({
   height = 90,
   width = height,
 }: {
-  activity: number[][];
+  activity: Grid;
   title: string;
   width?: number;
   height?: number;
@@ -20,7 +21,8 @@ export const Heatmap = ({
   const data: Plotly.Data[] = [
     {
       type: 'heatmap',
-      z: activity,
+      // rows may be typed arrays (views of a binary activity frame)
+      z: activity as Plotly.Datum[][],
       colorscale: colourScale,
       showscale: false,
       hoverinfo: 'none',
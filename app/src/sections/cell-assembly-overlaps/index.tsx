@@ -2,6 +2,7 @@ import { Accordion, Col, Row } from 'react-bootstrap';
 
 import 'react-bootstrap-range-slider/dist/react-bootstrap-range-slider.css';
 import { Heatmap } from '../../components/graphs/heatmap';
+import { Grid } from '../../activity';
 
 export const CellAssemblyOverlaps = ({
   area1,
@@ -11,12 +12,12 @@ export const CellAssemblyOverlaps = ({
   area5,
   area6,
 }: {
-  area1: number[][];
-  area2: number[][];
-  area3: number[][];
-  area4: number[][];
-  area5: number[][];
-  area6: number[][];
+  area1: Grid;
+  area2: Grid;
+  area3: Grid;
+  area4: Grid;
+  area5: Grid;
+  area6: Grid;
 }) => {
   return (
     <Accordion
@@ -2,6 +2,7 @@ import { Accordion, Col, Row } from 'react-bootstrap';
 
 import 'react-bootstrap-range-slider/dist/react-bootstrap-range-slider.css';
 import { Heatmap } from '../../components/graphs/heatmap';
+import { Grid } from '../../activity';
 
 export const Potentials = ({
   sensoryInput1,
@@ -13,14 +14,14 @@ export const Potentials = ({
   area6,
   motorInput1,
 }: {
-  sensoryInput1: number[][];
-  area1: number[][];
-  area2: number[][];
-  area3: number[][];
-  area4: number[][];
-  area5: number[][];
-  area6: number[][];
-  motorInput1: number[][];
+  sensoryInput1: Grid;
+  area1: Grid;
+  area2: Grid;
+  area3: Grid;
+  area4: Grid;
+  area5: Grid;
+  area6: Grid;
+  motorInput1: Grid;
 }) => {
   return (
     <Accordion
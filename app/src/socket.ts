@@ -8,10 +8,35 @@ export enum InboundEvent {
   NewActivity = 'new-activity',
   ErrorNotification = 'error-notification',
   InfoNotification = 'info-notification',
+  InitProgress = 'init-progress',
+  Session = 'session',
 }
 
 export enum OutboundEvent {
+  CreateSession = 'create-session',
+  AttachSession = 'attach-session',
   InitSimulation = 'init-simulation',
   ContinueSimulation = 'continue-simulation',
   UpdateConfig = 'update-config',
 }
+
+/**
+ * The session to attach to on connection (?session=<id> in the URL), if any
+ */
+export const sessionFromUrl = (): string | null =>
+  new URLSearchParams(window.location.search).get('session');
+
+/**
+ * Whether to attach to the session as an observer (?observe in the URL)
+ */
+export const observingFromUrl = (): boolean =>
+  new URLSearchParams(window.location.search).has('observe');
+
+/**
+ * Records the session in the URL, so that a reload (or a shared link) attaches to it
+ */
+export const setSessionInUrl = (sessionId: string) => {
+  const url = new URL(window.location.href);
+  url.searchParams.set('session', sessionId);
+  window.history.replaceState(null, '', url);
+};
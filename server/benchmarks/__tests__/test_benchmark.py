@@ -0,0 +1,65 @@
+import copy
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from .. import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # small areas, few calls: only the layout of the results is checked
+        cls.results = benchmark.run_benchmarks(size=10, repeat=3, steps=5)
+
+    def test_results(self):
+        results = self.results
+        self.assertEqual(results['version'], benchmark.VERSION)
+        self.assertEqual(results['config']['size'], [10, 10])
+
+        self.assertIn('init', results['stages'])
+        for name in ('init_patchy_gauss_kern', 'Correlate_2d_cyclic', 'SharedKernelCorrelation',
+                     'train_projection_cyclic', 'compute_CApatts', 'compute_CAoverlaps',
+                     'get_current_activity'):
+            stats = results['stages'][name]
+            self.assertEqual(stats['n'], 3)
+            self.assertLessEqual(stats['p50 ms'], stats['p99 ms'])
+            self.assertGreaterEqual(stats['peak KiB'], 0)
+
+        training = results['training']
+        self.assertEqual(training['steps'], 5)
+        self.assertGreater(training['steps/s'], 0)
+        self.assertEqual(training['stages']['potentials']['count'], 5)
+        self.assertIn('learning', training['stages'])
+        self.assertNotIn('step', training['stages'])
+
+    def test_compare(self):
+        self.assertEqual(benchmark.compare(self.results, self.results), [])
+
+        baseline = copy.deepcopy(self.results)
+        baseline['stages']['Correlate_2d_cyclic']['p50 ms'] /= 2
+        regressions = benchmark.compare(self.results, baseline, tolerance=.2)
+        self.assertEqual([regression['stage'] for regression in regressions], ['Correlate_2d_cyclic'])
+        self.assertAlmostEqual(regressions[0]['ratio'], 2)
+
+        baseline['config']['size'] = [25, 25]
+        with self.assertRaises(ValueError):
+            benchmark.compare(self.results, baseline)
+
+    def test_main_saves_baseline(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            filename = os.path.join(out_dir, 'baselines', 'small.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmark.main(['--size', '10', '--repeat', '2', '--steps', '0',
+                                '--stage', 'compute_CAoverlaps', '--save', filename])
+
+            with open(filename) as f:
+                saved = json.load(f)
+            self.assertEqual(list(saved['stages']), ['compute_CAoverlaps'])
+            self.assertIsNone(saved['training'])
+
+
+if __name__ == "__main__":
+    unittest.main()
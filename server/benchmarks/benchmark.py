@@ -0,0 +1,329 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+from ..models.standardNet6Areas import StandardNet6Areas
+from ..models import correlation
+from ..simulation.activity_encoding import encode_activity
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('benchmark')
+logger.setLevel(logging.DEBUG)
+
+# Benchmarks of the hot paths of the model, stage by stage: the latency (percentiles over
+# repeated calls) and the peak memory allocated by each routine, and the steps/s (and the
+# latency of each part of a step) over a run of the automated training protocol.
+# Results can be saved as JSON baselines, and compared against one to spot regressions, e.g.
+#
+#   python3 -m server.benchmarks.benchmark --save server/benchmarks/baselines/mine.json
+#   python3 -m server.benchmarks.benchmark --baseline server/benchmarks/baselines/mine.json
+
+VERSION = 1
+
+# the scalar reference implementations are ~100x slower: they are run fewer times
+SLOW_STAGES = ('init', 'Correlate_2d_cyclic_python', 'Correlate_2d_Uni_cyclic')
+
+
+def make_model(size: int = None, seed: int = 1, sparse: bool = False) -> StandardNet6Areas:
+    """
+    A network (after main_init) with size x size cells per area (default N11 x N12), that
+    never saves itself or logs its steps
+    """
+    model = StandardNet6Areas()
+    model.seed = seed
+    model.logger.setLevel(logging.WARNING)
+    if size is not None:
+        model.N11 = model.N12 = size
+        model.N1 = size * size
+        model.NSQR1 = model.N1 * model.N1
+    model.SPARSE_SYNAPSES = sparse
+    model.net_dir = None
+    model.main_init()
+    return model
+
+
+def latencies(samples: list) -> dict:
+    """
+    Summary (in milliseconds) of a list of durations (in seconds)
+    """
+    ms = np.asarray(samples) * 1000
+    return {
+        'n': len(samples),
+        'mean ms': float(ms.mean()),
+        'p50 ms': float(np.percentile(ms, 50)),
+        'p90 ms': float(np.percentile(ms, 90)),
+        'p99 ms': float(np.percentile(ms, 99)),
+        'max ms': float(ms.max()),
+    }
+
+
+def time_calls(func, repeat: int, warmup: int = 1) -> list:
+    """
+    Duration (in seconds) of each of repeat calls to func, after warmup calls
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_memory(func) -> int:
+    """
+    Peak memory (bytes) allocated by a call to func, above what was allocated before
+    (numpy reports its buffers to tracemalloc)
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return max(peak - before, 0)
+
+
+def add_activity(model: StandardNet6Areas, rng: np.random.Generator):
+    """
+    Random rates, potentials, inputs and pattern averages, so that every routine has work to do
+    """
+    model.rates[...] = rng.random(model.rates.size)
+    model.pot[...] = rng.random(model.pot.size) * .3
+    model.avg_patts[...] = rng.random(model.avg_patts.size)
+    model.sensInput[...] = model.sensPatt[:model.N1]
+    model.motorInput[...] = model.motorPatt[:model.N1]
+    model.slrate = model.LEARN_RATE
+
+
+def stage_functions(model: StandardNet6Areas) -> dict:
+    """
+    {stage: function} of the routines benchmarked one by one, on the FF projection from
+    area 1 to area 2 where a routine works on one projection
+    """
+    origin, dest = 0, 1
+    mx, my = model.kernel_dims(origin, dest)
+    kernels = model.get_kernels(origin, dest)
+    pre = model.rates[:model.N1]
+    post_pot = model.pot[model.N1 * dest:model.N1 * (dest + 1)]
+    out = np.zeros(model.N1)
+    scratch = np.zeros(kernels.size)
+    csr = correlation.CyclicCSR(kernels, model.N11, model.N12, mx, my, model.NO_SYNAPSE)
+    hrate = .0001 * model.LEARN_RATE
+    tot_LTP, tot_LTD = np.zeros(1), np.zeros(1)
+
+    return {
+        'init_patchy_gauss_kern': lambda: model.init_patchy_gauss_kern(
+            model.N11, model.N12, mx, my, scratch, model.SIGMAX, model.SIGMAY, model.J_PROB, model.J_UPPER),
+        'Correlate_2d_cyclic': lambda: correlation.Correlate_2d_cyclic(
+            pre, kernels, model.N11, model.N12, mx, my, out),
+        'Correlate_2d_cyclic_sparse': lambda: correlation.Correlate_2d_cyclic_sparse(
+            pre, kernels, csr, out),
+        'SharedKernelCorrelation': lambda: model.Jinh_correlation(model.rates, model.linkinh),
+        'Correlate_2d_cyclic_python': lambda: correlation.Correlate_2d_cyclic_python(
+            pre, model.Jinh, model.N11, model.N12, model.NINH1, model.NINH2, out),
+        'Correlate_2d_Uni_cyclic': lambda: correlation.Correlate_2d_Uni_cyclic(
+            pre, model.Jinh, model.N11, model.N12, model.NINH1, model.NINH2, out),
+        'train_projection_cyclic': lambda: model.train_projection_cyclic(
+            pre, post_pot, kernels, model.N11, model.N12, mx, my, hrate, tot_LTP, tot_LTD),
+        'train_projection_sparse': lambda: model.train_projection_sparse(
+            pre, post_pot, kernels, csr, hrate, tot_LTP, tot_LTD),
+        'compute_CApatts': lambda: model.compute_CApatts(model.CA_THRESH),
+        'compute_CAoverlaps': model.compute_CAoverlaps,
+        'get_current_activity': model.get_current_activity,
+        'encode_activity': lambda: encode_activity(model),
+    }
+
+
+def training_cycle(model: StandardNet6Areas, steps: int) -> dict:
+    """
+    Runs the automated training protocol for so many steps (after init), timing every step
+    and every part of it (the stages of the model's profiler)
+    """
+    model.sSInp = True
+    model.sMInp = True
+    model.strainNet = True
+
+    model.profiler.reset()
+    model.profiler.enabled = True
+    step_samples = time_calls(lambda: model.step(output=False), steps, warmup=0)
+    model.profiler.enabled = False
+    stages = model.profiler.snapshot()['stages']
+    peak = peak_memory(lambda: model.step(output=False))
+
+    return {
+        'steps': steps,
+        'steps/s': steps / sum(step_samples),
+        'step': {**latencies(step_samples), 'peak KiB': peak / 1024},
+        'stages': {name: {key: value for key, value in stats.items() if key != 'histogram'}
+                   for name, stats in stages.items() if name != 'step'},
+    }
+
+
+def run_benchmarks(size: int = None, repeat: int = 50, steps: int = 200, seed: int = 1,
+                   sparse: bool = False, stages: list = None) -> dict:
+    """
+    Benchmarks the model, returning the results: the config, the latencies & peak memory of each
+    routine (stages), and those of the training cycle (training)
+
+    Keyword arguments:
+    size    -- cells per side of each area (default N11 x N12)
+    repeat  -- calls per routine (SLOW_STAGES: a tenth of it)
+    steps   -- steps of the training cycle (0: skip it)
+    seed    -- seed of the network
+    sparse  -- run the training cycle in sparse synapses mode
+    stages  -- names of the routines to benchmark (default: all)
+    """
+    model = make_model(size, seed, sparse)
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    if stages is None or 'init' in stages:
+        slow_repeat = max(1, repeat // 10)
+        results['init'] = {**latencies(time_calls(model.init, slow_repeat, warmup=0)),
+                           'peak KiB': peak_memory(model.init) / 1024}
+    else:
+        model.init()
+
+    add_activity(model, rng)
+    for name, func in stage_functions(model).items():
+        if stages is not None and name not in stages:
+            continue
+        n = max(1, repeat // 10) if name in SLOW_STAGES else repeat
+        results[name] = {**latencies(time_calls(func, n)),
+                         'peak KiB': peak_memory(func) / 1024}
+
+    training = None
+    if steps:
+        model.init()
+        training = training_cycle(model, steps)
+
+    return {
+        'version': VERSION,
+        'config': {
+            'size': [model.N11, model.N12],
+            'repeat': repeat,
+            'steps': steps,
+            'seed': seed,
+            'sparse': sparse,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'stages': results,
+        'training': training,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = .2) -> list:
+    """
+    Regressions of results against baseline: the stages whose median latency grew by more than
+    tolerance (a fraction), and the training cycle if its steps/s dropped by more than that
+    """
+    if results['config']['size'] != baseline['config']['size']:
+        raise ValueError(
+            f"The baseline was run with areas of {baseline['config']['size']} cells")
+
+    regressions = []
+
+    def check(name, current, previous):
+        if previous > 0 and current > previous * (1 + tolerance):
+            regressions.append({'stage': name, 'baseline': previous, 'current': current,
+                                'ratio': current / previous})
+
+    for name, stats in results['stages'].items():
+        if name in baseline['stages']:
+            check(name, stats['p50 ms'], baseline['stages'][name]['p50 ms'])
+
+    if results['training'] and baseline.get('training'):
+        check('training step', results['training']['step']['p50 ms'],
+              baseline['training']['step']['p50 ms'])
+        for name, stats in results['training']['stages'].items():
+            if name in baseline['training']['stages']:
+                check(name, stats['p50 ms'], baseline['training']['stages'][name]['p50 ms'])
+
+    return regressions
+
+
+def report(results: dict) -> str:
+    """
+    The results as a text table
+    """
+    lines = [f"{'stage':<62}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'peak KiB':>12}"]
+
+    def line(name, stats):
+        peak = f"{stats['peak KiB']:>12.0f}" if 'peak KiB' in stats else ''
+        lines.append(
+            f"{name:<62}{stats['p50 ms']:>10.3f}{stats['p90 ms']:>10.3f}{stats['p99 ms']:>10.3f}{peak}")
+
+    for name, stats in results['stages'].items():
+        line(name, stats)
+
+    training = results['training']
+    if training:
+        lines.append('')
+        lines.append(f"training cycle: {training['steps']} steps, {training['steps/s']:.1f} steps/s")
+        line('step', training['step'])
+        for name, stats in training['stages'].items():
+            line(f'  {name}', stats)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the StandardNet6Areas model, stage by stage')
+    parser.add_argument('--size', type=int, default=None,
+                        help='cells per side of each area (default: N11)')
+    parser.add_argument('--repeat', type=int, default=50,
+                        help='calls per routine (default: 50)')
+    parser.add_argument('--steps', type=int, default=200,
+                        help='steps of the training cycle (default: 200; 0: skip it)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='seed of the network')
+    parser.add_argument('--sparse', action='store_true',
+                        help='run the training cycle in sparse synapses mode')
+    parser.add_argument('--stage', action='append', default=None,
+                        help='only benchmark this routine (repeatable)')
+    parser.add_argument('--save', default=None,
+                        help='save the results to this JSON file (a baseline)')
+    parser.add_argument('--baseline', default=None,
+                        help='compare against this JSON baseline; exit with 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='median latency increase reported as a regression (default: .2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(size=args.size, repeat=args.repeat, steps=args.steps, seed=args.seed,
+                             sparse=args.sparse, stages=args.stage)
+    print(report(results))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            logger.warning(json.dumps({'op': 'regression', **regression}, sort_keys=False, indent=4))
+        if regressions:
+            raise SystemExit(1)
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import logging
+import unittest
+import numpy as np
+from ..batchedNet6Areas import BatchedNet6Areas
+from ..standardNet6Areas import StandardNet6Areas
+
+
+class TestBatchedNet6Areas(unittest.TestCase):
+    SEEDS = [1, 2]
+    GAINS = [800, 1200]
+
+    def setUp(self):
+        self.level = StandardNet6Areas.logger.level
+        StandardNet6Areas.logger.setLevel(logging.WARNING)
+
+        self.batch = BatchedNet6Areas(self.SEEDS)
+        self.batch.main_init()
+        self.batch.set_sliders('sgain', self.GAINS)
+        self.batch.init()
+
+    def tearDown(self):
+        StandardNet6Areas.logger.setLevel(self.level)
+
+    @staticmethod
+    def present_pattern(net, slrate):
+        net.spatno = 3
+        net.sSInp = True
+        net.sMInp = True
+        net.slrate = slrate
+
+    def test_networks_are_views_into_the_batch(self):
+        self.assertEqual(self.batch.pot.shape, (2, StandardNet6Areas.NAREAS * StandardNet6Areas.N1))
+        for b, net in enumerate(self.batch.nets):
+            for name in BatchedNet6Areas.BATCH_ARRAYS:
+                self.assertTrue(np.shares_memory(getattr(net, name), getattr(self.batch, name)[b]))
+        # different seeds: different kernels & input patterns
+        self.assertFalse(np.array_equal(self.batch.J[0], self.batch.J[1]))
+        self.assertFalse(np.array_equal(self.batch.nets[0].sensPatt, self.batch.nets[1].sensPatt))
+
+    def test_step_matches_networks_stepped_one_by_one(self):
+        nets = []
+        for seed, gain in zip(self.SEEDS, self.GAINS):
+            net = StandardNet6Areas()
+            net.seed = seed
+            net.main_init()
+            net.sgain = gain
+            net.init()
+            nets.append(net)
+
+        # only the first network learns
+        for slrate, net, batched in zip([8, 0], nets, self.batch.nets):
+            self.present_pattern(net, slrate)
+            self.present_pattern(batched, slrate)
+
+        activity, plasticity = 0.0, np.zeros(2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(40):
+                self.batch.step()
+                activity += self.batch.rates.sum()
+                plasticity += self.batch.tot_LTP.sum(axis=1) + self.batch.tot_LTD.sum(axis=1)
+                for net in nets:
+                    net.step(output=False)
+
+        for net, batched in zip(nets, self.batch.nets):
+            self.assertEqual(batched.stp, net.stp)
+            self.assertAlmostEqual(batched.total_output, net.total_output)
+            for name in ('pot', 'rates', 'inh', 'adapt', 'slowinh', 'J', 'tot_LTP', 'tot_LTD'):
+                np.testing.assert_allclose(getattr(batched, name), getattr(net, name), rtol=1e-12,
+                                           atol=1e-12, err_msg=name)
+
+        self.assertGreater(activity, 0)
+        self.assertGreater(plasticity[0], 0)
+        self.assertEqual(plasticity[1], 0)
+
+    def test_overlaps_with_current_activity(self):
+        for net in self.batch.nets:
+            net.rates[...] = np.random.rand(net.rates.size)
+            net.ca_patts[...] = np.random.rand(net.ca_patts.size) < .1
+            net.update_CApatts_float()
+
+        self.batch.compute_overlap_between_cell_assemblies_and_current_activity()
+
+        for net in self.batch.nets:
+            expected = net.ovlps.copy()
+            net.compute_overlap_between_cell_assemblies_and_current_activity()
+            np.testing.assert_allclose(expected, net.ovlps)
+
+    def test_set_sliders(self):
+        self.batch.set_sliders('sJslow', 20)
+        np.testing.assert_array_equal(self.batch.sliders('sJslow'), [20, 20])
+
+        with self.assertRaises(ValueError):
+            self.batch.set_sliders('snoise', [1, 2, 3])
+        with self.assertRaises(AttributeError):
+            self.batch.set_sliders('not_a_slider', 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
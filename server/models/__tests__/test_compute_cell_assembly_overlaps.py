@@ -18,6 +18,54 @@ class TestComputeCellAssemblyOverlaps(unittest.TestCase):
         self.assertTrue(np.allclose(net.ca_patts, start_ca_patts))
         self.assertFalse(np.allclose(net.ca_ovlps, start_ca_ovlps))
 
+    def test_matches_pairwise_overlaps(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+
+        net.compute_CAoverlaps()
+
+        # ca_ovlps[P*(P*area+i)+j]: overlap of CAs i & j in area, relative to NONES
+        for area in range(net.NAREAS):
+            for i in range(net.P):
+                for j in range(net.P):
+                    ca_i = net.ca_patts[net.N1*(net.NAREAS*i+area):net.N1*(net.NAREAS*i+area+1)]
+                    ca_j = net.ca_patts[net.N1*(net.NAREAS*j+area):net.N1*(net.NAREAS*j+area+1)]
+                    self.assertAlmostEqual(net.ca_ovlps[net.P*(net.P*area+i)+j],
+                                           np.dot(ca_i, ca_j) / float(net.NONES))
+
+    def test_only_changed_patterns(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+        net.ca_patts = np.random.randint(0, 2, net.ca_patts.size)
+        net.update_CApatts_float()
+        net.compute_CAoverlaps()
+
+        # CAs 4 & 9 change: only their rows/columns need to be re-computed
+        net.pattern_view(net.ca_patts)[[3, 8]] = np.random.randint(0, 2, (2, net.NAREAS, net.N1))
+        net.update_CApatts_float([3, 8])
+        net.compute_CAoverlaps([3, 8])
+        ca_ovlps = net.ca_ovlps.copy()
+
+        net.compute_CAoverlaps()
+        self.assertTrue(np.allclose(ca_ovlps, net.ca_ovlps))
+
+    def test_version(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+        net.get_current_activity()
+        version = net.ca_ovlps_version
+
+        net.compute_CAoverlaps([2])
+
+        # a new version, and the nested list is re-built from the new overlaps
+        self.assertEqual(net.ca_ovlps_version, version + 1)
+        self.assertIsNone(net.ca_ovlps_list)
+        self.assertTrue(np.allclose(net.get_current_activity()['cellAssemblyOverlaps']['area1'],
+                                    net.ca_ovlps.reshape(net.NAREAS, net.P, net.P)[0]))
+
 
 if __name__ == "__main__":
     unittest.main()
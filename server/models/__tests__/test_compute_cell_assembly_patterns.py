@@ -40,6 +40,48 @@ class TestComputeCellAssemblyPatterns(unittest.TestCase):
         self.assertTrue(np.allclose(net.avg_patts, start_avg_patts))
         self.assertTrue(np.allclose(net.ca_patts, start_ca_patts))
 
+    def test_thresholds_each_pattern_and_area(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+        net.avg_patts[:net.N1] = 0.001  # pattern 1, area 1: no strongly responsive cell
+        start_ca_patts = net.ca_patts.copy()
+
+        net.compute_CApatts(net.CA_THRESH)
+
+        self.assertTrue(np.array_equal(net.ca_patts[:net.N1], start_ca_patts[:net.N1]))
+        for i in range(net.P):
+            for area in range(net.NAREAS):
+                if i == 0 and area == 0:
+                    continue
+                s = net.N1*(net.NAREAS*i+area)
+                avg = net.avg_patts[s:s+net.N1]
+                self.assertTrue(np.array_equal(net.ca_patts[s:s+net.N1],
+                                               avg > net.CA_THRESH * avg.max()))
+
+    def test_only_changed_patterns(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+        net.ca_patts = np.zeros(net.ca_patts.size, dtype=np.int32)
+        net.avg_patts_changed[:] = False
+        net.avg_patts_changed[[2, 7]] = True
+
+        net.compute_changed_CAs()
+
+        ca_patts = net.pattern_view(net.ca_patts)
+        self.assertTrue(np.any(ca_patts[2]) and np.any(ca_patts[7]))
+        self.assertFalse(np.any(np.delete(ca_patts, [2, 7], axis=0)))
+        self.assertFalse(np.any(net.avg_patts_changed))
+
+        # the float copy of the CAs follows the changed ones
+        self.assertTrue(np.array_equal(net.ca_patts_float[:, [2, 7]],
+                                       ca_patts[[2, 7]].transpose(1, 0, 2)))
+
+        # same CAs as re-computing them all
+        net.compute_CApatts(net.CA_THRESH)
+        self.assertTrue(np.array_equal(net.pattern_view(net.ca_patts)[[2, 7]], ca_patts[[2, 7]]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,25 +3,60 @@ from ..standardNet6Areas import StandardNet6Areas
 import numpy as np
 from .. import util
 
-# TODO
-
 
 class TestComputeNewMembranePotentials(unittest.TestCase):
     def test_compute_new_membrane_potentials(self):
         net = StandardNet6Areas()
         net.main_init()
         net.init()
-
-        # pot, inh, diluted
-        # linkffb
-        # tempffb
-        # clampSMIn
-        # sensInput, motorInput
-        # J - unchaged
-        # slowinh,linkinh,linkrec
+        net.INIT_RANDOM_ACTIVITY()
+        start_pot = net.pot.copy()
+        start_inh = net.inh.copy()
+        start_J = net.J.copy()
 
         net.compute_new_membrane_potentials()
 
+        self.assertFalse(np.allclose(net.pot, start_pot))
+        # the inhib. cells integrate their input (linkinh)
+        np.testing.assert_array_equal(net.inh, util.leaky_integrate_Vector(
+            net.TAU2, start_inh, net.linkinh, net.STEPSIZE))
+        np.testing.assert_array_equal(net.J, start_J)  # J - unchanged
+
+    def test_integration_matches_scalar_version(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+        for vector in (net.linkffb, net.linkrec, net.linkinh, net.clampSMIn):
+            vector[...] = np.random.rand(vector.size)
+        net.diluted[::7] = 1
+        net.sI0 = 3
+        pot, inh, slowinh = net.pot.copy(), net.inh.copy(), net.slowinh.copy()
+
+        stream = net.rng['membrane noise']
+        state = stream.bit_generator.state
+        net.integrate_membrane_potentials()
+
+        # the per-cell version (as in the C code), with the same noise
+        stream.bit_generator.state = state
+        noise = stream.random(net.NAREAS * net.N1)
+        for area in range(net.NAREAS):
+            cells = range(net.N1 * area, net.N1 * (area + 1))
+            for i in cells:
+                inh[i] = util.leaky_integrate(
+                    net.TAU2, inh[i], net.linkinh[i], net.STEPSIZE)
+            slowinh[area] = util.leaky_integrate(
+                net.TAUSLOW, slowinh[area], util.Sum(net.rates[cells.start:cells.stop]), net.STEPSIZE)
+        for area in range(net.NAREAS):
+            for i in range(net.N1 * area, net.N1 * (area + 1)):
+                pot[i] = util.leaky_integrate(net.TAU1, pot[i], .01 * (net.sI0 + net.clampSMIn[i] + net.sJffb * net.linkffb[i] +
+                                                                       net.sJrec * net.linkrec[i] - net.sJinh * net.FUNCI(inh[i]) -
+                                                                       net.sJslow * slowinh[area] - 1000 * net.diluted[i] +
+                                                                       net.snoise * net.noise_fac * (noise[i] - .5)), net.STEPSIZE)
+
+        np.testing.assert_array_equal(net.inh, inh)
+        np.testing.assert_array_equal(net.slowinh, slowinh)
+        np.testing.assert_array_equal(net.pot, pot)
+
 
 if __name__ == "__main__":
     unittest.main()
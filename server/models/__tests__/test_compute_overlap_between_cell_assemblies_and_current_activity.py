@@ -21,6 +21,33 @@ class TestComputeOverlapBetweenCellAssembliesAndCurrentActivity(unittest.TestCas
         self.assertTrue(np.allclose(net.ca_patts, start_ca_patts))
         self.assertFalse(np.allclose(net.ovlps, start_ovlps))
 
+    def test_matches_dot_products(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+
+        net.compute_overlap_between_cell_assemblies_and_current_activity()
+
+        # ovlps[area*P+i]: overlap of the activity of area with CA i
+        for area in range(net.NAREAS):
+            rates = net.rates[net.N1*area:net.N1*(area+1)]
+            for i in range(net.P):
+                ca = net.ca_patts[net.N1*(net.NAREAS*i+area):net.N1*(net.NAREAS*i+area+1)]
+                self.assertAlmostEqual(net.ovlps[area*net.P+i], np.dot(rates, ca))
+
+    def test_many_patterns(self):
+        net = StandardNet6Areas()
+        net.P = 30
+        net.main_init()
+        net.INIT_RANDOM_ACTIVITY()
+
+        net.compute_overlap_between_cell_assemblies_and_current_activity()
+
+        ca_patts = net.pattern_view(net.ca_patts)
+        rates = net.rates.reshape(net.NAREAS, net.N1)
+        self.assertTrue(np.allclose(net.ovlps.reshape(net.NAREAS, net.P),
+                                    np.einsum('pan,an->ap', ca_patts, rates)))
+
 
 if __name__ == "__main__":
     unittest.main()
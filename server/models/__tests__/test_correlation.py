@@ -43,6 +43,67 @@ class TestCorrelate2dCyclicPython(unittest.TestCase):
         self.assertTrue(np.all(result != 0))
 
 
+class TestCorrelate2dCyclic(unittest.TestCase):
+    def test_shared_kernel_matches_python(self):
+        """
+        With the same kernel copied to every cell, the per-cell correlation is the same as
+        Correlate_2d_cyclic_python (which applies the first kernel to all cells)
+        """
+        in_vector = np.array(
+            [0.2, 0.1, 0.4, 0.04, 0.8, 0.61, 0.37, 0.22, 0.74])
+        kern = np.tile(np.array([0.8, 0.1, 0.22, 0.51]), 9)
+        out_vector = np.zeros(9)
+
+        result = correlation.Correlate_2d_cyclic(
+            in_vector, kern, 3, 3, 2, 2, out_vector)
+
+        expected_output = np.array(
+            [0.5868, 0.6071, 0.4946, 0.3056, 1.1268, 0.8435, 0.413, 0.476, 0.819])
+        np.testing.assert_allclose(result, expected_output)
+        np.testing.assert_allclose(out_vector, expected_output)
+
+    def test_per_cell_kernels_match_original_C(self):
+        """
+        Uses the kinds of data structures and variables passed to the func during the real step() during
+        simulations: 625 cells, each with its own 19*19 kernel
+        """
+        in_vector = np.random.rand(625)
+        kern = np.random.rand(625 * 361)
+        out_vector = np.zeros(625)
+
+        result = correlation.Correlate_2d_cyclic(
+            in_vector, kern, 25, 25, 19, 19, out_vector)
+
+        expected = correlation.Correlate_2d_cyclic_original_C(
+            in_vector, kern.reshape(625, 361), 25, 25, 19, 19, np.zeros(625))
+        np.testing.assert_allclose(result, expected)
+
+    def test_gather_indices_are_cached(self):
+        indices = correlation.cyclic_gather_indices(25, 25, 19, 19)
+
+        self.assertEqual(indices.shape, (625, 361))
+        self.assertIs(indices, correlation.cyclic_gather_indices(25, 25, 19, 19))
+        # kernel centre of each cell is the cell itself
+        np.testing.assert_array_equal(indices[:, 180], np.arange(625))
+
+
+class TestCorrelate2dCyclicSparse(unittest.TestCase):
+    def test_matches_dense_correlation(self):
+        in_vector = np.random.rand(625)
+        # most potential synapses do not exist (NO_SYNAPSE == 0.0)
+        kern = np.random.rand(625 * 361) * (np.random.rand(625 * 361) < 0.2)
+
+        csr = correlation.CyclicCSR(kern, 25, 25, 19, 19)
+        result = correlation.Correlate_2d_cyclic_sparse(
+            in_vector, kern, csr, np.zeros(625))
+
+        self.assertEqual(csr.nnz, np.count_nonzero(kern))
+        self.assertEqual(csr.indptr[-1], csr.nnz)
+        expected = correlation.Correlate_2d_cyclic(
+            in_vector, kern, 25, 25, 19, 19, np.zeros(625))
+        np.testing.assert_allclose(result, expected)
+
+
 class TestCorrelate2dUniCyclic(unittest.TestCase):
     def test_small_vectors(self):
         input_matrix = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9])
@@ -72,5 +133,64 @@ class TestCorrelate2dUniCyclic(unittest.TestCase):
         self.assertTrue(np.all(result != 0))
 
 
+class TestSharedKernelCorrelation(unittest.TestCase):
+    def reference(self, in_vector, kern, kernel_width, kernel_height, areas):
+        """
+        Correlate_2d_Uni_cyclic applied to each area, one at a time
+        """
+        out_vector = np.zeros(625 * areas)
+        for area in range(areas):
+            cells = slice(625 * area, 625 * (area + 1))
+            correlation.Correlate_2d_Uni_cyclic(
+                in_vector[cells], kern, 25, 25, kernel_width, kernel_height, out_vector[cells])
+        return out_vector
+
+    def gaussian_kernel(self):
+        """
+        The inhibitory kernel of the model: 5*5 Gaussian, in a vector of N1 elements
+        """
+        x = np.arange(5) - 2
+        kern = np.zeros(625)
+        kern[:25] = (0.295 * np.exp(-(x[:, None] ** 2 + x[None, :] ** 2) / 4.5)).ravel()
+        return kern
+
+    def test_all_methods_match_uni_cyclic(self):
+        in_vector = np.random.rand(625 * 6)
+        kern = self.gaussian_kernel()
+        expected = self.reference(in_vector, kern, 5, 5, 6)
+
+        for method in ('separable', 'shifts', 'fft'):
+            with self.subTest(method=method):
+                correlate = correlation.SharedKernelCorrelation(kern, 25, 25, 5, 5, method)
+                out_vector = np.zeros(625 * 6)
+                result = correlate(in_vector, out_vector)
+
+                self.assertIs(result, out_vector)
+                np.testing.assert_allclose(out_vector, expected, rtol=1e-12)
+
+    def test_even_and_non_separable_kernels(self):
+        in_vector = np.random.rand(625 * 2)
+        for kernel_width, kernel_height in ((4, 4), (9, 9), (3, 6)):
+            kern = np.random.rand(kernel_width * kernel_height)
+            expected = self.reference(in_vector, kern, kernel_width, kernel_height, 2)
+
+            for method in ('shifts', 'fft'):
+                with self.subTest(kernel=(kernel_width, kernel_height), method=method):
+                    correlate = correlation.SharedKernelCorrelation(
+                        kern, 25, 25, kernel_width, kernel_height, method)
+                    np.testing.assert_allclose(
+                        correlate(in_vector, np.zeros(625 * 2)), expected, rtol=1e-12)
+
+    def test_method_selection(self):
+        self.assertEqual(correlation.SharedKernelCorrelation(
+            self.gaussian_kernel(), 25, 25, 5, 5).method, 'separable')
+        self.assertEqual(correlation.SharedKernelCorrelation(
+            np.random.rand(9), 25, 25, 3, 3).method, 'shifts')
+        self.assertEqual(correlation.SharedKernelCorrelation(
+            np.random.rand(81), 25, 25, 9, 9).method, 'fft')
+        with self.assertRaises(ValueError):
+            correlation.SharedKernelCorrelation(np.random.rand(9), 25, 25, 3, 3, 'direct')
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,12 +1,10 @@
 import unittest
 from ..standardNet6Areas import StandardNet6Areas
 import numpy as np
-from unittest.mock import patch
 
 
 class TestGenerRandomBinPatterns(unittest.TestCase):
-    @patch('random.choice')
-    def test_gener_random_bin_patterns(self, mock_choice):
+    def test_gener_random_bin_patterns(self):
         net = StandardNet6Areas()
         net.main_init()
 
@@ -15,16 +13,60 @@ class TestGenerRandomBinPatterns(unittest.TestCase):
         patterns = 12
         inputPat = np.zeros(patterns*cells, dtype=np.int32)
 
-        # mock random: return a 1d array, all zeros except one active cell
-        mock_choice.return_value = np.concatenate(
-            (np.zeros(cellsToActivate-1), [1]))
-
         binPatterns = net.gener_random_bin_patterns(
-            cells, cellsToActivate, patterns, inputPat)
+            cells, cellsToActivate, patterns, inputPat, np.random.default_rng(1))
 
-        # we expect 12 patterns - each pattern is a set of 625 cells with a random number of cells activated
+        # we expect 12 patterns - each pattern is a set of 625 cells with exactly 19 cells activated
         self.assertEqual(binPatterns.shape, (12*625, ))
-        self.assertTrue(not np.all(binPatterns == 0))
+        np.testing.assert_array_equal(
+            binPatterns.reshape(patterns, cells).sum(axis=1), cellsToActivate)
+        # it should modify it in place, too
+        self.assertIs(binPatterns, inputPat)
+
+        # the same generator state gives the same patterns
+        np.testing.assert_array_equal(net.gener_random_bin_patterns(
+            cells, cellsToActivate, patterns, inputPat.copy(), np.random.default_rng(1)), binPatterns)
+
+    def test_max_overlap(self):
+        cells, cellsToActivate, patterns = 625, 19, 200
+        inputPat = np.zeros(patterns*cells, dtype=np.int32)
+
+        StandardNet6Areas.gener_random_bin_patterns(
+            cells, cellsToActivate, patterns, inputPat, np.random.default_rng(1), max_overlap=2)
+
+        binPatterns = inputPat.reshape(patterns, cells)
+        np.testing.assert_array_equal(binPatterns.sum(axis=1), cellsToActivate)
+        overlaps = binPatterns @ binPatterns.T
+        np.fill_diagonal(overlaps, 0)
+        self.assertLessEqual(overlaps.max(), 2)
+
+    def test_max_overlap_impossible(self):
+        # 40 patterns of 19 cells cannot be disjoint in 625 cells
+        with self.assertRaises(ValueError):
+            StandardNet6Areas.gener_random_bin_patterns(
+                625, 19, 40, np.zeros(40*625, dtype=np.int32), np.random.default_rng(1), max_overlap=0)
+
+    def test_shared_cells(self):
+        rng = np.random.default_rng(2)
+        positions = np.argpartition(rng.random((50, 100)), 7, axis=1)[:, :8]
+        binPatterns = np.zeros((50, 100), dtype=np.int32)
+        np.put_along_axis(binPatterns, positions, 1, axis=1)
+        overlaps = binPatterns @ binPatterns.T
+
+        first, second, shared = StandardNet6Areas.shared_cells(positions)
+        self.assertTrue(np.all(first < second))
+        expected = np.triu(overlaps, 1)
+        found = np.zeros_like(overlaps)
+        found[first, second] = shared
+        np.testing.assert_array_equal(found, expected)
+
+        # only the pairs of patterns 4 & 10, seen from their side
+        first, second, shared = StandardNet6Areas.shared_cells(positions, [4, 10])
+        self.assertTrue(set(first) <= {4, 10})
+        np.fill_diagonal(overlaps, 0)
+        for i in (4, 10):
+            np.testing.assert_array_equal(second[first == i], np.flatnonzero(overlaps[i]))
+            np.testing.assert_array_equal(shared[first == i], overlaps[i][overlaps[i] > 0])
 
 
 if __name__ == "__main__":
@@ -8,8 +8,8 @@ class TestInitKernels(unittest.TestCase):
     def test_init_gaussian_kernel(self):
         """
         This func is called by init_patchy_gaussian_kernel - see this function called repeatedly in the init() func.
-        For each of the 36 area-area connections, we pass to the kern funcs a slice of J corresponding to its
-        position in the linear sequence, e.g. for (0,0) pass J[0:390625].
+        For each projection enabled in K, init() passes to the kern funcs the linearised kernels of that
+        projection, e.g. for (0,0) net.get_kernels(0, 0).ravel(). Here we pass a bigger mock slice instead.
         """
         net = StandardNet6Areas()
         net.main_init()
@@ -68,8 +68,8 @@ class TestInitKernels(unittest.TestCase):
     def test_init_patchy_gaussian_kernel(self):
         """
         See this function called repeatedly in the init() func.
-        For each of the 36 area-area connections, we pass to the kern funcs a slice of J corresponding to its
-        position in the linear sequence, e.g. for (0,0) pass J[0:390625].
+        For each projection enabled in K, init() passes to the kern funcs the linearised kernels of that
+        projection, e.g. for (0,0) net.get_kernels(0, 0).ravel(). Here we pass a bigger mock slice instead.
         """
         net = StandardNet6Areas()
         net.main_init()
@@ -84,6 +84,20 @@ class TestInitKernels(unittest.TestCase):
         # there isn't much to check here unless we mock random to make it deterministic
         self.assertTrue(not np.all(j_section == 0))
 
+    def test_patchy_gaussian_kernel_marks_missing_synapses(self):
+        net = StandardNet6Areas()
+        net.NO_SYNAPSE = -1.0
+        net.main_init()
+
+        j_section = Get_Vector(net.NSQR1)
+        net.init_patchy_gauss_kern(net.N11, net.N12, net.NREC1, net.NREC2, j_section,
+                                   net.SIGMAX_REC, net.SIGMAY_REC, net.J_REC_PROB, net.J_UPPER)
+
+        # each potential synapse either exists (a weight in [0,upper[) or is NO_SYNAPSE
+        exists = j_section != net.NO_SYNAPSE
+        self.assertTrue(exists.any() and not exists.all())
+        self.assertTrue(np.all((j_section[exists] >= 0) & (j_section[exists] < net.J_UPPER)))
+
 
 if __name__ == "__main__":
     unittest.main()
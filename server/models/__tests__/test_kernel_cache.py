@@ -0,0 +1,68 @@
+import logging
+import os
+import tempfile
+import unittest
+import numpy as np
+from ..standardNet6Areas import StandardNet6Areas
+
+
+class TestKernelCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.addCleanup(StandardNet6Areas.logger.setLevel, StandardNet6Areas.logger.level)
+        StandardNet6Areas.logger.setLevel(logging.WARNING)
+
+    def new_net(self, seed=1, cache=True, **params):
+        net = StandardNet6Areas()
+        net.seed = seed
+        net.KERNEL_CACHE_DIR = self.dir.name if cache else None
+        for name, value in params.items():
+            setattr(net, name, value)
+        net.main_init()
+        net.init()
+        return net
+
+    def test_cached_init_matches_drawn_one(self):
+        uncached = self.new_net(cache=False)
+        first = self.new_net()
+        self.assertEqual(len(os.listdir(self.dir.name)), 1)
+
+        second = self.new_net()
+        self.assertIsNotNone(second.kernel_cache_file())
+        np.testing.assert_array_equal(second.J, uncached.J)
+        np.testing.assert_array_equal(first.J, uncached.J)
+        # the random streams carry on as if the kernels had been drawn
+        self.assertEqual(second.rng.get_state(), uncached.rng.get_state())
+
+    def test_cache_is_keyed_by_seed_params_and_K(self):
+        net = self.new_net()
+        self.assertNotEqual(self.new_net(seed=2).kernel_cache_file(), net.kernel_cache_file())
+        self.assertNotEqual(self.new_net(J_PROB=.2).kernel_cache_file(), net.kernel_cache_file())
+
+        K = net.K.copy()
+        K[1] = 0  # no projection from area 1 to area 2
+        without = self.new_net(K=K)
+        self.assertNotEqual(without.kernel_cache_file(), net.kernel_cache_file())
+        self.assertLess(without.J.size, net.J.size)
+        self.assertEqual(len(os.listdir(self.dir.name)), 4)
+
+    def test_progress_of_cached_init(self):
+        self.new_net()
+        net = StandardNet6Areas()
+        net.seed = 1
+        net.KERNEL_CACHE_DIR = self.dir.name
+        net.main_init()
+        progress = []
+        net.init(progress=lambda *args: progress.append(args))
+        projections = len(net.J_offsets)
+        self.assertEqual(progress, [(projections, projections, None)])
+
+    def test_no_cache_without_seed(self):
+        net = self.new_net(seed=None)
+        self.assertIsNone(net.kernel_cache_file())
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import logging
+import unittest
+import numpy as np
+from .. import profiling
+from ..standardNet6Areas import StandardNet6Areas
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        profiler = profiling.StageProfiler()
+        with profiler.stage('learning'):
+            pass
+        self.assertIs(profiler.stage('learning'), profiling.NO_STAGE)
+        self.assertEqual(profiler.snapshot()['stages'], {})
+
+    def test_counters_and_rolling_window(self):
+        profiler = profiling.StageProfiler(enabled=True, window=4)
+        timer = profiler.stage('learning')
+        for duration in (.001, .002, .003, .004, .010, .010):
+            timer.record(duration)
+
+        summary = profiler.snapshot()['stages']['learning']
+        self.assertEqual(summary['count'], 6)
+        self.assertAlmostEqual(summary['total ms'], 30)
+        self.assertAlmostEqual(summary['mean ms'], 5)
+        self.assertAlmostEqual(summary['max ms'], 10)
+        # only the latest 4 durations: 3, 4, 10, 10 ms
+        self.assertEqual(summary['window'], 4)
+        self.assertAlmostEqual(summary['p50 ms'], 7)
+        self.assertEqual(sum(summary['histogram']), 4)
+        self.assertEqual(len(summary['histogram']), len(profiling.HISTOGRAM_EDGES_MS) - 1)
+
+    def test_stage_times_block(self):
+        profiler = profiling.StageProfiler(enabled=True)
+        with profiler.stage('potentials'):
+            np.ones(1000).sum()
+        with profiler.stage('potentials'):
+            pass
+
+        stages = profiler.snapshot()['stages']
+        self.assertEqual(stages['potentials']['count'], 2)
+        self.assertGreater(stages['potentials']['max ms'], 0)
+
+        profiler.reset()
+        self.assertEqual(profiler.snapshot()['stages'], {})
+
+
+class TestStepProfiling(unittest.TestCase):
+    def test_step_stages(self):
+        net = StandardNet6Areas()
+        self.addCleanup(net.logger.setLevel, net.logger.level)
+        net.logger.setLevel(logging.WARNING)
+        net.PROFILE = True
+        net.main_init()
+        net.init()
+        net.step(output=False)
+        net.step()
+
+        stages = net.profiler.snapshot()['stages']
+        for name in ('step', 'training management', 'input setup', 'potentials', 'rates',
+                     'adaptation', 'learning', 'averaging', 'CA overlaps'):
+            self.assertEqual(stages[name]['count'], 2)
+        # the activity is only serialised when returned
+        self.assertEqual(stages['serialisation']['count'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
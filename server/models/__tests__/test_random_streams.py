@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from ..random_streams import RandomStreams, STREAMS
+from ..standardNet6Areas import StandardNet6Areas
+
+
+class TestRandomStreams(unittest.TestCase):
+    def test_same_seed_same_numbers(self):
+        a = RandomStreams(7)
+        b = RandomStreams(7)
+        for name in STREAMS:
+            np.testing.assert_array_equal(a[name].random(5), b[name].random(5))
+
+    def test_streams_are_independent(self):
+        a = RandomStreams(7)
+        b = RandomStreams(7)
+        a['input noise'].random(1000)  # only a draws input noise
+
+        np.testing.assert_array_equal(
+            a['membrane noise'].random(5), b['membrane noise'].random(5))
+        self.assertFalse(np.array_equal(
+            a['input noise'].random(5), a['membrane noise'].random(5)))
+
+    def test_state_round_trip(self):
+        a = RandomStreams(7)
+        a['lesioning'].random(3)
+        state = a.get_state()
+        expected = a['lesioning'].random(5)
+
+        b = RandomStreams()
+        b.set_state(state)
+        np.testing.assert_array_equal(b['lesioning'].random(5), expected)
+
+        with self.assertRaises(ValueError):
+            b.set_state({'lesioning': state['lesioning']})
+
+    def test_seeded_networks_are_reproducible(self):
+        def run(seed):
+            net = StandardNet6Areas()
+            net.seed = seed
+            net.main_init()
+            net.init()
+            net.spatno = 2
+            for _ in range(3):
+                net.step(output=False)
+            return net
+
+        a, b, c = run(3), run(3), run(4)
+        np.testing.assert_array_equal(a.J, b.J)
+        np.testing.assert_array_equal(a.sensPatt, b.sensPatt)
+        np.testing.assert_array_equal(a.pot, b.pot)
+        self.assertFalse(np.array_equal(a.J, c.J))
+
+
+if __name__ == "__main__":
+    unittest.main()
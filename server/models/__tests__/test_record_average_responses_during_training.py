@@ -44,6 +44,24 @@ class TestRecordAverageResponsesDuringTraining(unittest.TestCase):
         self.assertTrue(np.allclose(net.avg_patts, start_avg_patts))
         self.assertEqual(net.stps_2b_avgd, 0)
 
+    def test_only_pattern_is_averaged(self):
+        net = StandardNet6Areas()
+        net.AVG_PATTS_DTYPE = np.float32
+        net.main_init()
+        net.rates[:] = 1.0
+
+        net.spatno = 2
+        net.stps_2b_avgd = 100
+
+        net.record_average_responses_during_training()
+
+        avg_patts = net.pattern_view(net.avg_patts)
+        self.assertTrue(np.all(avg_patts[1] > 0))
+        self.assertFalse(np.any(np.delete(avg_patts, 1, axis=0)))
+        self.assertEqual(net.avg_patts.dtype, np.float32)
+        # the CAs of pattern 2 are due to be re-computed (only)
+        self.assertEqual(np.flatnonzero(net.avg_patts_changed).tolist(), [1])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,187 @@
+import os
+import tempfile
+import unittest
+from ..standardNet6Areas import StandardNet6Areas
+from .. import checkpoint
+import numpy as np
+
+
+class TestSaveLoadNet(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, 'net.dat')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_and_load(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        # random activity (keeping each vector's type)
+        for name in net.NET_ARRAYS:
+            vector = getattr(net, name)
+            vector[...] = np.random.rand(*vector.shape) * 2
+        net.stp = 1234
+        net.training_phase = 2
+        net.spatno = 7
+
+        net.save_net(self.filename)
+        expected_random = [net.rng[name].random()
+                           for name in ('membrane noise', 'pattern selection')]
+
+        loaded = StandardNet6Areas()
+        loaded.main_init()
+        loaded.load_net(self.filename)
+
+        for name in net.NET_ARRAYS:
+            np.testing.assert_array_equal(
+                getattr(loaded, name), getattr(net, name), err_msg=name)
+        self.assertEqual(loaded.stp, 1234)
+        self.assertEqual(loaded.training_phase, 2)
+        self.assertEqual(loaded.spatno, 7)
+
+        # the random numbers carry on from where they were when the net was saved
+        self.assertEqual([loaded.rng[name].random()
+                          for name in ('membrane noise', 'pattern selection')], expected_random)
+
+    def test_load_recomputes_ca_overlaps(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        net.ca_patts[...] = np.random.rand(net.ca_patts.size) < .1
+        net.update_CApatts_float()
+        net.compute_CAoverlaps()
+        net.save_net(self.filename)
+
+        loaded = StandardNet6Areas()
+        loaded.main_init()
+        loaded.INIT_RANDOM_ACTIVITY()
+        loaded.get_current_activity()
+        loaded.load_net(self.filename)
+
+        np.testing.assert_allclose(loaded.ca_ovlps, net.ca_ovlps)
+        np.testing.assert_array_equal(loaded.ca_patts_float, net.ca_patts_float)
+        np.testing.assert_allclose(loaded.get_current_activity()['cellAssemblyOverlaps']['area1'],
+                                   net.ca_ovlps.reshape(net.NAREAS, net.P, net.P)[0])
+
+    def test_weights_are_memory_mapped(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        net.save_net(self.filename)
+
+        loaded = StandardNet6Areas()
+        loaded.main_init()
+        loaded.load_net(self.filename)
+        self.assertIsInstance(loaded.J, np.memmap)
+
+        # learning changes the weights in memory, but not in the file
+        loaded.INIT_RANDOM_ACTIVITY()
+        loaded.slrate = 8
+        loaded.compute_learning(.0008)
+        self.assertFalse(np.array_equal(loaded.J, net.J))
+
+        reloaded = StandardNet6Areas()
+        reloaded.main_init()
+        reloaded.load_net(self.filename, mmap=False)
+        self.assertNotIsInstance(reloaded.J, np.memmap)
+        np.testing.assert_array_equal(reloaded.J, net.J)
+
+    def test_step_saves_net_when_switch_is_on(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        net.net_dir = self.dir.name
+        net.ssaveNet = True
+
+        net.step()
+
+        self.assertFalse(net.ssaveNet)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dir.name, net.NET_WR % 0)))
+
+    def test_incremental_save_only_writes_changed_blocks(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        base = os.path.join(self.dir.name, 'net0.dat')
+        delta = os.path.join(self.dir.name, 'net1.dat')
+        net.save_net(base)
+
+        # change a few weights (a single block) and some activity
+        net.J[10:20] += .5
+        net.pot[...] = np.random.rand(*net.pot.shape)
+        net.stp = 99
+        net.save_net(delta, incremental=True)
+
+        header = checkpoint.read_header(delta)
+        self.assertEqual(header['delta']['base'], 'net0.dat')
+        self.assertEqual(header['arrays']['J.blocks']['shape'], [1])
+        self.assertLess(os.path.getsize(delta), os.path.getsize(base) / 10)
+
+        loaded = StandardNet6Areas()
+        loaded.main_init()
+        loaded.load_net(delta)
+        np.testing.assert_array_equal(loaded.J, net.J)
+        np.testing.assert_array_equal(loaded.pot, net.pot)
+        self.assertEqual(loaded.stp, 99)
+
+        # compacting gives a full file with the same network
+        checkpoint.compact(delta)
+        self.assertNotIn('delta', checkpoint.read_header(delta))
+        os.remove(base)
+        loaded = StandardNet6Areas()
+        loaded.main_init()
+        loaded.load_net(delta)
+        np.testing.assert_array_equal(loaded.J, net.J)
+        np.testing.assert_array_equal(loaded.pot, net.pot)
+
+    def test_checkpoint_net_takes_full_snapshots_every_cycle(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        net.FULL_SAVE_CYCLE = 2
+
+        filenames = [os.path.join(self.dir.name, f'net{i}.dat') for i in range(4)]
+        for filename in filenames:
+            net.J[:5] += .1
+            net.checkpoint_net(filename)
+
+        deltas = ['delta' in checkpoint.read_header(
+            filename) for filename in filenames]
+        self.assertEqual(deltas, [False, True, False, True])
+        self.assertEqual(checkpoint.read_header(
+            filenames[3])['delta']['base'], 'net2.dat')
+
+    def test_overwriting_the_base_saves_a_full_snapshot(self):
+        net = StandardNet6Areas()
+        net.main_init()
+        net.init()
+        net.FULL_SAVE_CYCLE = 2
+
+        net.checkpoint_net(self.filename)
+        net.J[:5] += .1
+        net.checkpoint_net(self.filename)  # (its own base: a full snapshot again)
+
+        self.assertNotIn('delta', checkpoint.read_header(self.filename))
+        with self.assertRaises(ValueError):
+            checkpoint.write_delta(self.filename, self.filename, {'J': net.J}, {}, {})
+
+        loaded = StandardNet6Areas()
+        loaded.main_init()
+        loaded.load_net(self.filename)
+        np.testing.assert_array_equal(loaded.J, net.J)
+
+    def test_load_rejects_other_network(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'not a network')
+
+        net = StandardNet6Areas()
+        net.main_init()
+        with self.assertRaises(ValueError):
+            net.load_net(self.filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -54,16 +54,45 @@ class TestStandardNet6Areas(unittest.TestCase):
         self.assertSilentVector(net.motorInput, net.NYAREAS * net.N1)
         self.assertSilentVector(net.sensPatt, net.NYAREAS*net.P*net.N1)
         self.assertSilentVector(net.motorPatt, net.NYAREAS*net.P*net.N1)
-        self.assertSilentVector(net.J, net.NAREAS * net.NAREAS * net.NSQR1)
+        # one (N1, mx*my) block of kernels per projection enabled in K
+        self.assertSilentVector(
+            net.J, int(np.sum(net.K)) * net.N1 * net.NFFB1 * net.NFFB2)
+        self.assertEqual(net.get_kernels(0, 1).shape,
+                         (net.N1, net.NFFB1 * net.NFFB2))
+        self.assertEqual(net.get_kernels(2, 2).shape,
+                         (net.N1, net.NREC1 * net.NREC2))
+        self.assertTrue(np.shares_memory(net.get_kernels(0, 1), net.J))
+        with self.assertRaises(KeyError):
+            net.get_kernels(0, 2)  # area 1 does not project to area 3
         self.assertSilentVector(net.Jinh, net.N1)
-        self.assertSilentVector(net.linkffb, net.N1)
-        self.assertSilentVector(net.linkrec, net.N1)
-        self.assertSilentVector(net.linkinh, net.N1)
+        self.assertSilentVector(net.linkffb, net.NAREAS * net.N1)
+        self.assertSilentVector(net.linkrec, net.NAREAS * net.N1)
+        self.assertSilentVector(net.linkinh, net.NAREAS * net.N1)
         self.assertSilentVector(net.tempffb, net.N1)
-        self.assertSilentVector(net.clampSMIn, net.N1)
+        self.assertSilentVector(net.clampSMIn, net.NAREAS * net.N1)
+        self.assertSilentVector(net.tempexc, net.NAREAS * net.N1)
+        self.assertSilentVector(net.tempnoise, net.NAREAS * net.N1)
         self.assertSilentVector(net.freq_distrib, net.P)
         self.assertEqual(net.noise_fac, 6.928203230275509)
 
+    def test_main_init_pattern_count(self):
+        net = StandardNet6Areas()
+        net.P = 100
+        net.AVG_PATTS_DTYPE = np.float32
+        net.main_init()
+
+        self.assertSilentVector(net.avg_patts, net.NAREAS * net.N1 * 100)
+        self.assertEqual(net.avg_patts.dtype, np.float32)
+        self.assertSilentVector(net.ca_patts, net.NAREAS * net.N1 * 100)
+        self.assertSilentVector(net.ca_ovlps, net.NAREAS * 100 * 100)
+        self.assertSilentVector(net.sensPatt, net.NYAREAS * 100 * net.N1)
+        self.assertSilentVector(net.freq_distrib, 100)
+        self.assertEqual(StandardNet6Areas.P, 12)  # (other networks unchanged)
+
+        net.P = 0
+        with self.assertRaises(ValueError):
+            net.main_init()
+
     def test_resetNet(self):
         net = StandardNet6Areas()
         net.main_init()
@@ -121,7 +150,8 @@ class TestStandardNet6Areas(unittest.TestCase):
         self.assertSilentVector(net.freq_distrib, net.P)
 
         self.assertEqual(net.total_output, 0.0)
-        self.assertTrue(sum(1 for element in net.J if element != 0) > 0)
+        for origin, dest in net.J_offsets:
+            self.assertVectorWithActivity(net.get_kernels(origin, dest))
         self.assertVectorWithActivity(net.sensPatt)
         self.assertVectorWithActivity(net.motorPatt)
 
@@ -139,6 +169,21 @@ class TestStandardNet6Areas(unittest.TestCase):
         for i in range(20):
             net.step()
 
+    def test_step_sparse_synapses(self):
+        net = StandardNet6Areas()
+        net.SPARSE_SYNAPSES = True
+        net.main_init()
+        net.init()
+
+        self.assertEqual(set(net.J_sparse), set(net.J_offsets))
+        for (origin, dest), csr in net.J_sparse.items():
+            self.assertEqual(
+                csr.nnz, np.count_nonzero(net.get_kernels(origin, dest)))
+
+        net.slrate = 8
+        for i in range(5):
+            net.step()
+
     @patch('random.random')
     def test_SFUNC(self, mock_random):
         net = StandardNet6Areas()
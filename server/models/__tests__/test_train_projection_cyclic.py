@@ -1,5 +1,6 @@
 import unittest
 from ..standardNet6Areas import StandardNet6Areas
+from .. import correlation
 import json
 import numpy as np
 
@@ -40,10 +41,10 @@ class TestTrainProjectionCyclic(unittest.TestCase):
         pot_end_idx = net.N1 * (dest_area_i + 1)
         pot = net.pot[pot_start_idx:pot_end_idx]
 
-        # J is a 1d numpy array with 6*6*625*625 elements (areas * areas * cells per area * cells per area)
-        k_start_idx = net.NSQR1 * (net.NAREAS * origin_area_j + dest_area_i)
-        k_end_idx = k_start_idx + net.NSQR1
-        kernels = net.J[k_start_idx:k_end_idx]
+        # the kernels of the projection are a (625, 19*19) view into J (one kernel per dest. cell)
+        kernels = net.get_kernels(origin_area_j, dest_area_i)
+        k_start_idx = net.J_offsets[(origin_area_j, dest_area_i)]
+        k_end_idx = k_start_idx + kernels.size
 
         # the func modifies it in place, so we create a copy here so we can compare with the post-execution value
         j_before = net.J.copy()
@@ -62,7 +63,7 @@ class TestTrainProjectionCyclic(unittest.TestCase):
         }, sort_keys=False, indent=4))
 
         net.train_projection_cyclic(
-            rates, pot, kernels, net.N11, net.N12, net.NREC1, net.NREC2, .0001 * 15, net.tot_LTP[dest_area_i:dest_area_i+1], net.tot_LTD[dest_area_i:dest_area_i+1])
+            rates, pot, kernels, net.N11, net.N12, net.NFFB1, net.NFFB2, .0001 * 15, net.tot_LTP[dest_area_i:dest_area_i+1], net.tot_LTD[dest_area_i:dest_area_i+1])
 
         # check only the (area 0 -> area 1) section of J has changed
         self.assertTrue(np.allclose(
@@ -83,6 +84,55 @@ class TestTrainProjectionCyclic(unittest.TestCase):
             net.tot_LTD) if i != dest_area_i))
         self.assertTrue(net.tot_LTD[dest_area_i] > 0)
 
+    def test_matches_scalar_version(self):
+        """
+        The vectorised rule must give bit-identical weights and LTP/LTD totals
+        """
+        net = self.net
+        kernels = net.get_kernels(1, 2)
+        rates = net.rates[net.N1:2 * net.N1]
+        pot = net.pot[2 * net.N1:3 * net.N1]
+
+        scalar = kernels.copy()
+        scalar_tot = np.array([0.25, 0.5])  # totals accumulate on previous values
+        net.train_projection_cyclic_python(rates, pot, scalar, net.N11, net.N12, net.NFFB1, net.NFFB2,
+                                           .0008, scalar_tot[0:1], scalar_tot[1:2])
+
+        vectorised = kernels.copy()
+        vectorised_tot = np.array([0.25, 0.5])
+        net.train_projection_cyclic(rates, pot, vectorised, net.N11, net.N12, net.NFFB1, net.NFFB2,
+                                    .0008, vectorised_tot[0:1], vectorised_tot[1:2])
+
+        self.assertFalse(np.array_equal(vectorised, kernels))
+        np.testing.assert_array_equal(vectorised, scalar)
+        np.testing.assert_array_equal(vectorised_tot, scalar_tot)
+
+    def test_sparse_projection_matches_cyclic(self):
+        """
+        In sparse mode only the existing synapses are visited, but the weights and the
+        LTP/LTD totals must be exactly the same
+        """
+        net = self.net
+        kernels = net.get_kernels(2, 2)
+        csr = correlation.CyclicCSR(
+            kernels, net.N11, net.N12, net.NREC1, net.NREC2, net.NO_SYNAPSE)
+        rates = net.rates[2 * net.N1:3 * net.N1]
+        pot = net.pot[2 * net.N1:3 * net.N1]
+
+        dense = kernels.copy()
+        dense_tot = np.zeros(2)
+        net.train_projection_cyclic_python(rates, pot, dense, net.N11, net.N12, net.NREC1, net.NREC2,
+                                           .0008, dense_tot[0:1], dense_tot[1:2])
+
+        sparse = kernels.copy()
+        sparse_tot = np.zeros(2)
+        net.train_projection_sparse(
+            rates, pot, sparse, csr, .0008, sparse_tot[0:1], sparse_tot[1:2])
+
+        self.assertFalse(np.array_equal(sparse, kernels))
+        np.testing.assert_array_equal(sparse, dense)
+        np.testing.assert_array_equal(sparse_tot, dense_tot)
+
 
 if __name__ == "__main__":
     unittest.main()
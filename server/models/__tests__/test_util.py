@@ -100,6 +100,18 @@ class TestUtil(unittest.TestCase):
 
         self.assertEqual(got, expected)
 
+    def test_leaky_integrate_Vector(self):
+        obj = util.Get_Random_Vector(10)
+        expr = util.Get_Random_Vector(10)
+        expected = [util.leaky_integrate(2.5, o, e, .5)
+                    for o, e in zip(obj, expr)]
+
+        got = util.leaky_integrate_Vector(2.5, obj, expr, .5)
+
+        np.testing.assert_array_equal(got, expected)
+        # it should modify it in place, too
+        np.testing.assert_array_equal(obj, expected)
+
     def test_SIGMOID(self):
         self.assertEqual(util.SIGMOID(0), 0.5)
         self.assertEqual(util.SIGMOID(math.inf), 1)
@@ -119,6 +131,17 @@ class TestUtil(unittest.TestCase):
         self.assertEqual(util.TLIN(1), 1)
         self.assertEqual(util.TLIN(1.5), 1.5)
 
+    def test_RAMP_Vector(self):
+        x = np.array([1, 0, 1.6, -0.2, 0.6])
+        np.testing.assert_array_equal(
+            util.RAMP_Vector(x), [util.RAMP(v) for v in x])
+
+    def test_TLIN_Vector(self):
+        x = np.array([0, -.1, 0.1, 1, 1.5])
+        out = util.Get_Vector(5)
+        util.TLIN_Vector(x, out=out)
+        np.testing.assert_array_equal(out, [util.TLIN(v) for v in x])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,297 @@
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from . import util
+from .standardNet6Areas import StandardNet6Areas
+
+"""
+Many copies of StandardNet6Areas advanced together, e.g. for parameter studies over seeds or
+slider values.
+
+Each network of the batch is still a StandardNet6Areas instance (in self.nets), with its own
+random numbers, sliders, switches, training counters and files, but its state vectors and
+weights are views into arrays with a leading batch axis (self.pot[b] is self.nets[b].pot).
+The costly parts of a step (correlations, leaky integrations, firing rates, learning,
+overlaps) are computed once for the whole batch; the cheap per-network bookkeeping
+(training protocol, input patterns, saving) is left to each network, e.g.
+
+    batch = BatchedNet6Areas(seeds=[1, 2, 3, 4])
+    batch.main_init()
+    batch.set_sliders('sgain', [800, 1000, 1200, 1400])
+    batch.init()
+    batch.step()
+"""
+
+
+class BatchedNet6Areas:
+    # State vectors & weights of the networks stacked along the batch axis (the
+    # networks' own attributes become views into these)
+    BATCH_ARRAYS = ('pot', 'inh', 'adapt', 'rates', 'slowinh', 'avg_patts', 'ca_patts',
+                    'ca_patts_float', 'ca_ovlps', 'ovlps', 'diluted', 'tot_LTP', 'tot_LTD',
+                    'sensInput', 'motorInput', 'J', 'linkffb', 'linkrec', 'linkinh',
+                    'clampSMIn', 'tempexc', 'tempnoise')
+
+    logger = StandardNet6Areas.logger
+
+    def __init__(self, seeds: list, params: dict = None):
+        """
+        Keyword arguments:
+        seeds   -- seed of each network (None: not reproducible); one network per seed
+        params  -- model parameters to override in ALL the networks, e.g. {'J_PROB': .2}
+                   (sliders can differ between networks, see set_sliders)
+        """
+        if not len(seeds):
+            raise ValueError('A batch needs at least one network')
+
+        self.nets = []
+        for seed in seeds:
+            net = StandardNet6Areas()
+            net.seed = seed
+            for name, value in (params or {}).items():
+                if not hasattr(net, name):
+                    raise AttributeError(f"Unknown model parameter '{name}'")
+                setattr(net, name, value)
+            # the weights must stay views into the batch: load them into memory
+            net.NET_MMAP = ()
+            self.nets.append(net)
+
+        # Structure & constants shared by all the networks
+        self.net = self.nets[0]
+        self.B = len(self.nets)
+
+    def main_init(self):
+        """
+        main_init() of all the networks, then stacks their vectors along the batch axis
+        """
+        for net in self.nets:
+            net.main_init()
+
+        for name in self.BATCH_ARRAYS:
+            batch = np.stack([getattr(net, name) for net in self.nets])
+            setattr(self, name, batch)
+            for b, net in enumerate(self.nets):
+                setattr(net, name, batch[b])
+
+    def init(self):
+        """
+        init() of all the networks (a new, independent simulation run for each)
+        """
+        for net in self.nets:
+            net.init()
+        self.prepare_inhibitory_kernel()
+
+    def prepare_inhibitory_kernel(self):
+        """
+        The inhibitory kernel is fixed and identical in all the networks, so all the areas of
+        all the networks are correlated with it in one call
+        """
+        for net in self.nets[1:]:
+            if not np.array_equal(net.Jinh, self.net.Jinh):
+                raise ValueError(
+                    'All the networks of a batch must have the same inhibitory kernel')
+        self.Jinh_correlation = self.net.Jinh_correlation
+
+    def sliders(self, name: str) -> util.VectorType:
+        """
+        Current value of slider name in each network, as a vector of B elements
+        """
+        return np.array([getattr(net, name) for net in self.nets], dtype=float)
+
+    def set_sliders(self, name: str, values):
+        """
+        Sets slider name to values: one value for all networks, or one per network
+        """
+        if not hasattr(self.net, name):
+            raise AttributeError(f"Unknown slider '{name}'")
+        if np.ndim(values) == 0:
+            values = [values] * self.B
+        if len(values) != self.B:
+            raise ValueError(
+                f"Expected {self.B} values of '{name}' but got {len(values)}")
+        for net, value in zip(self.nets, values):
+            setattr(net, name, value)
+
+    def areas(self, vector: util.VectorType) -> util.VectorType:
+        """
+        (B, NAREAS, N1) view of a batch of NAREAS*N1 vectors
+        """
+        return vector.reshape(self.B, self.net.NAREAS, self.net.N1)
+
+    def get_kernels(self, origin: int, dest: int) -> util.VectorType:
+        """
+        All the kernels of the projection from area origin to area dest in every network, as a
+        (B, N12, N11, my, mx) view into J: [b, i, j] is the kernel of cell ij in area dest of
+        network b (see StandardNet6Areas.get_kernels)
+        """
+        net = self.net
+        mx, my = net.kernel_dims(origin, dest)
+        start = net.J_offsets[(origin, dest)]
+        return self.J[:, start:start + net.N1 * mx * my].reshape(self.B, net.N12, net.N11, my, mx)
+
+    def presynaptic_windows(self, origin: int, dest: int) -> util.VectorType:
+        """
+        Firing rates of area origin seen by the kernel of each cell of area dest (0-based) in
+        every network, as a (B, N12, N11, my, mx) view (no copy) of the (cyclically) padded
+        rates: [b, i, j] is the same as rates[cyclic_gather_indices(...)[ij]] in correlation
+        """
+        net = self.net
+        mx, my = net.kernel_dims(origin, dest)
+        rates = self.areas(self.rates)[:, origin].reshape(self.B, net.N12, net.N11)
+        padded = np.pad(rates, ((0, 0), ((my - 1) // 2, my // 2),
+                        ((mx - 1) // 2, mx // 2)), mode='wrap')
+        return sliding_window_view(padded, (my, mx), axis=(1, 2))
+
+    def correlate_projection(self, origin: int, dest: int) -> util.VectorType:
+        """
+        EPSPs that area origin sends to each cell of area dest (0-based) in every network, as a
+        (B, N1) matrix (all synapses are visited, whatever SPARSE_SYNAPSES)
+        """
+        return np.einsum('bijkl,bijkl->bij', self.get_kernels(origin, dest),
+                         self.presynaptic_windows(origin, dest)).reshape(self.B, self.net.N1)
+
+    def compute_new_membrane_potentials(self, sliders: dict):
+        net = self.net
+        util.Clear_Vector(self.linkffb)
+        util.Clear_Vector(self.linkrec)
+        linkffb = self.areas(self.linkffb)
+        linkrec = self.areas(self.linkrec)
+
+        # Sensorimotor input (depends on each network's switches & input patterns)
+        for each in self.nets:
+            each.clamp_sensorimotor_input()
+
+        for area in range(net.NAREAS):
+            ### FF/fb (between area) input ###
+            for j in range(net.NAREAS):
+                if j != area and net.K[net.NAREAS * j + area]:
+                    linkffb[:, area] += self.correlate_projection(j, area)
+
+            ### RECurrent (within area) input ###
+            if net.K[(net.NAREAS + 1) * area]:
+                linkrec[:, area] = self.correlate_projection(area, area)
+
+        ### INHibitory (within area) input, for ALL areas of ALL networks ###
+        self.Jinh_correlation(self.rates, self.linkinh)
+
+        self.integrate_membrane_potentials(sliders)
+
+    def integrate_membrane_potentials(self, sliders: dict):
+        """
+        Same as StandardNet6Areas.integrate_membrane_potentials, with each network's sliders
+        """
+        net = self.net
+        util.leaky_integrate_Vector(
+            net.TAU2, self.inh, self.linkinh, net.STEPSIZE)
+        util.leaky_integrate_Vector(net.TAUSLOW, self.slowinh, self.areas(
+            self.rates).sum(axis=2), net.STEPSIZE)
+
+        total = self.tempexc
+        np.add(sliders['sI0'][:, None], self.clampSMIn, out=total)
+        total += sliders['sJffb'][:, None] * self.linkffb
+        total += sliders['sJrec'][:, None] * self.linkrec
+        total -= sliders['sJinh'][:, None] * util.TLIN_Vector(self.inh)
+        self.areas(total)[...] -= (sliders['sJslow'][:, None] * self.slowinh)[:, :, None]
+        total -= 1000 * self.diluted
+        # each network draws its membrane noise from its own stream
+        for each in self.nets:
+            each.rng['membrane noise'].random(out=each.tempnoise)
+        noise = self.tempnoise
+        noise -= .5
+        total += (sliders['snoise'] * net.noise_fac)[:, None] * noise
+        total *= .01
+        util.leaky_integrate_Vector(net.TAU1, self.pot, total, net.STEPSIZE)
+
+    def compute_firing_rates(self, gain: util.VectorType, theta: util.VectorType):
+        np.subtract(self.pot, theta[:, None], out=self.rates)
+        self.rates -= self.adapt
+        self.rates *= gain[:, None]
+        util.RAMP_Vector(self.rates, out=self.rates)
+        for net, total in zip(self.nets, self.rates.sum(axis=1)):
+            net.total_output = total
+
+    def compute_new_adaptation(self):
+        net = self.net
+        util.leaky_integrate_Vector(
+            net.TAUADAPT, self.adapt, net.ADAPTSTRENGTH * self.rates, net.STEPSIZE)
+
+    def train_projection(self, origin: int, dest: int, hrate: util.VectorType, learning: np.ndarray):
+        """
+        Trains all the synapses from area origin to area dest (0-based) of the networks that
+        are learning, each with its own learning rate (see StandardNet6Areas.apply_learning_rule)
+
+        The learning rule is applied one network at a time: its (B * N1 * mx*my) masks do not
+        fit in the caches, and the rule is memory bound (~3x slower over the whole batch)
+        """
+        w = self.get_kernels(origin, dest)
+        pre_D = self.presynaptic_windows(origin, dest)
+        post_pot = self.areas(self.pot)[:, dest].reshape(
+            self.B, self.net.N12, self.net.N11, 1, 1)
+
+        for b in np.flatnonzero(learning):
+            self.nets[b].apply_learning_rule(
+                w[b], np.ascontiguousarray(pre_D[b]), post_pot[b], hrate[b],
+                self.tot_LTP[b, dest:dest + 1], self.tot_LTD[b, dest:dest + 1])
+
+    def compute_learning(self, hrate: util.VectorType, learning: np.ndarray):
+        net = self.net
+        if not learning.any():
+            return
+        self.tot_LTP[learning] = 0.0
+        self.tot_LTD[learning] = 0.0
+
+        for i in range(net.NAREAS):
+            for j in range(net.NAREAS):
+                if j == i and net.K[(net.NAREAS + 1) * j] != 0:
+                    self.train_projection(j, j, hrate, learning)
+                elif net.K[net.NAREAS * j + i] != 0:
+                    self.train_projection(j, i, hrate, learning)
+
+    def compute_overlap_between_cell_assemblies_and_current_activity(self):
+        net = self.net
+        np.matmul(self.ca_patts_float, self.areas(self.rates)[..., np.newaxis],
+                  out=self.ovlps.reshape(self.B, net.NAREAS, net.P, 1))
+
+    def step(self, output: bool = False):
+        """
+        One step (see StandardNet6Areas.step) of ALL the networks. Returns the current activity
+        of each network (see StandardNet6Areas.get_current_activity) if output is True
+        """
+        self.logger.info(json.dumps({
+            'op': 'step',
+            'batch size': self.B,
+            'steps': [net.stp for net in self.nets],
+        }, sort_keys=False, indent=4))
+
+        ## Per network: files, TRAINING protocol, SENSORIMOTOR INPUT ##
+        for net in self.nets:
+            net.manage_network_files()
+            net.manage_network_training()
+            net.set_up_current_sensorimotor_input(.0001 * net.snoise)
+
+        sliders = {name: self.sliders(name) for name in (
+            'slrate', 'sgain', 'stheta', 'snoise', 'sI0', 'sJffb', 'sJrec', 'sJinh', 'sJslow')}
+
+        ## COMPUTE NEW MEMBRANE POTENTIALS ##
+        self.compute_new_membrane_potentials(sliders)
+
+        ## COMPUTE FIRING RATES (OUTPUTS) ##
+        self.compute_firing_rates(.001 * sliders['sgain'], .001 * sliders['stheta'])
+
+        ## COMPUTE NEW ADAPTATION ##
+        self.compute_new_adaptation()
+
+        ## LEARNING ##
+        self.compute_learning(.0001 * sliders['slrate'], sliders['slrate'] > 0)
+
+        ## Per network: AVERAGE RESPONSES DURING TRAINING, EMERGING CAs ##
+        for net in self.nets:
+            net.record_average_responses_during_training()
+            net.compute_emerging_cell_assemblies_and_overlaps()
+
+        ## COMPUTE OVERLAP BETW. CAs and CURRENT ACTIV. ##
+        self.compute_overlap_between_cell_assemblies_and_current_activity()
+
+        for net in self.nets:
+            net.stp = net.stp + 1
+        if output:
+            return [net.get_current_activity() for net in self.nets]
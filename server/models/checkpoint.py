@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import struct
+import numpy as np
+
+"""
+Binary network files (see StandardNet6Areas.save_net / load_net).
+
+Layout of a file:
+
+    MAGIC | header length (uint64, little endian) | JSON header | arrays
+
+The JSON header records the dtype, shape and (absolute) offset of every array, the
+training counters and the state of the random streams (see random_streams). Each array is stored
+raw, C-ordered and aligned to ALIGN bytes, so the big ones (the weights) can be
+memory-mapped straight from the file instead of being read and copied: opening a
+trained network then takes milliseconds, and pages are only read when touched.
+
+Incremental (delta) files only store, for the weights, the blocks of DELTA_BLOCK values
+that changed since a full file (their "base", named in the header); everything else is
+stored in full. Reading a weight array from a delta file reads it from the base and
+patches the changed blocks in. compact() turns a delta file back into a full one.
+"""
+
+MAGIC = b'FELIXNET'
+VERSION = 2
+ALIGN = 64
+DELTA_BLOCK = 1024  # no. of values per weight block in delta files
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write(filename: str, arrays: dict, counters: dict, rng: dict, delta: dict = None):
+    """
+    Writes the arrays ({name: ndarray}), the counters ({name: number}) and the state of the
+    random streams (RandomStreams.get_state()) to a network file
+    """
+    layout = dict()
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str,
+                        'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = {
+        'version': VERSION,
+        'arrays': layout,
+        'counters': {name: np.asarray(value).item() for name, value in counters.items()},
+        'rng': rng,
+    }
+    if delta is not None:
+        header['delta'] = delta
+
+    # array offsets are relative to the (aligned) end of the header until now
+    encoded = json.dumps(header).encode()
+    start = _aligned(len(MAGIC) + 8 + len(encoded) + 64)
+    for entry in layout.values():
+        entry['offset'] += start
+    encoded = json.dumps(header).encode()
+    assert len(MAGIC) + 8 + len(encoded) <= start
+
+    with open(filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(layout[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_header(filename: str) -> dict:
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{filename}' is not a network file")
+        length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(length))
+
+    if header['version'] != VERSION:
+        raise ValueError(
+            f"'{filename}' has unsupported version {header['version']}")
+    return header
+
+
+def array_shape(header: dict, name: str) -> tuple:
+    if name in header.get('delta', {}).get('arrays', {}):
+        return tuple(header['delta']['arrays'][name]['shape'])
+    return tuple(header['arrays'][name]['shape'])
+
+
+def _blocks(array: np.ndarray, block: int) -> np.ndarray:
+    """
+    array (linearised and zero-padded) as a matrix of blocks, one per row
+    """
+    flat = np.reshape(array, (-1,))
+    padded = np.zeros(-(-flat.size // block) * block, dtype=flat.dtype)
+    padded[:flat.size] = flat
+    return padded.reshape(-1, block)
+
+
+def write_delta(filename: str, base_filename: str, arrays: dict, counters: dict, rng: dict,
+                weights=('J',), block: int = DELTA_BLOCK):
+    """
+    Like write, but the weights are only stored as the blocks that differ from the ones in
+    the (full) network file base_filename. Returns the no. of changed blocks per weight array.
+    """
+    if os.path.exists(filename) and os.path.samefile(base_filename, filename):
+        raise ValueError(f"'{filename}' cannot be written as a delta of itself")
+
+    base_header = read_header(base_filename)
+    if 'delta' in base_header:
+        raise ValueError(f"'{base_filename}' is not a full network file")
+
+    arrays = dict(arrays)
+    entries = dict()
+    changed_blocks = dict()
+    for name in weights:
+        current = _blocks(arrays.pop(name), block)
+        base = _blocks(read_array(base_filename, base_header, name, mmap=True), block)
+        changed = np.flatnonzero(np.any(current != base, axis=1))
+
+        arrays[name + '.blocks'] = changed
+        arrays[name + '.values'] = current[changed]
+        entries[name] = {'dtype': current.dtype.str,
+                         'shape': list(array_shape(base_header, name))}
+        changed_blocks[name] = changed.size
+
+    base = os.path.relpath(base_filename, os.path.dirname(os.path.abspath(filename)))
+    write(filename, arrays, counters, rng, delta={
+          'base': base, 'block': block, 'arrays': entries})
+    return changed_blocks
+
+
+def read_array(filename: str, header: dict, name: str, mmap: bool = False) -> np.ndarray:
+    """
+    Reads one array of a network file; if mmap, the array is memory-mapped copy-on-write
+    (changes stay in memory and never reach the file). For the weights of a delta file,
+    only the base is memory-mapped; the changed blocks are patched in memory.
+    """
+    delta = header.get('delta')
+    if delta is not None and name in delta['arrays']:
+        base_filename = os.path.join(os.path.dirname(
+            os.path.abspath(filename)), delta['base'])
+        array = read_array(base_filename, read_header(
+            base_filename), name, mmap)
+
+        block = delta['block']
+        blocks = read_array(filename, header, name + '.blocks')
+        values = read_array(filename, header, name + '.values')
+        indices = (blocks[:, None] * block + np.arange(block)).reshape(-1)
+        valid = indices < array.size
+        array.reshape(-1)[indices[valid]] = values.reshape(-1)[valid]
+        return array
+
+    entry = header['arrays'][name]
+    dtype = np.dtype(entry['dtype'])
+    shape = tuple(entry['shape'])
+
+    if mmap:
+        return np.memmap(filename, dtype=dtype, mode='c', offset=entry['offset'], shape=shape)
+    count = int(np.prod(shape))
+    return np.fromfile(filename, dtype=dtype, count=count, offset=entry['offset']).reshape(shape)
+
+
+def compact(filename: str, out_filename: str = None):
+    """
+    Turns a delta network file into a full one (by default, in place): the result no longer
+    depends on its base file
+    """
+    header = read_header(filename)
+    if 'delta' not in header:
+        return
+
+    names = [name for name in header['arrays'] if not name.endswith(('.blocks', '.values'))]
+    names += list(header['delta']['arrays'])
+    arrays = {name: read_array(filename, header, name) for name in names}
+
+    out_filename = out_filename or filename
+    temp_filename = out_filename + '.tmp'
+    write(temp_filename, arrays, header['counters'], header['rng'])
+    os.replace(temp_filename, out_filename)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compact delta network files into full ones (in place)')
+    parser.add_argument('files', nargs='+', help='network files')
+    for filename in parser.parse_args().files:
+        compact(filename)
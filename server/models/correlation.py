@@ -1,4 +1,5 @@
 from .util import VectorType
+from functools import lru_cache
 import numpy as np
 
 """
@@ -55,8 +56,9 @@ def Correlate_2d_cyclic_python(in_vector, kern, width, height, kernel_width, ker
     The original C implementation, replicated in Correlate_2d_cyclic_original_C, doesn't work
     with our 1d numpy arrays.
 
-    TODO this takes 0.055s, which in turn leads to compute_new_membrane_potentials taking 0.9.s.
-    We will need to vectorise it to speed it up.
+    Note: every cell is correlated with the SAME kernel (the first kernel_width*kernel_height
+    elements of kern). This takes ~0.055s per call; the model uses the vectorised, per-cell
+    Correlate_2d_cyclic instead, and this version is kept as a scalar reference.
     """
     for i in range(height):
         for j in range(width):
@@ -72,9 +74,49 @@ def Correlate_2d_cyclic_python(in_vector, kern, width, height, kernel_width, ker
     return out_vector
 
 
+@lru_cache(maxsize=None)
+def cyclic_gather_indices(width: int, height: int, kernel_width: int, kernel_height: int) -> np.ndarray:
+    """
+    Precomputes, for every cell of a (toroidal) width*height area, the linear indices of the
+    kernel_width*kernel_height input cells that its kernel "sees".
+
+    Row ij of the returned (width*height, kernel_width*kernel_height) array holds, in kernel order,
+    the indices ((i + k) % height) * width + (j + l) % width used by Correlate_2d_cyclic_python.
+    The result only depends on the geometry, so it is cached and shared by all projections.
+    """
+    rows = np.arange(height)[:, None, None, None]
+    cols = np.arange(width)[None, :, None, None]
+    k = np.arange(-((kernel_height - 1) // 2), kernel_height // 2 + 1)[None, None, :, None]
+    l = np.arange(-((kernel_width - 1) // 2), kernel_width // 2 + 1)[None, None, None, :]
+
+    indices = ((rows + k) % height) * width + (cols + l) % width
+    indices = indices.reshape(width * height, kernel_width * kernel_height)
+    indices.setflags(write=False)
+    return indices
+
+
+def Correlate_2d_cyclic(in_vector: VectorType, kern: VectorType, width: int, height: int, kernel_width: int, kernel_height: int, out_vector: VectorType):
+    """
+    Vectorised cyclic 2D correlation with one kernel PER CELL (as in the original C implementation,
+    see Correlate_2d_cyclic_original_C), on a 2D data structure represented as a 1D array.
+
+    kern holds the width*height kernels of kernel_width*kernel_height taps each, either linearised
+    (kernel of cell ij at kern[ij*kxy:(ij+1)*kxy]) or as a (width*height, kxy) matrix. The input is
+    gathered through the precomputed cyclic_gather_indices and reduced against all kernels in a
+    single einsum, which takes well under a millisecond for a 25x25 area with 19x19 kernels.
+    """
+    n = width * height
+    indices = cyclic_gather_indices(width, height, kernel_width, kernel_height)
+    kernels = np.reshape(kern, (-1,))[:n * indices.shape[1]].reshape(n, -1)
+
+    out_vector[:n] = np.einsum('ij,ij->i', kernels, np.asarray(in_vector)[indices])
+    return out_vector
+
+
 def Correlate_2d_Uni_cyclic(in_matrix: VectorType, kern: VectorType, x: int, y: int, kx: int, ky: int, out: VectorType):
     """
-    This replicates the original C implementation, which does work for 1d numpy arrays.
+    This replicates the original C implementation, which does work for 1d numpy arrays (scalar
+    reference: the model uses SharedKernelCorrelation).
     Performs a cyclic correlation operation between the input matrix and the uniform kernel, 
     taking into account the cyclic boundary conditions, and stores the result in the output matrix
     """
@@ -95,3 +137,127 @@ def Correlate_2d_Uni_cyclic(in_matrix: VectorType, kern: VectorType, x: int, y:
                     h += pkern[kern_index] * in_matrix[in_index]
             out[i * x + j] = h
     return out
+
+
+class SharedKernelCorrelation:
+    """
+    Cyclic 2D correlation of any number of areas with ONE kernel shared by all cells (the same
+    result as Correlate_2d_Uni_cyclic, applied to each area), e.g. the inhibitory kernel Jinh.
+
+    The kernel is analysed once, when the object is created, and the cheapest method is picked:
+    separable    -- the kernel is the outer product of two 1D kernels (e.g. a Gaussian): a pass
+                    of kx taps along the rows, then one of ky taps along the columns
+    shifts       -- small kernels: sum of the kx*ky (cyclically) shifted areas, weighted
+    fft          -- large kernels: product of the spectra (correlation theorem)
+    All methods work on all the areas of the input at once.
+    """
+
+    FFT_MIN_TAPS = 36  # kernels with at least as many taps use the FFT (if not separable)
+    RANK_TOL = 1e-12   # relative tolerance of the separability check
+
+    def __init__(self, kern: VectorType, width: int, height: int, kernel_width: int, kernel_height: int, method: str = None):
+        self.width = width
+        self.height = height
+        self.kernel = np.array(np.reshape(kern, (-1,))[:kernel_width * kernel_height],
+                               dtype=float).reshape(kernel_height, kernel_width)
+        # wrap-around margins (see Correlate_2d_Uni_cyclic)
+        self.pad = ((kernel_height - 1) // 2, kernel_height // 2,
+                    (kernel_width - 1) // 2, kernel_width // 2)
+
+        u, sv, vt = np.linalg.svd(self.kernel)
+        separable = sv.size < 2 or sv[1] <= self.RANK_TOL * sv[0]
+        if method is None:
+            if separable:
+                method = 'separable'
+            elif self.kernel.size >= self.FFT_MIN_TAPS:
+                method = 'fft'
+            else:
+                method = 'shifts'
+        self.method = method
+
+        if method == 'separable':
+            self.column_taps = u[:, 0] * sv[0]
+            self.row_taps = vt[0]
+        elif method == 'fft':
+            # cyclic (height x width) version of the kernel, tap (k,l) at offset (k,l)
+            full = np.zeros((height, width))
+            for k in range(kernel_height):
+                for l in range(kernel_width):
+                    full[(k - self.pad[0]) % height, (l - self.pad[2])
+                         % width] += self.kernel[k, l]
+            self.spectrum = np.conj(np.fft.rfft2(full))
+        elif method != 'shifts':
+            raise ValueError(f"Unknown correlation method '{method}'")
+
+    def _wrapped(self, areas: np.ndarray) -> np.ndarray:
+        top, bottom, left, right = self.pad
+        return np.pad(areas, ((0, 0), (top, bottom), (left, right)), mode='wrap')
+
+    def __call__(self, in_vector: VectorType, out_vector: VectorType) -> VectorType:
+        """
+        Correlates every area of in_vector (n areas of width*height cells, linearised one after the
+        other) with the kernel, into out_vector (same layout)
+        """
+        cells = self.width * self.height
+        n = np.size(in_vector) // cells
+        areas = np.reshape(in_vector, (n, self.height, self.width))
+        out = np.reshape(out_vector, (-1,))[:n * cells].reshape(n, self.height, self.width)
+
+        if self.method == 'separable':
+            padded = self._wrapped(areas)
+            rows = np.zeros((n, padded.shape[1], self.width))
+            for l, tap in enumerate(self.row_taps):
+                rows += tap * padded[:, :, l:l + self.width]
+            out[...] = 0.0
+            for k, tap in enumerate(self.column_taps):
+                out += tap * rows[:, k:k + self.height, :]
+        elif self.method == 'shifts':
+            padded = self._wrapped(areas)
+            out[...] = 0.0
+            for k in range(self.kernel.shape[0]):
+                for l in range(self.kernel.shape[1]):
+                    out += self.kernel[k, l] * \
+                        padded[:, k:k + self.height, l:l + self.width]
+        else:
+            out[...] = np.fft.irfft2(np.fft.rfft2(areas) * self.spectrum,
+                                     s=(self.height, self.width))
+        return out_vector
+
+
+class CyclicCSR:
+    """
+    Compressed Sparse Row (CSR) index of the synapses that exist (i.e. are <> NO_SYNAPSE) in a
+    block of per-cell kernels, as returned by StandardNet6Areas.get_kernels.
+
+    Row ij holds the synapses of cell ij: indptr[ij]:indptr[ij+1] delimits them in synapses (their
+    position in the linearised kernel block) and presyn (the precomputed index of the cell, in the
+    cyclic input area, each of them receives from). The weights themselves stay in the kernel block,
+    so the index stays valid as long as no synapse is created or removed (learning never does).
+    """
+
+    def __init__(self, kern: VectorType, width: int, height: int, kernel_width: int, kernel_height: int, no_synapse: float = 0.0):
+        n = width * height
+        indices = cyclic_gather_indices(width, height, kernel_width, kernel_height)
+        kernels = np.reshape(kern, (-1,))[:n * indices.shape[1]]
+
+        self.n = n
+        self.synapses = np.flatnonzero(kernels != no_synapse)
+        self.rows = self.synapses // indices.shape[1]
+        self.presyn = indices.reshape(-1)[self.synapses]
+        self.indptr = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(self.rows, minlength=n), out=self.indptr[1:])
+
+    @property
+    def nnz(self) -> int:
+        return self.synapses.size
+
+
+def Correlate_2d_cyclic_sparse(in_vector: VectorType, kern: VectorType, csr: CyclicCSR, out_vector: VectorType):
+    """
+    Same as Correlate_2d_cyclic, but only visits the synapses indexed by csr (see CyclicCSR), so the
+    work scales with the number of real synapses rather than with the number of potential ones.
+    """
+    weights = np.reshape(kern, (-1,))[csr.synapses]
+    out_vector[:csr.n] = np.bincount(
+        csr.rows, weights=weights * np.asarray(in_vector)[csr.presyn], minlength=csr.n)
+    return out_vector
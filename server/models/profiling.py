@@ -0,0 +1,101 @@
+import contextlib
+import time
+import numpy as np
+
+"""
+Per-stage profiling of the simulation step (see StandardNet6Areas.step), e.g.
+
+    with self.profiler.stage('learning'):
+        self.compute_learning(hrate)
+
+Each stage keeps counters (calls, total and max. time) and a rolling window of its latest
+durations, from which snapshot() computes percentiles and a (log-spaced) latency histogram.
+When the profiler is disabled, stage() returns a shared no-op context manager: the cost is
+one method call per stage.
+"""
+
+WINDOW = 1024  # no. of latest durations kept per stage
+
+# edges of the latency histograms, in ms: 8 buckets per decade from 1us to 10s
+HISTOGRAM_EDGES_MS = np.logspace(-3, 4, 7 * 8 + 1)
+
+NO_STAGE = contextlib.nullcontext()
+
+
+class StageTimer:
+    __slots__ = ('durations', 'count', 'total', 'max', 'start')
+
+    def __init__(self, window: int):
+        self.durations = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record(time.perf_counter() - self.start)
+        return False
+
+    def record(self, duration: float):
+        """
+        Adds a duration (seconds) to the counters and to the rolling window
+        """
+        self.durations[self.count % self.durations.size] = duration
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def summary(self) -> dict:
+        """
+        Counters (over all calls) and latency percentiles & histogram (over the window), in ms
+        """
+        latest = self.durations[:min(self.count, self.durations.size)] * 1000
+        p50, p90, p99 = np.percentile(latest, (50, 90, 99)) if latest.size else (0.0, 0.0, 0.0)
+        counts, _ = np.histogram(latest, bins=HISTOGRAM_EDGES_MS)
+        return {
+            'count': self.count,
+            'total ms': self.total * 1000,
+            'mean ms': self.total * 1000 / self.count if self.count else 0.0,
+            'max ms': self.max * 1000,
+            'window': int(latest.size),
+            'p50 ms': float(p50),
+            'p90 ms': float(p90),
+            'p99 ms': float(p99),
+            'histogram': counts.tolist(),
+        }
+
+
+class StageProfiler:
+    def __init__(self, enabled: bool = False, window: int = WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.timers = dict()
+
+    def stage(self, name: str):
+        """
+        Context manager timing one run of stage name (a no-op if the profiler is disabled)
+        """
+        if not self.enabled:
+            return NO_STAGE
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = StageTimer(self.window)
+        return timer
+
+    def reset(self):
+        self.timers = dict()
+
+    def snapshot(self) -> dict:
+        """
+        Summary of every stage timed so far (see StageTimer.summary), in the order first timed
+        """
+        return {
+            'enabled': self.enabled,
+            'histogram edges ms': HISTOGRAM_EDGES_MS.tolist(),
+            'stages': {name: timer.summary() for name, timer in list(self.timers.items())},
+        }
@@ -0,0 +1,59 @@
+import numpy as np
+
+"""
+Random numbers of the model (see StandardNet6Areas.rng).
+
+One seed gives one independent NumPy Generator (counter-based Philox bit generator) per
+named stream, so that e.g. changing how the input noise is drawn does not change the
+synapses or the sequence of training patterns of a seeded run. Every stream draws whole
+arrays per call, e.g. rng['input noise'].random(N1).
+"""
+
+STREAMS = (
+    'synapse init',       # kernels (init_patchy_gauss_kern)
+    'input patterns',     # sensory & motor input patterns (gener_random_bin_patterns)
+    'input noise',        # white noise in the input areas
+    'membrane noise',     # noise in the excit. cells' membrane potentials
+    'pattern selection',  # patterns presented during training
+    'lesioning',          # cells damaged by dilution
+)
+
+
+class RandomStreams:
+    def __init__(self, seed: int = None):
+        self.seed(seed)
+
+    def seed(self, seed: int = None):
+        """
+        (Re)creates all the streams from seed (None: fresh entropy from the OS)
+        """
+        sequence = np.random.SeedSequence(seed)
+        self.entropy = sequence.entropy
+        self.streams = {name: np.random.Generator(np.random.Philox(child))
+                        for name, child in zip(STREAMS, sequence.spawn(len(STREAMS)))}
+
+    def __getitem__(self, name: str) -> np.random.Generator:
+        return self.streams[name]
+
+    def get_state(self) -> dict:
+        """
+        State of all the streams, as plain (JSON-serialisable) values
+        """
+        def plain(value):
+            if isinstance(value, dict):
+                return {key: plain(item) for key, item in value.items()}
+            if isinstance(value, np.ndarray):
+                return value.tolist()
+            return value
+
+        return {name: plain(stream.bit_generator.state) for name, stream in self.streams.items()}
+
+    def set_state(self, state: dict):
+        """
+        Restores the streams from get_state()
+        """
+        if set(state) != set(self.streams):
+            raise ValueError(
+                f'Expected the state of the streams {list(self.streams)}')
+        for name, stream in self.streams.items():
+            stream.bit_generator.state = state[name]
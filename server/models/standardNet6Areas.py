@@ -1,9 +1,13 @@
+import hashlib
 import io
+import os
 import numpy as np
 import random
 import math
 import logging
-from . import util, correlation
+from . import util, correlation, checkpoint
+from .profiling import StageProfiler
+from .random_streams import RandomStreams
 import json
 
 
@@ -20,7 +24,7 @@ class StandardNet6Areas:
     AREA6 = 5
     AREA7 = 6
 
-    P = 12  # no. of differnt pattern-ntuples to be learnt
+    P = 12  # no. of differnt pattern-ntuples to be learnt (per network: set before main_init)
 
     CA_THRESH = 0.5  # threshold used to define a CA
 
@@ -35,6 +39,10 @@ class StandardNet6Areas:
     NSQR1 = (N1*N1)  # no. of (possible) synapses between 2 areas
 
     NONES = 19  # no. of "1"s in each random input pattern
+    # max. no. of "1"s shared by two input patterns (None: no constraint), and max. no. of
+    # rounds of moving the "1"s of the patterns that share more, to meet it
+    MAX_PATTERN_OVERLAP: int = None
+    PATTERN_REPAIRS = 1000
 
     STEPSIZE = 0.5  # "delta-t" of the simulation
 
@@ -59,6 +67,16 @@ class StandardNet6Areas:
     r0 = 0.003
     r1 = 0.5
 
+    # Seed of ALL the random numbers of the model (see random_streams), applied
+    # by main_init() (None: not reproducible)
+    seed: int = None
+    rng: RandomStreams
+
+    # Per-stage timings of step() (see profiling), created by main_init();
+    # PROFILE: whether they are recorded from the start (cheap when off)
+    PROFILE = False
+    profiler: StageProfiler
+
     def SFUNC(self, x: float):
         return util.bool_noise(self.r0+self.r1*util.TLIN(x))
 
@@ -114,11 +132,49 @@ class StandardNet6Areas:
 
     NO_SYNAPSE = 0.0
 
+    # If True, init() also builds a CSR index of the synapses that exist in #
+    # each projection, so that EPSPs & learning only visit real synapses    #
+
+    SPARSE_SYNAPSES = False
+
     # File names for Saving / Loading net data #
 
     NET_WR = "net%d.dat"
     NET_RD = "net.dat"
-    CA_WR = "CA-structure.txt"
+    CA_WR = "CA-structure.txt"  # (in net_dir, like the net files)
+
+    net_dir: str = '.'  # where net files are saved/loaded (None: no saving)
+
+    # Cache of the initial kernels: init() saves the kernels it draws to, or loads  #
+    # them from, KERNEL_CACHE_DIR, per seed, kernel parameters & K (None: no cache) #
+
+    KERNEL_CACHE_DIR: str = None
+    KERNEL_CACHE_FILE = "kernels-%s.dat"
+    KERNEL_CACHE_VERSION = 1  # to be bumped whenever the kernels are drawn differently
+
+    # Pattern-specific state (one block per pattern in avg_patts, ca_patts...) #
+    # The averages can be kept in single precision (np.float32: half the memory,  #
+    # for large P), and the overlaps are computed from a float copy of the CAs  #
+    # (ca_patts_float), only updated for the CAs that changed                   #
+
+    AVG_PATTS_DTYPE = util.BaseType
+
+    # What is saved to / loaded from a network file #
+
+    NET_ARRAYS = ('J', 'Jinh', 'pot', 'inh', 'adapt', 'rates', 'slowinh', 'avg_patts',
+                  'ca_patts', 'above_hstory', 'diluted', 'sensPatt', 'motorPatt',
+                  'freq_distrib', 'tot_LTP', 'tot_LTD')
+    NET_COUNTERS = ('stp', 'last_stp', 'training_phase', 'stps_2b_avgd', 'spatno',
+                    'slrate', 'total_output')
+    NET_MMAP = ('J',)  # memory-mapped (rather than read) when loading a network
+    NET_DELTA = ('J',)  # only changed blocks are written to incremental network files
+
+    # Every FULL_SAVE_CYCLE-th save of the net is a full snapshot, the others are
+    # incremental: they only hold the weight blocks changed since the last full one
+    # (0: all saves are full snapshots)
+    FULL_SAVE_CYCLE = 0
+    net_base: str = None  # last full snapshot (base of the incremental saves)
+    net_saves: int = 0    # no. of saves through checkpoint_net()
 
     ## For AUTOMATED TRAINING of the net ##
     # TODO these are the original values, but I've reduced them temporarily to demo the automated training
@@ -173,8 +229,14 @@ class StandardNet6Areas:
     rates: util.VectorType      # firing rates (output) of excitatory cells
     # time-average of cells' f.rates (pattern specific)
     avg_patts: util.VectorType
+    # patterns whose averages changed since their CAs were last computed
+    avg_patts_changed: np.ndarray
     # overlaps between emerging CA patts. (in each area)
     ca_ovlps: util.VectorType
+    # ...as sent to the GUI (NAREAS x P x P nested list, None: to be re-built from ca_ovlps)
+    ca_ovlps_list: list = None
+    # no. of times ca_ovlps changed (the GUI is only sent the overlaps again when they did)
+    ca_ovlps_version: int = 0
     # "   " betw. current activity & CA patts. ("   " )
     ovlps: util.VectorType
 
@@ -188,12 +250,14 @@ class StandardNet6Areas:
     # Fixed input patterns (NYAREAS x P) to the right
     motorPatt: util.bVectorType
 
-    # Post-syn. potentials in input to area
+    # Post-syn. potentials in input to ALL areas (scratch buffers, NAREAS x N1)
     linkffb: util.VectorType
     linkrec: util.VectorType
     linkinh: util.VectorType
     tempffb: util.VectorType    # auxiliary (EPSPs from diff. areas)
-    clampSMIn: util.VectorType  # Incoming sesnory OR motor input to one area
+    clampSMIn: util.VectorType  # Incoming sesnory OR motor input to each area
+    tempexc: util.VectorType    # auxiliary (tot. input to excit. cells)
+    tempnoise: util.VectorType  # auxiliary (membrane noise of excit. cells)
 
     slowinh: util.VectorType  # slow inhib (1 cell per area)
 
@@ -202,6 +266,7 @@ class StandardNet6Areas:
     above_hstory: util.bVectorType   # "history" of above_thresh vector activation
 
     ca_patts: util.bVectorType   # CA patterns emerging as a result of the training
+    ca_patts_float: util.VectorType  # ...as floats, (NAREAS, P, N1) (see update_CApatts_float)
 
     # Sum of synaptic weight *increase* (in each area)
     tot_LTP: util.VectorType
@@ -213,11 +278,8 @@ class StandardNet6Areas:
     # Matrix specifying the network's Connectivity structure #
     # A "1" at coord. (x,y) means Area #x ==> Area #y
     # Note: keeping this 1d in the spirit of "like for like" translation
-    # (Since each area has 625 cells, there are 625 * 625 area-to-area cellular connections
-    # So if you want to index a particular connection in the entire network, in 1d:
-    # E.g get index of connection between cell 500 and cell 200 in areas 2 and 3:
-    # self.J[500*200*(6*2*3)] -> index is 1,500,000
-    # total connections is 625*625*36 = 14,062,500)
+    # (Only the enabled links get kernels in J: e.g. the kernel of cell 200 of
+    # area 3 receiving from area 2 is self.get_kernels(1, 2)[200])
     K: util.bVectorType = np.array([
         # (to area)
         # 1, 2, 3, 4, 5, 6
@@ -230,12 +292,21 @@ class StandardNet6Areas:
     ])
 
     # ALL KERNELS of the network are (linearly) stored in J[].
-    # Each "element" is a vector of NSQR1 values (syn. weights)
-    # J[Row,Col] = kernel/links FROM area (Row) TO area (Col)
+    # Only the projections enabled in K are stored: each one is a block of
+    # N1 kernels of mx*my syn. weights (one kernel per cell of the TO area).
+    # J_offsets[(Row,Col)] = start of the kernels FROM area (Row) TO area (Col)
+    # Use get_kernels(Row, Col) to access them as a (N1, mx*my) matrix
     J: util.VectorType
+    J_offsets: dict
+
+    # In sparse mode, J_sparse[(Row,Col)] indexes the existing synapses of the
+    # kernels FROM area (Row) TO area (Col) (see correlation.CyclicCSR)
+    J_sparse: dict
 
     # Contains the ONE and only inhibitory (Gauss.) kernel
     Jinh: util.VectorType
+    # ...and its (batched, all areas at once) correlation, see prepare_inhibitory_kernel
+    Jinh_correlation: correlation.SharedKernelCorrelation
 
     ## GUI variables - not in the original C implementation ##
 
@@ -275,6 +346,32 @@ class StandardNet6Areas:
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.DEBUG)
 
+    def kernel_dims(self, origin: int, dest: int):
+        """
+        x/y sizes (mx, my) of the kernels projecting from area origin to area dest
+        (0-based): recurrent kernels if origin == dest, forward/backward kernels otherwise
+        """
+        if origin == dest:
+            return self.NREC1, self.NREC2
+        return self.NFFB1, self.NFFB2
+
+    def get_kernels(self, origin: int, dest: int) -> util.VectorType:
+        """
+        All the kernels of the projection from area origin to area dest (0-based), as a
+        (N1, mx*my) view into J: row ij is the kernel of cell ij in area dest.
+        Raises KeyError if the projection is not enabled in K.
+        """
+        mx, my = self.kernel_dims(origin, dest)
+        start = self.J_offsets[(origin, dest)]
+        return self.J[start:start + self.N1 * mx * my].reshape(self.N1, mx * my)
+
+    def pattern_view(self, v: np.ndarray) -> np.ndarray:
+        """
+        A pattern-specific vector (e.g. avg_patts, ca_patts) as a (P, NAREAS, N1) view:
+        [i, area] holds the cells of area for pattern i+1
+        """
+        return v.reshape(self.P, self.NAREAS, self.N1)
+
     def display_K(self):
         """
         Visualise (as text output) the links of connectivity matrix K[].
@@ -292,31 +389,110 @@ class StandardNet6Areas:
         return areaConnections
 
     @staticmethod
-    def gener_random_bin_patterns(n: int, nones: int, p: int, pats: util.bVectorType):
+    def gener_random_bin_patterns(n: int, nones: int, p: int, pats: util.bVectorType, rng: np.random.Generator = None,
+                                  max_overlap: int = None):
         """
         A linearised version of gener_random_bin_patterns. This is the one used. My original translation
         vectorised the structure but this won't work with the rest of the logic, so we stick to linearised structures.
         Instead of returning the patterns matrix (12,625), it returns a 1D NumPy array with shape (12*625, ),
         having a total of 12 * 625 = 7500 elements arranged consecutively in a single dimension.
         Each block of 625 elements represents a single pattern.
+
+        Each pattern gets exactly "nones" 1s, at random positions drawn from rng (default: a new,
+        unseeded generator). If max_overlap is given, no two patterns share more than max_overlap
+        1s: the shared 1s of the patterns that do are moved (at most PATTERN_REPAIRS rounds, then
+        ValueError)
         """
+        if rng is None:
+            rng = np.random.default_rng()
         util.Clear_bVector(pats)  # Clear content of ALL patterns
-        for j in range(p):  # for each pattern
-            start_index = n * j
-            # Get the slice representing the current pattern
-            temp_pat = pats[start_index:start_index + n]
-
-            # Randomly set "nones" number of elements to 1
-            random_indices = np.random.choice(n, nones, replace=False)
-            temp_pat[random_indices] = 1
+        patterns = pats[:n * p].reshape(p, n)
+
+        # The positions of the "nones" smallest of n random keys are a uniformly random
+        # choice of "nones" distinct cells (for all patterns in one draw)
+        keys = rng.random((p, n))
+        positions = np.argpartition(keys, nones - 1, axis=1)[:, :nones]  # cells set in each pattern
+
+        if max_overlap is not None:
+            # Move the excess cells that a pattern shares with a pattern it overlaps too much with
+            # (the later pattern of such a pair) to other random cells, then check the moved
+            # patterns (only their pairs can overlap too much now), and so on
+            partners, targets, shared = StandardNet6Areas.shared_cells(positions)
+            for _ in range(StandardNet6Areas.PATTERN_REPAIRS):
+                excess = shared - max_overlap
+                if not np.any(excess > 0):
+                    break
+                # one pair per pattern to move cells of (the others in the next rounds)
+                pairs = np.flatnonzero(excess > 0)
+                changed, first_pair = np.unique(targets[pairs], return_index=True)
+                pairs = pairs[first_pair]
+
+                # A random choice of excess[pair] of the cells shared with the partner
+                common = (positions[changed][:, :, None] ==
+                          positions[partners[pairs]][:, None, :]).any(axis=2)
+                order = rng.random(common.shape)
+                order[~common] = 2.0
+                ranks = np.argsort(np.argsort(order, axis=1), axis=1)
+                moved = ranks < excess[pairs][:, None]
+
+                # The kept cells have the smallest keys (drawn again), the moved ones the largest
+                keys = rng.random((changed.size, n))
+                keys[np.arange(changed.size)[:, None], positions[changed]] = np.where(
+                    moved, np.inf, -1.0)
+                positions[changed] = np.argpartition(keys, nones - 1, axis=1)[:, :nones]
+
+                targets, partners, shared = StandardNet6Areas.shared_cells(positions, changed)
+            else:
+                raise ValueError(
+                    f'Could not draw {p} patterns of {nones} in {n} cells sharing at most {max_overlap}')
 
-            # Ensure exactly "nones" number of 1s in the pattern
-            while np.sum(temp_pat) < nones:  # inefficient, but fast enough
-                random_index = np.random.randint(0, n)
-                temp_pat[random_index] = 1
+        np.put_along_axis(patterns, positions, 1, axis=1)
 
         return pats
 
+    @staticmethod
+    def shared_cells(positions: np.ndarray, patterns: np.ndarray = None):
+        """
+        The pairs of binary patterns sharing cells, and how many cells each pair shares, from
+        the cells set in each pattern: only the patterns that set the same cell are paired (no
+        comparison of all the p*p pairs, most of which share nothing when the patterns are sparse)
+
+        Keyword arguments:
+        positions  -- (p, nones) cells set in each pattern
+        patterns   -- indices of the patterns of interest: only their pairs are returned (None: all)
+
+        Returns (first, second, shared): patterns first[k] and second[k] share shared[k] cells
+        (each pair once, with first < second; or, given patterns, first is one of them)
+        """
+        p, nones = positions.shape
+
+        # All the set bits, grouped by cell (and by pattern within a cell)
+        order = np.argsort(positions.ravel(), kind='stable')
+        cells = positions.ravel()[order]
+        owners = order // nones
+
+        if patterns is None:
+            # Each set bit pairs with the later ones of the same cell
+            starts = np.arange(1, cells.size + 1)
+            counts = np.searchsorted(cells, cells, side='right') - starts
+            first = np.repeat(owners, counts)
+        else:
+            # Each set bit of the patterns pairs with all the ones of the same cell
+            patterns = np.asarray(patterns)
+            wanted = positions[patterns].ravel()
+            starts = np.searchsorted(cells, wanted, side='left')
+            counts = np.searchsorted(cells, wanted, side='right') - starts
+            first = np.repeat(np.repeat(patterns, nones), counts)
+        offsets = np.arange(first.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = owners[np.repeat(starts, counts) + offsets]
+
+        if patterns is not None:
+            others = first != second
+            first, second = first[others], second[others]
+
+        pairs, shared = np.unique(first * p + second, return_counts=True)
+        return pairs // p, pairs % p, shared
+
     def init_gaussian_kernel(self, nx: int, ny: int, mx: int, my: int, J: np.ndarray, sigmax: float, sigmay: float, ampl: float):
         """Initializes nx*ny kernels of size mx*my in the Array J with Gaussian
         profile - sigmax and sigmay are standard deviations of the Gaussian in x
@@ -346,17 +522,16 @@ class StandardNet6Areas:
         h1 = 1.0 / (sigmax * sigmax)
         h2 = 1.0 / (sigmay * sigmay)
 
-        # For this area, set up kernel (0,0)
-        # e.g. 25 x 25 = 625
-        for x in range(mx):
-            for y in range(my):
-                h = (x - cx) * (x - cx) * h1 + (y - cy) * (y - cy) * h2
-                J[y * mx + x:y * mx + x + 1] = ampl * math.exp(-h)
+        # For this area, set up kernel (0,0): element [y, x] is at J[y * mx + x]
+        dx = np.arange(mx) - cx
+        dy = np.arange(my) - cy
+        h = (dy * dy * h2)[:, np.newaxis] + dx * dx * h1
+        kernel = ampl * np.exp(-h)
 
-        # Copy kernel (0,0) to other locations
-        mm = mx * my  # e.g. 19 x 19 = 361
-        for i in range(1, nx * ny):
-            J[i * mm: (i + 1) * mm] = J[:mm]
+        # ...and copy it to all the other locations
+        # e.g. 25 x 25 = 625 kernels of 19 x 19 = 361
+        mm = mx * my
+        J[:nx * ny * mm].reshape(nx * ny, mm)[...] = kernel.ravel()
 
     def init_patchy_gauss_kern(self, nx: int, ny: int, mx: int, my: int, J: np.ndarray, sigmax: float, sigmay: float, prob: float, upper: float):
         """This routine initializes nx*ny kernels of size mx*my in the Array
@@ -393,15 +568,13 @@ class StandardNet6Areas:
         # First, we compute the probabilities...
         self.init_gaussian_kernel(nx, ny, mx, my, J, sigmax, sigmay, prob)
 
-        # ...then transform them into the requested synaptic values.
+        # ...then transform them into the requested synaptic values
+        # (a synapse exists with probability J[i], with a weight in [0,upper[).
         pot_synapses = nx * ny * mx * my
-        non_zero = 0
-        for i in range(pot_synapses):
-            if util.bool_noise(J[i]):
-                non_zero = non_zero + 1
-                J[i:i+1] = upper * util.equal_noise()
-            else:
-                J[i:i+1] = 0  # NO_SYNAPSE
+        rng = self.rng['synapse init']
+        exists = rng.random(pot_synapses) <= J[:pot_synapses]
+        weights = upper * rng.random(pot_synapses)
+        J[:pot_synapses] = np.where(exists, weights, self.NO_SYNAPSE)
         # print('total potential synapses for area-area:', pot_synapses)
         # print('synapses with non-zero weights:', non_zero)
         # print("% non zero", round((non_zero/pot_synapses)*100))
@@ -418,8 +591,13 @@ class StandardNet6Areas:
         self.logger.info(json.dumps(
             {'func': 'main_init'}, sort_keys=False, indent=4))
 
+        if self.P < 1:
+            raise ValueError(f'P must be at least 1 (got {self.P})')
+
         # Random numbers generation
-        # random.seed(time.time())
+        self.rng = RandomStreams(self.seed)
+
+        self.profiler = StageProfiler(self.PROFILE)
 
         # if STEPSIZE=0.5, noise_fac ~= 6.93
         self.noise_fac = math.sqrt(24.0 / self.STEPSIZE)
@@ -431,13 +609,17 @@ class StandardNet6Areas:
         # M. potential of ALL inhib. cells
         self.inh = util.Get_Vector(self.NAREAS * self.N1)
         # patt.-specific f.rates avg.
-        self.avg_patts = util.Get_Vector(self.NAREAS * self.N1 * self.P)
+        self.avg_patts = np.zeros(self.NAREAS * self.N1 * self.P, dtype=self.AVG_PATTS_DTYPE)
+        self.avg_patts_changed = np.zeros(self.P, dtype=bool)
         # emerging Cell Assemblies
         self.ca_patts = util.Get_bVector(self.NAREAS * self.N1 * self.P)
         # Per-area overlaps betw. CAs
         self.ca_ovlps = util.Get_Vector(self.NAREAS * self.P * self.P)
         # Ovlps. betw. CAs & current activity
         self.ovlps = util.Get_Vector(self.NAREAS * self.P)
+        # ...as floats, area by area (what the overlaps are computed with)
+        self.ca_patts_float = util.Get_Vector(
+            self.NAREAS * self.P * self.N1).reshape(self.NAREAS, self.P, self.N1)
 
         # M. potential of G. Inhib. cells
         self.slowinh = util.Get_Vector(self.NAREAS)
@@ -464,25 +646,37 @@ class StandardNet6Areas:
         # note: in the C version there is `freq_distrib = (int*)calloc( P, sizeof(int) )` - Get_bVector is not used
         self.freq_distrib = util.Get_bVector(self.P)  # array of freq. pres.
 
-        # Kernels: we allocate bigger arrays than we actually need (each
-        # el. can contain up to NSQR1 synapses = all-to-all connectivity) #
-
-        self.J = util.Get_Vector(self.NAREAS * self.NAREAS *
-                                 self.NSQR1)  # NAREAS*NAREAS couplings
+        # Kernels: one block of N1 kernels (of mx*my synapses each) for
+        # every projection in K, stored back to back in J #
+
+        self.J_offsets = dict()
+        size = 0
+        for j in range(self.NAREAS):  # FROM area
+            for i in range(self.NAREAS):  # TO area
+                if self.K[self.NAREAS * j + i]:
+                    mx, my = self.kernel_dims(j, i)
+                    self.J_offsets[(j, i)] = size
+                    size += self.N1 * mx * my
+        self.J = util.Get_Vector(size)
+        self.J_sparse = dict()
         # 1 inhib. kernel with at most self.N1 links
         self.Jinh = util.Get_Vector(self.N1)
 
-        # Vectors of post-synapt. pot. incoming to each cell of one area #
+        # Vectors of post-synapt. pot. incoming to each cell of ALL areas #
+        # (allocated once, and updated in place at every step)
         # EPSPs from OTHER (between-) areas
-        self.linkffb = util.Get_Vector(self.N1)
+        self.linkffb = util.Get_Vector(self.NAREAS * self.N1)
         # EPSPs from THIS area (recurrent)
-        self.linkrec = util.Get_Vector(self.N1)
+        self.linkrec = util.Get_Vector(self.NAREAS * self.N1)
         # Inh.Post-Syn. Pot from inhib. layer
-        self.linkinh = util.Get_Vector(self.N1)
+        self.linkinh = util.Get_Vector(self.NAREAS * self.N1)
         # auxiliary (used for temp. EPSPs)
         self.tempffb = util.Get_Vector(self.N1)
         # "Clamp" input from sensorimotor patt.
-        self.clampSMIn = util.Get_Vector(self.N1)
+        self.clampSMIn = util.Get_Vector(self.NAREAS * self.N1)
+        # auxiliary (tot. input & noise of excit. cells)
+        self.tempexc = util.Get_Vector(self.NAREAS * self.N1)
+        self.tempnoise = util.Get_Vector(self.NAREAS * self.N1)
 
     def resetNet(self):
         """
@@ -507,20 +701,32 @@ class StandardNet6Areas:
 
         self.total_output = 0.0
 
-    def init(self):
+    def init(self, progress=None):
         """
         init() is called whenever "INIT" or "RUN" buttons in the GUI are
         pressed; it initialises individual simulation runs
+
+        Keyword arguments:
+        progress  -- called as progress(done, total, (origin, dest)) after initialising the
+                     kernels of each projection, e.g. to report it to the GUI (with no
+                     projection, and done == total, if the kernels come from the cache)
         """
         self.logger.info(json.dumps(
             {'func': 'init'}, sort_keys=False, indent=4))
 
+        # a new run: the next save is a full snapshot
+        self.net_base = None
+        self.net_saves = 0
+
         util.Clear_Vector(self.pot)
         util.Clear_Vector(self.rates)
         util.Clear_Vector(self.adapt)
         util.Clear_Vector(self.avg_patts)
+        self.avg_patts_changed[:] = False
         util.Clear_bVector(self.ca_patts)
+        util.Clear_Vector(self.ca_patts_float)
         util.Clear_Vector(self.ca_ovlps)
+        self.invalidate_ca_ovlps()
         util.Clear_Vector(self.ovlps)
         util.Clear_bVector(self.diluted)
         util.Clear_Vector(self.inh)
@@ -540,36 +746,46 @@ class StandardNet6Areas:
 
         ## Randomly initialise all sensorimotor input patterns ##
         self.sensPatt = self.gener_random_bin_patterns(
-            self.N1, self.NONES, self.NYAREAS*self.P, self.sensPatt)
+            self.N1, self.NONES, self.NYAREAS*self.P, self.sensPatt, self.rng['input patterns'],
+            self.MAX_PATTERN_OVERLAP)
         self.motorPatt = self.gener_random_bin_patterns(
-            self.N1, self.NONES, self.NYAREAS*self.P, self.motorPatt)
+            self.N1, self.NONES, self.NYAREAS*self.P, self.motorPatt, self.rng['input patterns'],
+            self.MAX_PATTERN_OVERLAP)
 
         ## INITIALISE ALL THE KERNELS ##
-        util.Clear_Vector(self.J)
-
-        # for each of the 36 area-area connections, pass to the kern funcs a slice of J corresponding to its
-        # position in the linear sequence, e.g. for (0,0) pass J[0:390625]
-        # if we just pass J[0:1], the funcs will not be able to modify J at any index beyond 0
-        for j in range(self.NAREAS):
-            for i in range(self.NAREAS):
-                # Does area j have REC. links?
-                if j == i and self.K[(self.NAREAS + 1) * j]:
-                    # we need to pass a slice representing the section of J corresponding to the synapses for this area connection
-                    # so downstream operations modify it in place
-                    # e.g. for the area connection (0,0), J[0:390625]
-                    start_idx = self.NSQR1 * (self.NAREAS * i + i)
-                    self.init_patchy_gauss_kern(self.N11, self.N12, self.NREC1, self.NREC2, self.J[start_idx:start_idx+self.NSQR1],
-                                                self.SIGMAX_REC, self.SIGMAY_REC, self.J_REC_PROB, self.J_UPPER)
-                elif self.K[self.NAREAS * j + i]:  # Does AREA (j+1) --> (i+1)?
-                    start_idx = self.NSQR1 * (self.NAREAS * j + i)
-                    self.init_patchy_gauss_kern(self.N11, self.N12, self.NFFB1, self.NFFB2, self.J[start_idx:start_idx+self.NSQR1],
-                                                self.SIGMAX, self.SIGMAY, self.J_PROB, self.J_UPPER)
+        # (unless this configuration has been initialised before, see KERNEL_CACHE_DIR)
+        projections = len(self.J_offsets)
+        if self.load_cached_kernels():
+            if progress is not None:
+                progress(projections, projections, None)
+        else:
+            util.Clear_Vector(self.J)
+
+            # for each projection in K, pass to the kern funcs the (linearised) view of its kernels in J,
+            # so downstream operations modify it in place
+            done = 0
+            for j in range(self.NAREAS):
+                for i in range(self.NAREAS):
+                    # Does area j have REC. links?
+                    if j == i and self.K[(self.NAREAS + 1) * j]:
+                        self.init_patchy_gauss_kern(self.N11, self.N12, self.NREC1, self.NREC2, self.get_kernels(j, i).ravel(),
+                                                    self.SIGMAX_REC, self.SIGMAY_REC, self.J_REC_PROB, self.J_UPPER)
+                    elif self.K[self.NAREAS * j + i]:  # Does AREA (j+1) --> (i+1)?
+                        self.init_patchy_gauss_kern(self.N11, self.N12, self.NFFB1, self.NFFB2, self.get_kernels(j, i).ravel(),
+                                                    self.SIGMAX, self.SIGMAY, self.J_PROB, self.J_UPPER)
+                    else:
+                        continue
+
+                    done += 1
+                    if progress is not None:
+                        progress(done, projections, (j, i))
+
+            self.cache_kernels()
 
         # logging
-        pot_synapses = self.N1 * \
-            (self.NREC1 * self.NREC1) * (self.NAREAS * self.NAREAS)
-        weighted = sum(self.J > 0)
-        inactive = sum(self.J == 0)
+        pot_synapses = self.J.size
+        weighted = np.count_nonzero(self.J > 0)
+        inactive = pot_synapses - np.count_nonzero(self.J)
         non_zero_percent = round((weighted/pot_synapses)*100)
         inactive_percent = round((inactive/pot_synapses)*100)
         self.logger.info(json.dumps({
@@ -581,9 +797,13 @@ class StandardNet6Areas:
             'inactive synapses (%)': str(inactive_percent),
         }, sort_keys=False, indent=4))
 
+        # In sparse mode, index the synapses that exist in each projection
+        self.index_sparse_synapses()
+
         # There is only 1 inhibitory kernel (FIXED & identical for all)
         self.init_gaussian_kernel(1, 1, self.NINH1, self.NINH2, self.Jinh,
                                   self.SIGMAX_INH, self.SIGMAY_INH, self.J_INH_INIT)
+        self.prepare_inhibitory_kernel()
 
         # If dilute switch is pressed, "damage" the appropriate area(s)
         # ("sdilutearea" slider indicates area to be lesioned; 0==ALL)
@@ -596,8 +816,7 @@ class StandardNet6Areas:
                     # pdil = self.diluted[self.N1 * area]
                     pdil = self.diluted[area*self.N1:(area+1)*self.N1]
                     # A "1" in vector "diluted" will mean that cell is damaged
-                    for i in range(self.N1):
-                        pdil[i] = int(util.bool_noise(h))
+                    pdil[:] = self.rng['lesioning'].random(self.N1) <= h
             self.sdilute = False  # SET_SWITCH(sdilute, FALSE)
 
         self.training_phase = 0  # Init. training phase (used in TRAINING)
@@ -622,14 +841,12 @@ class StandardNet6Areas:
                     # Get addr. of sens. input area for current netw.'s "row"
                     pinput = self.sensInput[self.N1 * j:self.N1 * (j + 1)]
                     # Produce white noise there (noise def. at start of step())
-                    for i in range(self.N1):
-                        pinput[i] = util.bool_noise(noise)
+                    pinput[:] = self.rng['input noise'].random(self.N1) <= noise
 
                     # Get addr. of motor input area for current netw.'s "row"
                     pinput = self.motorInput[self.N1 * j:self.N1 * (j + 1)]
                     # Produce white noise there (noise def. at start of step())
-                    for i in range(self.N1):
-                        pinput[i] = util.bool_noise(noise)
+                    pinput[:] = self.rng['input noise'].random(self.N1) <= noise
 
             # COPY SENSORY PATTERNS to INPUT AREAS
             if self.sSInp and self.spatno < self.P + 1:  # Is there a sens. patt. to be presented?
@@ -666,122 +883,138 @@ class StandardNet6Areas:
             self.sCA_ovlps = False
 
     def compute_new_adaptation(self):
-        for area in range(self.NAREAS):
-            # e.g. 0:625 for area 1, 625:1250 for area 2 etc.
-            prates = self.rates[self.N1 * area:self.N1 * (area + 1)]
-            padapt = self.adapt[self.N1 * area:self.N1 * (area + 1)]
-
-            # Cell's adaptation = low-pass filter of cell's output (f.rate)
-            for i in range(self.N1):
-                padapt[i] = util.leaky_integrate(
-                    self.TAUADAPT, padapt[i], self.ADAPTSTRENGTH * prates[i], self.STEPSIZE)
+        # Cell's adaptation = low-pass filter of cell's output (f.rate), for ALL cells at once
+        util.leaky_integrate_Vector(
+            self.TAUADAPT, self.adapt, self.ADAPTSTRENGTH * self.rates, self.STEPSIZE)
 
     def compute_overlap_between_cell_assemblies_and_current_activity(self):
         """
-        For each area, compute the overlap between the activity and each of the 12 cell assemblies.
+        For each area, compute the overlap between the activity and each of the P cell assemblies,
+        as one (batched over the areas) matrix-vector product with the float copy of the CAs
         """
-        for i in range(self.P):
-            for area in range(self.NAREAS):
-                # e.g. 0:625 for area 1, 625:1250 for area 2 etc.
-                prates = self.rates[self.N1 * area:self.N1 * (area + 1)]
-
-                # e.g. 0:625       for intersection of Area 1 and CA 1  (aka 1st segment of 1st area)
-                # e.g. 44375:45000 for intersection of Area 6 and CA 12 (aka 12th segment of 6th area)
-                pcapatts = self.ca_patts[self.N1 * (
-                    self.NAREAS * i + area):self.N1 * (self.NAREAS * i + (area + 1))]
-
-                self.ovlps[area * self.P + i] = util.bSkalar(
-                    self.N1, prates, pcapatts)
+        np.matmul(self.ca_patts_float, self.rates.reshape(self.NAREAS, self.N1, 1),
+                  out=self.ovlps.reshape(self.NAREAS, self.P, 1))
 
     def compute_firing_rates(self, gain: float, theta: float):
         """
         COMPUTE FIRING RATES (OUTPUTS)
         """
-        self.total_output = 0.0
-        for area in range(self.NAREAS):  # For ALL areas in the network
-            # "Define some helpful pointers (mostly for speed)"
-            ppot = self.pot[self.N1 * area:self.N1 * (area + 1)]
-            prates = self.rates[self.N1 * area:self.N1 * (area + 1)]
-            padapt = self.adapt[self.N1 * area:self.N1 * (area + 1)]
-
-            # self.total_output = 0.0 # TODO i'm not sure we want to do this?
-            for i in range(self.N1):  # For ALL cells in current area
-                prates[i] = self.FUNC(gain * (ppot[i] - theta - padapt[i]))
-                self.total_output += prates[i]  # update total network output
+        # For ALL cells of ALL areas at once (FUNC == RAMP)
+        np.subtract(self.pot, theta, out=self.rates)
+        self.rates -= self.adapt
+        self.rates *= gain
+        util.RAMP_Vector(self.rates, out=self.rates)
+        self.total_output = util.Sum(self.rates)  # total network output
 
     def record_average_responses_during_training(self):
         """
         RECORD AVERAGE RESPONSES DURING TRAINING
         """
         if (self.stps_2b_avgd > 0) and (self.spatno > 0) and (self.spatno < self.P + 1):
-            for area in range(self.NAREAS):
-                # Get addr. of 1st "cell" of pattern-specific averaging array
-                start_index = self.N1 * \
-                    (self.NAREAS * (self.spatno - 1) + area)
-                end_index = self.N1 * \
-                    (self.NAREAS * (self.spatno - 1) + area + 1)
+            # The averages of pattern spatno for ALL areas are one block of NAREAS*N1 cells
+            start_index = self.N1 * self.NAREAS * (self.spatno - 1)
+            prates_avg = self.avg_patts[start_index:start_index +
+                                        self.NAREAS * self.N1]
 
-                prates_avg = self.avg_patts[start_index:end_index]
-
-                # point to f.rate of 1st cell of area
-                prates = self.rates[self.N1 * area: self.N1 * (area + 1)]
-                for i in range(self.N1):  # For all cells of this area
-                    # Integrate cell's current f. rate into its average f. rate
-                    prates_avg[i] = util.leaky_integrate(
-                        self.TAU_AVG_RATES, prates_avg[i], prates[i], self.STEPSIZE)
+            # Integrate cells' current f. rate into their average f. rate
+            util.leaky_integrate_Vector(
+                self.TAU_AVG_RATES, prates_avg, self.rates, self.STEPSIZE)
+            self.avg_patts_changed[self.spatno - 1] = True
 
             self.stps_2b_avgd -= 1  # Averaging is done only for a limited time
 
-    def compute_CAoverlaps(self):
-        for area in range(self.NAREAS):
-            for i in range(self.P):
-                for j in range(self.P):
-                    idx_i = self.N1 * (self.NAREAS * i + area)
-                    idx_j = self.N1 * (self.NAREAS * j + area)
-                    overlap = util.bbSkalar(
-                        self.N1, self.ca_patts[idx_i:idx_i + self.N1], self.ca_patts[idx_j:idx_j + self.N1])
-                    self.ca_ovlps[self.P * (self.P * area + i) +
-                                  j] = overlap / float(self.NONES)
+    def compute_CAoverlaps(self, patterns=None):
+        """
+        Overlaps between all the pairs of CAs, in each area (relative to NONES): the Gram
+        matrices of the areas' CAs, as one (batched over the areas) matrix product
+
+        Keyword arguments:
+        patterns  -- indices (0-based) of the only CAs that changed: only their rows and
+                     columns of the matrices are re-computed (None: all)
+        """
+        ca_patts = self.ca_patts_float
+        ca_ovlps = self.ca_ovlps.reshape(self.NAREAS, self.P, self.P)
+        if patterns is None:
+            np.matmul(ca_patts, ca_patts.transpose(0, 2, 1), out=ca_ovlps)
+            ca_ovlps /= float(self.NONES)
+        else:
+            rows = np.matmul(ca_patts[:, patterns], ca_patts.transpose(0, 2, 1))
+            rows /= float(self.NONES)
+            ca_ovlps[:, patterns, :] = rows
+            ca_ovlps[:, :, patterns] = rows.transpose(0, 2, 1)
+        self.invalidate_ca_ovlps()
+
+    def invalidate_ca_ovlps(self):
+        """
+        To be called whenever ca_ovlps changes: the nested list sent to the GUI is re-built, and
+        the new version of the overlaps is sent to the clients (see SimulationManager)
+        """
+        self.ca_ovlps_list = None
+        self.ca_ovlps_version += 1
+
+    def update_CApatts_float(self, patterns=None):
+        """
+        Copy the CAs of the given patterns from ca_patts to ca_patts_float (the floats the
+        overlaps are computed with); to be called whenever ca_patts changes
+
+        Keyword arguments:
+        patterns  -- indices (0-based) of the only CAs that changed (None: all)
+        """
+        if patterns is None:
+            patterns = slice(None)
+        self.ca_patts_float[:, patterns] = self.pattern_view(self.ca_patts)[patterns].transpose(1, 0, 2)
 
     def write_CApatts(self):
         try:
-            with open(self.CA_WR, 'a') as fiCA:  # Open the file for append (or writing)
+            # tot. no. of CA cells, for each CA and area
+            ca_sizes = self.pattern_view(self.ca_patts).sum(axis=2)
+            ca_wr = os.path.join(self.net_dir or '', self.CA_WR)
+            with open(ca_wr, 'a') as fiCA:  # Open the file for append (or writing)
                 for i in range(self.P):  # For all CAs (patterns)
                     fiCA.write(f" \n CA #{i + 1}: ")
                     for area in range(self.NAREAS):  # for all areas
-                        start_idx = self.N1 * (self.NAREAS * i + area)
-                        end_idx = self.N1 * (self.NAREAS * i + area + 1)
-
                         # Write to file tot. no. of CA cells for this CA and area
-                        sum_cells = util.bSum(
-                            self.N1, self.ca_patts[start_idx: end_idx])
-                        fiCA.write(f"{sum_cells} ")
+                        fiCA.write(f"{ca_sizes[i, area]} ")
                 print("\n\n")
         except IOError:
             print(
-                f"\n ERROR: Could not open file '{self.CA_WR}' for writing.\n")
+                f"\n ERROR: Could not open file '{ca_wr}' for writing.\n")
 
-    def compute_CApatts(self, threshold):
+    def compute_CApatts(self, threshold, patterns=None):
         """
-        Compute the emerging Cell Assemblies using specified threshold
+        Compute the emerging Cell Assemblies using specified threshold, for all the
+        patterns and areas at once
 
         Keyword arguments:
         threshold -- IN: threshold used to define a CA
+        patterns  -- indices (0-based) of the only patterns to re-compute the CAs of (None: all)
         """
-        for area in range(self.NAREAS):  # For all areas
-            for i in range(self.P):  # for all input pattern pairs
-                start_idx = self.N1 * (self.NAREAS * i + area)
-                end_idx = start_idx + self.N1
-
-                # Get firing rate of maximally responsive cell in current area
-                max_act = util.Max_Elem(self.avg_patts[start_idx:end_idx])
-
-                # Check if there is at least 1 cell strongly responsive
-                if max_act >= self.MIN_CELLRATE:
-                    # If cell rate > threshold, set cell to 1 in 'ca_patts'
-                    util.Fire(self.N1, self.avg_patts[start_idx:end_idx], threshold*max_act,
-                              self.ca_patts[start_idx:end_idx])
-                # Else: NO cells are set to 1 in the 'ca_patts' vector
+        if patterns is None:
+            patterns = slice(None)
+        avg_patts = self.pattern_view(self.avg_patts)[patterns]
+        ca_patts = self.pattern_view(self.ca_patts)[patterns]
+
+        # Get firing rate of maximally responsive cell, for each pattern in each area
+        max_act = avg_patts.max(axis=2, keepdims=True)
+
+        # Where there is at least 1 cell strongly responsive, the cells with a rate > threshold
+        # are set to 1 in 'ca_patts' (the others to 0)
+        # Else: NO cells are set to 1 in the 'ca_patts' vector (left as they are)
+        np.copyto(ca_patts, avg_patts > threshold * max_act,
+                  where=max_act >= self.MIN_CELLRATE)
+        self.pattern_view(self.ca_patts)[patterns] = ca_patts  # (a copy, if patterns are indices)
+        self.update_CApatts_float(patterns)
+        self.avg_patts_changed[patterns] = False
+
+    def compute_changed_CAs(self):
+        """
+        Re-compute the CAs (and their overlaps) of the patterns whose average responses
+        changed since their CAs were last computed: during training, the one (or two)
+        patterns presented since, rather than all P
+        """
+        patterns = np.flatnonzero(self.avg_patts_changed)
+        self.compute_CApatts(self.CA_THRESH, patterns)
+        self.compute_CAoverlaps(patterns)
 
     def train_projection_cyclic(self, pre, post_pot, J, nx, ny, mx, my, hrate, totLTP, totLTD):
         """Train" all the synapses connecting area X to area Y (incl. X==Y)
@@ -789,29 +1022,42 @@ class StandardNet6Areas:
         Keyword arguments:
         pre       -- IN: area X cells' firing rates (output)
         post_pot  -- IN: area Y cells' memb. potentials
-        J         -- IN/OUT: all the kernels connecting X to Y
+        J         -- IN/OUT: all the kernels connecting X to Y, as a (nx*ny, mx*my) matrix (see get_kernels)
         nx, ny    -- IN: area dimensions (2 areas of same size)
         mx, my    -- IN: kernels' x and y's dimensions
         hrate     -- IN: learning rate (weight increm/decrem.)
         totLTP    -- OUT: tot. amount of LTP (PYTHON: pass in slice containing a single index, mutate in place, e.g. self.tot_LTP[i:i+1])
         totLTD    -- OUT: tot. amount of LTD (PYTHON: pass in slice containing a single index, mutate in place, e.g. self.tot_LTD[i:i+1])
+
+        All the synapses are updated at once: the pre-synaptic rates seen by every kernel
+        are gathered into a (nx*ny, mx*my) matrix, and apply_learning_rule works on it,
+        the kernels and the post-synaptic potentials (broadcast along each kernel).
+        """
+        kern = J.reshape(nx * ny, mx * my)  # One kernel per cell in area Y
+        pre_D = pre[correlation.cyclic_gather_indices(nx, ny, mx, my)]
+
+        self.apply_learning_rule(
+            kern, pre_D, post_pot[:, None], hrate, totLTP, totLTD)
+
+    def train_projection_cyclic_python(self, pre, post_pot, J, nx, ny, mx, my, hrate, totLTP, totLTD):
+        """Scalar (synapse by synapse) version of train_projection_cyclic, kept
+        as a reference: it takes the same arguments and gives the same results
         """
         kx2 = mx // 2
         ky2 = my // 2
-        mxy = mx * my
-
-        kern = J  # Address of 1st (potential) link between X and Y
 
         for i in range(ny):  # For all cells in area Y
             for j in range(nx):  # ("ij" counts tot. # of cells)
                 ij = i * nx + j
+                kern = J[ij]  # The kernel of cell ij
                 for k in range(-ky2, ky2 + 1):  # For all links of 1 kernel
-                    for l in range(-kx2, kx2 + 1):  # ("kern" counts tot. #links)
+                    for l in range(-kx2, kx2 + 1):  # ("kl" counts the links)
                         m = ((i + k + ny) % ny) * nx + \
                             (j + l + nx) % nx  # Get index of cell in X
+                        kl = (k + ky2) * mx + (l + kx2)
 
                         # Check if synapse considered "exists" (i.e. is <> 0.0 )
-                        if kern[ij * mxy + k * mx + l] != self.NO_SYNAPSE:
+                        if kern[kl] != self.NO_SYNAPSE:
                             # Synapse exists; update its weight using learning rule
                             # Get pre-synaptic activity (f. rate)
                             pre_D = pre[m]
@@ -820,27 +1066,120 @@ class StandardNet6Areas:
                             if post_pot[ij] > self.LTP_THRESH:
                                 if pre_D > self.F_THRESH:  # Is there suff. pre-syn. activ.?
                                     # Yes; reached MAX syn. weight?
-                                    if kern[ij * mxy + k * mx + l] < self.JMAX:
+                                    if kern[kl] < self.JMAX:
                                         # Not yet: Homosynaptic LTP
-                                        kern[ij * mxy + k * mx + l] += hrate
+                                        kern[kl] += hrate
                                         totLTP += hrate  # Update TOT. amount of LTP
                                 else:  # NO (i.e., pre_D <= F_THRESH)
                                     # Reached MIN synapt. weight?
-                                    if kern[ij * mxy + k * mx + l] > self.JMIN:
+                                    if kern[kl] > self.JMIN:
                                         # Not yet: "low"-homo or hetero LTD
-                                        kern[ij * mxy + k * mx + l] -= hrate
+                                        kern[kl] -= hrate
                                         totLTD += hrate  # Update TOT. amount of LTD
                                         # Make sure not to go below...
-                                        if kern[ij * mxy + k * mx + l] < self.JMIN:
-                                            kern[ij * mxy + k *
-                                                 mx + l] = self.JMIN
+                                        if kern[kl] < self.JMIN:
+                                            kern[kl] = self.JMIN
                             else:  # IN THIS CASE: post_pot <= LTP_THRESH
-                                if (pre_D > self.F_THRESH) and (post_pot[ij] > self.LTD_THRESH) and (kern[ij * mxy + k * mx + l] > self.JMIN):
+                                if (pre_D > self.F_THRESH) and (post_pot[ij] > self.LTD_THRESH) and (kern[kl] > self.JMIN):
                                     # Yes: homosynaptic LTD
-                                    kern[ij * mxy + k * mx + l] -= hrate
+                                    kern[kl] -= hrate
                                     totLTD += hrate  # Update TOT. amount of LTD
-                                    if kern[ij * mxy + k * mx + l] < self.JMIN:
-                                        kern[ij * mxy + k * mx + l] = self.JMIN
+                                    if kern[kl] < self.JMIN:
+                                        kern[kl] = self.JMIN
+
+    def apply_learning_rule(self, w, pre_D, post_pot, hrate, totLTP, totLTD):
+        """Array version of the learning rule applied to each synapse by
+        train_projection_cyclic_python. All arguments are arrays of (or broadcastable
+        to) the same shape, one element per (potential) synapse.
+
+        Keyword arguments:
+        w         -- IN/OUT: synaptic weights (updated in place)
+        pre_D     -- IN: pre-synaptic cells' firing rates
+        post_pot  -- IN: post-synaptic cells' memb. potentials
+        hrate     -- IN: learning rate (weight increm/decrem.)
+        totLTP    -- OUT: tot. amount of LTP (slice containing a single index)
+        totLTD    -- OUT: tot. amount of LTD (slice containing a single index)
+        """
+        exists = w != self.NO_SYNAPSE
+        above_ltp = post_pot > self.LTP_THRESH
+        pre_active = pre_D > self.F_THRESH
+
+        # Homosynaptic LTP (up to JMAX)
+        ltp = exists & above_ltp & pre_active & (w < self.JMAX)
+        # "low"-homo or hetero LTD (above LTP thresh.), homosynaptic LTD (below)
+        ltd = exists & (w > self.JMIN) & np.where(
+            above_ltp, ~pre_active, pre_active & (post_pot > self.LTD_THRESH))
+
+        w[ltp] += hrate
+        w[ltd] -= hrate
+        np.maximum(w, self.JMIN, out=w, where=ltd)  # Make sure not to go below...
+
+        totLTP[0] = util.accumulate_increments(
+            totLTP[0], hrate, np.count_nonzero(ltp))
+        totLTD[0] = util.accumulate_increments(
+            totLTD[0], hrate, np.count_nonzero(ltd))
+
+    def train_projection_sparse(self, pre, post_pot, J, csr, hrate, totLTP, totLTD):
+        """Same as train_projection_cyclic, but only visits the synapses that
+        exist (as indexed by csr, see correlation.CyclicCSR)
+
+        Keyword arguments:
+        pre       -- IN: area X cells' firing rates (output)
+        post_pot  -- IN: area Y cells' memb. potentials
+        J         -- IN/OUT: all the kernels connecting X to Y (see get_kernels)
+        csr       -- IN: index of the existing synapses in J
+        hrate     -- IN: learning rate (weight increm/decrem.)
+        totLTP    -- OUT: tot. amount of LTP (slice containing a single index)
+        totLTD    -- OUT: tot. amount of LTD (slice containing a single index)
+        """
+        kern = J.reshape(-1)
+        w = kern[csr.synapses]
+        self.apply_learning_rule(
+            w, pre[csr.presyn], post_pot[csr.rows], hrate, totLTP, totLTD)
+        kern[csr.synapses] = w
+
+    def train_projection(self, origin, dest, hrate):
+        """Train all the synapses from area origin to area dest (0-based),
+        visiting only the existing ones if the projection is indexed in J_sparse
+        """
+        pre = self.rates[self.N1 * origin:self.N1 * (origin + 1)]
+        post_pot = self.pot[self.N1 * dest:self.N1 * (dest + 1)]
+        totLTP = self.tot_LTP[dest:dest+1]
+        totLTD = self.tot_LTD[dest:dest+1]
+
+        if (origin, dest) in self.J_sparse:
+            self.train_projection_sparse(pre, post_pot, self.get_kernels(origin, dest),
+                                         self.J_sparse[(origin, dest)], hrate, totLTP, totLTD)
+        else:
+            mx, my = self.kernel_dims(origin, dest)
+            self.train_projection_cyclic(pre, post_pot, self.get_kernels(origin, dest),
+                                         self.N11, self.N12, mx, my, hrate, totLTP, totLTD)
+
+    def index_sparse_synapses(self):
+        """In sparse mode (SPARSE_SYNAPSES), index the synapses that exist
+        in each projection of J; otherwise, clear the index
+        """
+        self.J_sparse = dict()
+        if self.SPARSE_SYNAPSES:
+            for (j, i) in self.J_offsets:
+                mx, my = self.kernel_dims(j, i)
+                self.J_sparse[(j, i)] = correlation.CyclicCSR(
+                    self.get_kernels(j, i), self.N11, self.N12, mx, my, self.NO_SYNAPSE)
+
+    def correlate_projection(self, origin, dest, out):
+        """Compute the EPSPs that area origin sends to each cell of area dest (0-based)
+        through their kernels, visiting only the existing synapses if the projection
+        is indexed in J_sparse
+        """
+        pre = self.rates[self.N1 * origin:self.N1 * (origin + 1)]
+
+        if (origin, dest) in self.J_sparse:
+            correlation.Correlate_2d_cyclic_sparse(
+                pre, self.get_kernels(origin, dest), self.J_sparse[(origin, dest)], out)
+        else:
+            mx, my = self.kernel_dims(origin, dest)
+            correlation.Correlate_2d_cyclic(
+                pre, self.get_kernels(origin, dest), self.N11, self.N12, mx, my, out)
 
     def compute_learning(self, hrate):
         if self.slrate > 0:  # Is learning ON?
@@ -853,59 +1192,22 @@ class StandardNet6Areas:
                     # Is ORIGIN == DEST. & does area (j+1) have REC. links?
                     if j == i and self.K[(self.NAREAS + 1) * j] != 0:
                         # Yes: train RECurrent kernel projections for this area
-                        self.train_projection_cyclic(
-                            # pre-syn. rates
-                            self.rates[self.N1 * j:self.N1 * (j + 1)],
-                            # post-syn. pot.
-                            self.pot[self.N1 * i:self.N1 * (i + 1)],
-                            # all (j+1)-->(j+1) kernels
-                            self.J[self.NSQR1 * (self.NAREAS + 1) * j:self.NSQR1 * \
-                                   (self.NAREAS + 1) * (j + 1)],
-                            self.N11, self.N12, self.NREC1, self.NREC2, hrate, self.tot_LTP[i:i+1], self.tot_LTD[i:i+1])
+                        self.train_projection(j, j, hrate)
 
                     # Does area (j+1) proj. to (i+1)?
                     elif self.K[self.NAREAS * j + i] != 0:
-                        self.train_projection_cyclic(
-                            # pre-syn. rates
-                            self.rates[self.N1 * j:self.N1 * (j + 1)],
-                            # post-syn. pot.
-                            self.pot[self.N1 * i:self.N1 * (i + 1)],
-                            # all (j+1)-->(i+1) kernels
-                            self.J[self.NSQR1 * (self.NAREAS * j + i):self.NSQR1 * \
-                                   (self.NAREAS * (j + 1) + i)],
-                            self.N11, self.N12, self.NFFB1, self.NFFB2, hrate, self.tot_LTP[i:i+1], self.tot_LTD[i:i+1])
-
-    @util.time_it
+                        self.train_projection(j, i, hrate)
+
     def compute_new_membrane_potentials(self):
-        for area in range(self.NAREAS):
-            # get the slices of activity for this area (the 625 cells in area)
-            ppot = self.pot[self.N1 * area:self.N1 * (area + 1)]
-            pinh = self.inh[self.N1 * area:self.N1 * (area + 1)]
-            pdil = self.diluted[self.N1 * area:self.N1 * (area + 1)]
-
-            # Clear vectors containing incoming input to current area
-            util.Clear_Vector(self.linkffb)   # From OTHER areas
-            util.Clear_Vector(self.linkrec)   # From THIS area
-            util.Clear_Vector(self.linkinh)   # From inhib. layer
-            # auxiliary (used for OTHER areas)
-            util.Clear_Vector(self.tempffb)
-            # from sensory/OR/motor inp. patt.
-            util.Clear_Vector(self.clampSMIn)
-
-            ### Sensorimotor input ##
+        # Clear vectors containing incoming input to ALL areas
+        util.Clear_Vector(self.linkffb)   # From OTHER areas
+        util.Clear_Vector(self.linkrec)   # From THIS area
 
-            # Is this area (possibly) receiving a sensory pattern as input?
-            if area % self.NXAREAS == self.sSInCol - 1:
-                # Yes: give any current sens. pattern as input to this area
-                for i in range(self.N1):
-                    # Note: sensInput[] is a column of NYAREAS elem. of size N1
-                    self.clampSMIn[i] = self.sSI0 * \
-                        self.sensInput[self.N1 * (area // self.NXAREAS) + i]
-            elif area % self.NXAREAS == self.sMInCol - 1:  # Area receiving motor patt.?
-                for i in range(self.N1):
-                    # NB: motorInput[] is a column of NYAREAS elem. of size N1
-                    self.clampSMIn[i] = self.sMI0 * \
-                        self.motorInput[self.N1 * (area // self.NXAREAS) + i]
+        ### Sensorimotor input ##
+        self.clamp_sensorimotor_input()
+
+        for area in range(self.NAREAS):
+            cells = slice(self.N1 * area, self.N1 * (area + 1))
 
             ### FF/fb (between area) input ###
 
@@ -913,59 +1215,84 @@ class StandardNet6Areas:
                 # Is "j" NOT same as "area" and does area (j+1)-->(area+1)?..
                 if j != area and self.K[self.NAREAS * j + area]:
                     # Compute area (j+1)'s contrib. to TOT. input to (area+1)
-                    correlation.Correlate_2d_cyclic_python(
-                        self.rates[self.N1 * j: self.N1 * (j + 1)],
-                        self.J[self.NSQR1 * (self.NAREAS * j + area)                               : self.NSQR1 * (self.NAREAS * (j + 1) + area)],
-                        self.N11, self.N12, self.NFFB1, self.NFFB2, self.tempffb
-                    )
+                    self.correlate_projection(j, area, self.tempffb)
 
                     # Add this contribution to the TOTAL EPSP to current area
-                    for i in range(self.N1):
-                        self.linkffb[i] = self.tempffb[i]
-
-                    # Reset the temp. vector of results
-                    util.Clear_Vector(self.tempffb)
+                    self.linkffb[cells] += self.tempffb
 
             ### RECurrent (within area) input ###
 
             # Calculate linkrec[i] (total pre-synaptic pot. converging from
             # within-area cells to cell i) for all cells of area "area+1".
             if self.K[(self.NAREAS + 1) * area]:  # Does area have REC links?
-                correlation.Correlate_2d_cyclic_python(
-                    self.rates[self.N1 * area: self.N1 * (area + 1)],
-                    self.J[self.NSQR1 * (self.NAREAS + 1) *
-                           area: self.NSQR1 * (self.NAREAS + 1) * (area + 1)],
-                    self.N11, self.N12, self.NREC1, self.NREC2, self.linkrec
-                )
-
-            ### INHibitory (within area) input ###
-
-            # Calculate linkinh[i] (tot. activity from excitat. cells which
-            # is being projected to each underlying inhibitory cell "i")
-            correlation.Correlate_2d_Uni_cyclic(
-                self.rates[self.N1 * area: self.N1 * (area + 1)],
-                self.Jinh,
-                self.N11, self.N12, self.NINH1, self.NINH2, self.linkinh
-            )
-
-            ### LEAKY INTEGRATIONS ###
-
-            # Inhibitory cells: The total output from excit. cells (linkinh[i]) is now inte-
-            # grated (ie, weight=1) into inhib. cell "i"'s membr. potential
-            for i in range(self.N1):
-                self.linkinh[i] = util.leaky_integrate(
-                    self.TAU2, pinh[i], self.linkinh[i], self.STEPSIZE)
-
-            # Slow/global inhibition/activity control
-            self.slowinh[area] = util.leaky_integrate(self.TAUSLOW, self.slowinh[area], util.Sum(
-                self.rates[self.N1 * area: self.N1 * (area + 1)]), self.STEPSIZE)
-
-            # Excitatory cells
-            for i in range(self.N1):  # For all cells of current area
-                ppot[i] = util.leaky_integrate(self.TAU1, ppot[i], .01 * (self.sI0 + self.clampSMIn[i] + self.sJffb * self.linkffb[i] +
-                                                                          self.sJrec * self.linkrec[i] - self.sJinh * self.FUNCI(pinh[i]) -
-                                                                          self.sJslow * self.slowinh[area] - 1000 * pdil[i] +
-                                                                          self.snoise * self.noise_fac * (util.equal_noise() - .5)), self.STEPSIZE)
+                self.correlate_projection(area, area, self.linkrec[cells])
+
+        ### INHibitory (within area) input ###
+
+        # Calculate linkinh[i] (tot. activity from excitat. cells which
+        # is being projected to each underlying inhibitory cell "i"), for ALL areas at once
+        self.Jinh_correlation(self.rates, self.linkinh)
+
+        self.integrate_membrane_potentials()
+
+    def clamp_sensorimotor_input(self):
+        """
+        "Clamp" input of each area (clampSMIn): the current sensory (motor) input, scaled by
+        sSI0 (sMI0), for the areas in column sSInCol (sMInCol), 0 for the others
+        """
+        util.Clear_Vector(self.clampSMIn)
+
+        for area in range(self.NAREAS):
+            cells = slice(self.N1 * area, self.N1 * (area + 1))
+
+            # Is this area (possibly) receiving a sensory pattern as input?
+            # Note: sensInput[] / motorInput[] are columns of NYAREAS elem. of size N1
+            row = slice(self.N1 * (area // self.NXAREAS),
+                        self.N1 * (area // self.NXAREAS + 1))
+            if area % self.NXAREAS == self.sSInCol - 1:
+                # Yes: give any current sens. pattern as input to this area
+                np.multiply(self.sSI0, self.sensInput[row],
+                            out=self.clampSMIn[cells])
+            elif area % self.NXAREAS == self.sMInCol - 1:  # Area receiving motor patt.?
+                np.multiply(self.sMI0, self.motorInput[row],
+                            out=self.clampSMIn[cells])
+
+    def prepare_inhibitory_kernel(self):
+        """
+        Analyses the (fixed, shared) inhibitory kernel Jinh once, so that every step correlates
+        all areas with it in one batched call (see correlation.SharedKernelCorrelation)
+        """
+        self.Jinh_correlation = correlation.SharedKernelCorrelation(
+            self.Jinh, self.N11, self.N12, self.NINH1, self.NINH2)
+
+    def integrate_membrane_potentials(self):
+        """
+        LEAKY INTEGRATIONS of the input computed by compute_new_membrane_potentials, for
+        ALL cells of ALL areas at once
+        """
+        # Inhibitory cells: The total output from excit. cells (linkinh[i]) is now inte-
+        # grated (ie, weight=1) into inhib. cell "i"'s membr. potential
+        util.leaky_integrate_Vector(
+            self.TAU2, self.inh, self.linkinh, self.STEPSIZE)
+
+        # Slow/global inhibition/activity control
+        util.leaky_integrate_Vector(self.TAUSLOW, self.slowinh, self.rates.reshape(
+            self.NAREAS, self.N1).sum(axis=1), self.STEPSIZE)
+
+        # Excitatory cells (the terms are added in the same order as in the scalar version)
+        total = self.tempexc
+        np.add(self.sI0, self.clampSMIn, out=total)
+        total += self.sJffb * self.linkffb
+        total += self.sJrec * self.linkrec
+        total -= self.sJinh * util.TLIN_Vector(self.inh)
+        total.reshape(self.NAREAS, self.N1)[...] -= (self.sJslow *
+                                                    self.slowinh)[:, None]
+        total -= 1000 * self.diluted
+        noise = self.rng['membrane noise'].random(out=self.tempnoise)
+        noise -= .5
+        total += self.snoise * self.noise_fac * noise
+        total *= .01
+        util.leaky_integrate_Vector(self.TAU1, self.pot, total, self.STEPSIZE)
 
     def manage_network_training(self):
         if self.strainNet:  # Is the "network training" switch pressed?
@@ -984,7 +1311,8 @@ class StandardNet6Areas:
                 if (self.stp - self.last_stp >= self.PAUSE_TIME and self.slowinh[self.SLOWAREA1] < self.MAXINHIB1 and self.slowinh[self.SLOWAREA2] < self.MAXINHIB2):
                     # Pseudo-randomly select a number betw. 1 and P, ensuring
                     # that the patterns freq. distribution is approx. uniform
-                    patt_no = int(1234.56 * util.equal_noise())
+                    patt_no = int(
+                        1234.56 * self.rng['pattern selection'].random())
                     while True:
                         patt_no = (patt_no % self.P) + 1
                         if self.freq_distrib[patt_no - 1] <= self.freq_distrib[(patt_no % self.P)]:
@@ -1020,22 +1348,177 @@ class StandardNet6Areas:
                             self.spatno = self.P + 1
 
                         self.last_stp = self.stp  # Record current time
-                        # re-compute all CAs
-                        self.compute_CApatts(self.CA_THRESH)
-                        self.compute_CAoverlaps()  # re-compute CA overlaps
+                        # re-compute the CAs (and CA overlaps) of the patterns trained since
+                        self.compute_changed_CAs()
                         # Start (or continue) learning
                         # SET_SLIDER(self.slrate, self.LEARN_RATE)
                         self.slrate = self.LEARN_RATE
                         self.training_phase = 1  # GO BACK to PHASE 1
 
             else:  # Otherwise STOP the training (when stp reaches TOT_TRAINING)
+                # Note: the C version exits the program here; we only switch the training
+                # off, so that the server (or a headless training run) can carry on
                 self.strainNet = False  # SET_SWITCH(self.strainNet, False)
                 print("\n End of training phase. \n")
-                exit(0)
 
-    def step(self):
+    def save_net(self, filename: str, incremental: bool = False):
+        """
+        Save the entire network (weights, activity, input patts., training counters and
+        state of the random numbers generators) to a binary file (see checkpoint)
+
+        If incremental (and a full snapshot has been saved before), only the blocks of the
+        weights (NET_DELTA) changed since the last full snapshot are written; the file
+        then needs that snapshot to be loaded (or compacted, see checkpoint.compact).
+        Overwriting the last full snapshot itself always writes a full snapshot.
+        """
+        arrays = {name: getattr(self, name) for name in self.NET_ARRAYS}
+        counters = {name: getattr(self, name) for name in self.NET_COUNTERS}
+
+        if incremental and (self.net_base is None or not os.path.exists(self.net_base) or
+                            os.path.exists(filename) and os.path.samefile(filename, self.net_base)):
+            incremental = False  # (no snapshot to refer to, or it is the file being written)
+
+        if incremental:
+            changed = checkpoint.write_delta(
+                filename, self.net_base, arrays, counters, self.rng.get_state(), self.NET_DELTA)
+            self.logger.info(json.dumps({
+                'op': 'save_net',
+                'file': filename,
+                'base': self.net_base,
+                'changed blocks': changed,
+            }, sort_keys=False, indent=4))
+        else:
+            checkpoint.write(filename, arrays, counters, self.rng.get_state())
+            self.net_base = filename
+
+    def checkpoint_net(self, filename: str):
+        """
+        Periodic save of the network (automated training, headless runs): every
+        FULL_SAVE_CYCLE-th save is a full snapshot, the others are incremental
+        """
+        incremental = (self.FULL_SAVE_CYCLE > 0 and
+                       self.net_saves % self.FULL_SAVE_CYCLE != 0)
+        self.save_net(filename, incremental)
+        self.net_saves += 1
+
+    def load_net(self, filename: str, mmap: bool = True):
+        """
+        Load the entire network from a file written by save_net. The network must have the
+        same structure (main_init() must have been called with the same K and sizes).
+
+        If mmap, the weights (NET_MMAP) are memory-mapped from the file rather than read:
+        they are only loaded when used, and changes (learning) never reach the file.
+        """
+        header = checkpoint.read_header(filename)
+
+        for name in self.NET_ARRAYS:
+            current = getattr(self, name)
+            shape = checkpoint.array_shape(header, name)
+            if shape != current.shape:
+                raise ValueError(
+                    f"'{filename}' does not match this network: {name} has shape {list(shape)}")
+
+            if mmap and name in self.NET_MMAP:
+                setattr(self, name, checkpoint.read_array(
+                    filename, header, name, mmap=True))
+            else:
+                current[...] = checkpoint.read_array(filename, header, name)
+
+        for name in self.NET_COUNTERS:
+            setattr(self, name, header['counters'][name])
+
+        self.rng.set_state(header['rng'])
+        self.update_CApatts_float()
+        self.compute_CAoverlaps()  # (not saved: re-computed from the loaded CAs)
+        self.avg_patts_changed[:] = True  # (CAs not computed from these averages yet)
+        self.index_sparse_synapses()
+        self.prepare_inhibitory_kernel()
+
+    def kernel_cache_key(self) -> str:
+        """
+        Everything the initial kernels (J) depend on: the seed, the sizes & kernel parameters,
+        and the projections enabled in K
+        """
+        return json.dumps({
+            'version': self.KERNEL_CACHE_VERSION,
+            'seed': self.seed,
+            'areas': [self.NAREAS, self.N11, self.N12],
+            'K': [int(k) for k in self.K],
+            'FF/FB kernels': [self.NFFB1, self.NFFB2, self.SIGMAX, self.SIGMAY, self.J_PROB],
+            'REC kernels': [self.NREC1, self.NREC2, self.SIGMAX_REC, self.SIGMAY_REC, self.J_REC_PROB],
+            'upper': self.J_UPPER,
+        })
+
+    def kernel_cache_file(self) -> str:
+        """
+        The file the initial kernels are cached in (None if there is no caching: no cache
+        directory, or no seed, so that the kernels are not reproducible)
+        """
+        if self.KERNEL_CACHE_DIR is None or self.seed is None:
+            return None
+        digest = hashlib.sha256(self.kernel_cache_key().encode()).hexdigest()
+        return os.path.join(self.KERNEL_CACHE_DIR, self.KERNEL_CACHE_FILE % digest[:16])
+
+    def load_cached_kernels(self) -> bool:
+        """
+        Loads the initial kernels (and the state of the 'synapse init' random stream after
+        initialising them) from the cache; False if they have not been cached before
+        """
+        filename = self.kernel_cache_file()
+        if filename is None or not os.path.exists(filename):
+            return False
+
+        header = checkpoint.read_header(filename)
+        if header['counters'].get('key') != self.kernel_cache_key() or \
+                checkpoint.array_shape(header, 'J') != self.J.shape:
+            return False
+
+        self.J[...] = checkpoint.read_array(filename, header, 'J')
+        self.rng['synapse init'].bit_generator.state = header['rng']['synapse init']
+        self.logger.info(json.dumps({
+            'op': 'load_cached_kernels',
+            'file': filename,
+        }, sort_keys=False, indent=4))
+        return True
+
+    def cache_kernels(self):
+        """
+        Saves the initial kernels, just initialised by init(), to the cache (if any)
+        """
+        filename = self.kernel_cache_file()
+        if filename is None:
+            return
+
+        os.makedirs(self.KERNEL_CACHE_DIR, exist_ok=True)
+        # written next to the cache file, then renamed: concurrent runs (e.g. a sweep) only
+        # ever see complete files
+        tmp_filename = f'{filename}.{os.getpid()}.tmp'
+        rng = {'synapse init': self.rng.get_state()['synapse init']}
+        checkpoint.write(tmp_filename, {'J': self.J}, {'key': self.kernel_cache_key()}, rng)
+        os.replace(tmp_filename, filename)
+
+    def manage_network_files(self):
+        """
+        Saves (ssaveNet switch) or loads (sloadNet switch) the entire network
+        """
+        ## Save the entire network to file (incl. input patts.) ##
+        if self.ssaveNet:
+            if self.net_dir is not None:
+                self.checkpoint_net(os.path.join(
+                    self.net_dir, self.NET_WR % self.freq_distrib[0]))
+            self.ssaveNet = False  # SET_SWITCH(ssaveNet, False)
+
+        ## Load entire network from file (incl. input patts.) ##
+        if self.sloadNet:
+            self.load_net(os.path.join(self.net_dir or '', self.NET_RD))
+            self.sloadNet = False  # SET_SWITCH(sloadNet, False)
+
+    def step(self, output: bool = True):
         """
         MAIN  "STEP" FUNCTION, executed at each sim. step
+
+        Returns the current activity (see get_current_activity), unless output is False
+        (e.g. when running headless), in which case the conversion is skipped
         """
         self.logger.info(json.dumps({
             'op': 'step',
@@ -1051,64 +1534,85 @@ class StandardNet6Areas:
         theta = .001 * self.stheta  # Get & rescale THRESH. value "    "   " "
         noise = .0001 * self.snoise  # Get & rescale NOISE(for "input" areas)
 
-        ## TODO Save the entire network to file (incl. input patts.) ##
+        stage = self.profiler.stage
 
-        ## TODO Load entire network from file (incl. input patts.) ##
+        with stage('step'):
+            ## Save / Load the entire network to / from file (incl. input patts.) ##
+            with stage('network files'):
+                self.manage_network_files()
 
-        ## MANAGE network TRAINING ##
-        self.manage_network_training()
+            ## MANAGE network TRAINING ##
+            with stage('training management'):
+                self.manage_network_training()
 
-        ## SET UP THE CURRENT SENSORIMOTOR INPUT ##
-        self.set_up_current_sensorimotor_input(noise)
+            ## SET UP THE CURRENT SENSORIMOTOR INPUT ##
+            with stage('input setup'):
+                self.set_up_current_sensorimotor_input(noise)
 
-        ## COMPUTE NEW MEMBRANE POTENTIALS ##
-        self.compute_new_membrane_potentials()
+            ## COMPUTE NEW MEMBRANE POTENTIALS ##
+            with stage('potentials'):
+                self.compute_new_membrane_potentials()
 
-        ## COMPUTE FIRING RATES (OUTPUTS) ##
-        self.compute_firing_rates(gain, theta)
+            ## COMPUTE FIRING RATES (OUTPUTS) ##
+            with stage('rates'):
+                self.compute_firing_rates(gain, theta)
 
-        ## COMPUTE NEW ADAPTATION ##
-        self.compute_new_adaptation()
+            ## COMPUTE NEW ADAPTATION ##
+            with stage('adaptation'):
+                self.compute_new_adaptation()
 
-        ## LEARNING ##
-        self.compute_learning(hrate)
+            ## LEARNING ##
+            with stage('learning'):
+                self.compute_learning(hrate)
 
-        ## RECORD AVERAGE RESPONSES DURING TRAINING ##
-        self.record_average_responses_during_training()
+            ## RECORD AVERAGE RESPONSES DURING TRAINING ##
+            with stage('averaging'):
+                self.record_average_responses_during_training()
 
-        ## COMPUTE EMERGING CAs and their OVERLAPS ##
-        self.compute_emerging_cell_assemblies_and_overlaps()
+            ## COMPUTE EMERGING CAs and their OVERLAPS ##
+            with stage('emerging CAs'):
+                self.compute_emerging_cell_assemblies_and_overlaps()
 
-        ## COMPUTE OVERLAP BETW. CAs and CURRENT ACTIV. ##
-        self.compute_overlap_between_cell_assemblies_and_current_activity()
+            ## COMPUTE OVERLAP BETW. CAs and CURRENT ACTIV. ##
+            with stage('CA overlaps'):
+                self.compute_overlap_between_cell_assemblies_and_current_activity()
 
-        ## TODO AUTOMATED TESTING ##
+            ## TODO AUTOMATED TESTING ##
 
-        ## TODO ASCII DATA FILE WRITING ##
+            ## TODO ASCII DATA FILE WRITING ##
 
-        self.stp = self.stp+1
-        return self.get_current_activity()
+            self.stp = self.stp+1
+
+        if output:
+            with stage('serialisation'):
+                return self.get_current_activity()
 
     # TODO delegate this to the simulation_manager
+    def get_current_config(self):
+        return {
+            'patternNumber': self.spatno,
+            'learningRate': self.slrate,
+            'shouldSaveNetwork': self.ssaveNet,
+            'networkTrainingActivated': self.strainNet,
+            'computeCaOverlaps': self.sCA_ovlps
+        }
+
     def get_current_activity(self):
-        potentials = self.pot.reshape(6, 25, 25).tolist()
+        potentials = self.pot.reshape(self.NAREAS, self.N12, self.N11).tolist()
         global_inhibition = self.slowinh.tolist()
         long_term_potentiation = self.tot_LTP.tolist()
         long_term_depression = self.tot_LTD.tolist()
-        cell_assembly_overlaps = self.ca_ovlps.reshape(6, 12, 12, order='C').tolist()
+        if self.ca_ovlps_list is None:  # (P x P per area: only re-built when re-computed)
+            self.ca_ovlps_list = self.ca_ovlps.reshape(
+                self.NAREAS, self.P, self.P, order='C').tolist()
+        cell_assembly_overlaps = self.ca_ovlps_list
 
         return {
             'currentStep': self.stp,
-            'config': dict({
-                'patternNumber': self.spatno,
-                'learningRate': self.slrate,
-                'shouldSaveNetwork': self.ssaveNet,
-                'networkTrainingActivated': self.strainNet,
-                'computeCaOverlaps': self.sCA_ovlps
-            }),
+            'config': self.get_current_config(),
             'totalActivity': self.total_output,
-            'sensInput': self.sensInput.reshape(25, 25).tolist(),
-            'motorInput': self.motorInput.reshape(25, 25).tolist(),
+            'sensInput': self.sensInput.reshape(self.N12, self.N11).tolist(),
+            'motorInput': self.motorInput.reshape(self.N12, self.N11).tolist(),
             'longTermPotentiation': {
                 'area1': long_term_potentiation[0],
                 'area2': long_term_potentiation[1],
@@ -1202,8 +1706,11 @@ class StandardNet6Areas:
         self.pot = util.Get_Random_Vector(self.NAREAS * self.N1)
         self.adapt = util.Get_Random_Vector(self.NAREAS * self.N1)
         self.avg_patts = util.Get_Random_Vector(self.NAREAS * self.N1 * self.P)
+        self.avg_patts_changed = np.ones(self.P, dtype=bool)
         self.ca_patts = util.Get_Random_Vector(self.NAREAS * self.N1 * self.P)
+        self.update_CApatts_float()
         self.ca_ovlps = util.Get_Random_Vector(self.NAREAS * self.P * self.P)
+        self.invalidate_ca_ovlps()
         self.ovlps = util.Get_Random_Vector(self.NAREAS * self.P)
         self.diluted = util.Get_Random_Vector(self.NAREAS * self.N1)
         self.inh = util.Get_Random_Vector(self.NAREAS * self.N1)
@@ -2,18 +2,6 @@ import numpy as np
 from numpy.typing import NDArray
 import random
 import math
-import time
-
-
-def time_it(func):
-    def wrapper(*args, **kwargs):
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        execution_time = end_time - start_time
-        print(f"Execution time of {func.__name__}: {execution_time} seconds")
-        return result
-    return wrapper
 
 
 BaseType = np.float64
@@ -123,6 +111,29 @@ def leaky_integrate(tau: BaseType, obj: BaseType, expr: BaseType, step_size: Bas
     return obj
 
 
+def leaky_integrate_Vector(tau: BaseType, obj: VectorType, expr: VectorType, step_size: BaseType) -> VectorType:
+    """
+    leaky_integrate applied to every element of obj (in place), with the matching element of expr
+    """
+    if tau:
+        obj += (expr - obj) * (step_size / tau)
+    else:
+        obj[...] = expr
+    return obj
+
+
+def accumulate_increments(total: BaseType, increment: BaseType, n: int) -> BaseType:
+    """
+    Adds increment to total n times, one at a time, so that the result is bit-identical to
+    n repeated `total += increment` (np.sum would add pairwise and round differently)
+    """
+    if n == 0:
+        return total
+    steps = np.full(n + 1, increment, dtype=BaseType)
+    steps[0] = total
+    return np.add.accumulate(steps)[-1]
+
+
 def equal_noise() -> BaseType:
     """
     Generates a random floating-point number in the range [0, 1)
@@ -163,6 +174,20 @@ def TLIN(x: BaseType):
     """
     return x if x > 0 else 0
 
+
+def RAMP_Vector(x: VectorType, out: VectorType = None) -> VectorType:
+    """
+    RAMP applied to every element of x (into out, if given)
+    """
+    return np.clip(x, 0.0, 1.0, out=out)
+
+
+def TLIN_Vector(x: VectorType, out: VectorType = None) -> VectorType:
+    """
+    TLIN applied to every element of x (into out, if given)
+    """
+    return np.maximum(x, 0, out=out)
+
 # See todos below: where we do assignment to numpy arrays (vectors, e.g. J) we need to make sure
 # we mutate the original sliced J that is passed in! Check how to do this with numpy
 
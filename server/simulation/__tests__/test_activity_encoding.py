@@ -0,0 +1,93 @@
+import json
+import unittest
+import numpy as np
+from ..activity_encoding import encode_activity, decode_activity, decimated
+from ...models.standardNet6Areas import StandardNet6Areas
+
+
+class TestActivityEncoding(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = StandardNet6Areas()
+        cls.model.main_init()
+        cls.model.INIT_RANDOM_ACTIVITY()
+        cls.model.stp = 42
+        cls.model.pot[...] = np.random.randn(*cls.model.pot.shape)
+        cls.model.ca_ovlps[...] = np.random.randint(
+            0, 20, cls.model.ca_ovlps.shape)
+
+    def test_float32_frame_matches_current_activity(self):
+        frame = decode_activity(encode_activity(self.model))
+        activity = self.model.get_current_activity()
+
+        self.assertEqual(frame['currentStep'], activity['currentStep'])
+        self.assertEqual(frame['config'], activity['config'])
+        self.assertEqual(frame['globalInhibition'],
+                         list(activity['globalInhibition'].values()))
+        np.testing.assert_allclose(frame['arrays']['potentials'], np.array(
+            list(activity['potentials'].values())), rtol=1e-6)
+        np.testing.assert_allclose(
+            frame['arrays']['sensoryInput1'], activity['sensInput'], rtol=1e-6)
+        np.testing.assert_array_equal(
+            frame['arrays']['cellAssemblyOverlaps'], np.array(list(activity['cellAssemblyOverlaps'].values())))
+
+    def test_non_square_areas(self):
+        model = StandardNet6Areas()
+        model.N11, model.N12 = 20, 25  # 25 rows of 20 cells
+        model.N1 = model.N11 * model.N12
+        model.main_init()
+        model.INIT_RANDOM_ACTIVITY()
+
+        frame = decode_activity(encode_activity(model))
+        activity = model.get_current_activity()
+
+        self.assertEqual(frame['arrays']['potentials'].shape, (6, 25, 20))
+        np.testing.assert_allclose(frame['arrays']['potentials'], np.array(
+            list(activity['potentials'].values())), rtol=1e-6)
+        np.testing.assert_allclose(
+            frame['arrays']['sensoryInput1'], activity['sensInput'], rtol=1e-6)
+
+    def test_arrays_are_aligned(self):
+        frame = encode_activity(self.model, 'float16')
+        header = json.loads(frame[4:4 + int.from_bytes(frame[:4], 'little')])
+        for entry in header['arrays']:
+            self.assertEqual(entry['offset'] % 8, 0)
+
+    def test_quantised_frame(self):
+        encoded = encode_activity(self.model, 'uint8')
+        frame = decode_activity(encoded)
+        potentials = self.model.pot.reshape(6, 25, 25)
+        step = (potentials.max() - potentials.min()) / 255
+        np.testing.assert_allclose(
+            frame['arrays']['potentials'], potentials, atol=step / 2 + 1e-5)
+
+        # an order of magnitude smaller than the JSON of get_current_activity
+        json_size = len(json.dumps(self.model.get_current_activity()))
+        self.assertLess(len(encoded), json_size / 10)
+
+    def test_without_overlaps(self):
+        full = encode_activity(self.model)
+        encoded = encode_activity(self.model, overlaps=False)
+        frame = decode_activity(encoded)
+
+        self.assertNotIn('cellAssemblyOverlaps', frame['arrays'])
+        self.assertEqual(frame['cellAssemblyOverlapsVersion'], self.model.ca_ovlps_version)
+        self.assertGreaterEqual(len(full) - len(encoded), self.model.ca_ovlps.size * 4)
+        np.testing.assert_array_equal(
+            frame['arrays']['potentials'], decode_activity(full)['arrays']['potentials'])
+
+    def test_decimation(self):
+        frame = decode_activity(encode_activity(self.model, decimate=2))
+        potentials = self.model.pot.reshape(6, 25, 25)
+
+        self.assertEqual(frame['arrays']['potentials'].shape, (6, 13, 13))
+        self.assertAlmostEqual(float(frame['arrays']['potentials'][0, 0, 0]),
+                               potentials[0, :2, :2].mean(), places=5)
+        # the last row/column average smaller blocks
+        self.assertAlmostEqual(float(frame['arrays']['potentials'][0, 12, 12]),
+                               potentials[0, 24, 24], places=5)
+        np.testing.assert_array_equal(decimated(potentials, 1), potentials)
+
+
+if __name__ == "__main__":
+    unittest.main()
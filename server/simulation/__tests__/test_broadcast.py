@@ -0,0 +1,111 @@
+import queue
+import unittest
+from socketio import packet
+from ..broadcast import FrameBroadcaster
+
+
+class CountingPacket(packet.Packet):
+    encoded = 0
+
+    def encode(self):
+        CountingPacket.encoded += 1
+        return super().encode()
+
+
+class FakeEngineIO:
+    def __init__(self, sids):
+        self.sockets = {eio_sid: type('Socket', (), {'queue': queue.Queue()})() for eio_sid in sids}
+
+    def _get_socket(self, eio_sid):
+        return self.sockets[eio_sid]
+
+
+class FakeServer:
+    packet_class = CountingPacket
+
+    def __init__(self, viewers):
+        self.viewers = viewers  # [(sid, eio_sid)]
+        self.eio = FakeEngineIO(eio_sid for _, eio_sid in viewers)
+        self.manager = self
+        self.received = {eio_sid: [] for _, eio_sid in viewers}
+
+    def get_participants(self, namespace, room):
+        return iter(self.viewers)
+
+    def _send_eio_packet(self, eio_sid, eio_pkt):
+        self.received[eio_sid].append(eio_pkt)
+        self.eio.sockets[eio_sid].queue.put(eio_pkt)
+
+
+class TestFrameBroadcaster(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer([('fast', 'e1'), ('slow', 'e2'), ('third', 'e3')])
+        self.broadcaster = FrameBroadcaster(self.server, max_backlog=2)
+        CountingPacket.encoded = 0
+
+    def deliver(self, eio_sid):
+        q = self.server.eio.sockets[eio_sid].queue
+        while not q.empty():
+            q.get_nowait()
+
+    def test_frames_are_encoded_once_for_all_viewers(self):
+        self.broadcaster.broadcast('new-activity', b'\x00\x01', 'room')
+        self.assertEqual(CountingPacket.encoded, 1)
+        # a binary frame: a header packet & an attachment, the same ones for every viewer
+        received = self.server.received
+        self.assertEqual(len(received['e1']), 2)
+        self.assertEqual([pkt.data for pkt in received['e1']], [pkt.data for pkt in received['e3']])
+
+    def test_frames_dropped_for_slow_viewers_only(self):
+        for _ in range(5):
+            self.broadcaster.broadcast('new-activity', {'frame': 1}, 'room')
+            self.deliver('e1')
+            self.deliver('e3')
+
+        # 'slow' never drains its queue: it only gets frames while its backlog is <= 2 packets
+        self.assertEqual(self.broadcaster.stats(['fast', 'slow', 'third']), {
+            'fast': {'sent': 5, 'dropped': 0},
+            'slow': {'sent': 3, 'dropped': 2},
+            'third': {'sent': 5, 'dropped': 0},
+        })
+
+        self.broadcaster.forget('slow')
+        self.assertEqual(self.broadcaster.stats(['slow']), {'slow': {'sent': 0, 'dropped': 0}})
+
+
+class PublicServer:
+    """
+    A server without the internals the broadcaster relies on (only its public API)
+    """
+
+    def __init__(self, viewers):
+        self.viewers = viewers
+        self.eio = object()
+        self.manager = self
+        self.emitted = []
+
+    def get_participants(self, namespace, room):
+        return iter(self.viewers)
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.emitted.append((event, data, to))
+
+
+class TestFrameBroadcasterFallback(unittest.TestCase):
+    def test_frames_emitted_to_each_viewer(self):
+        server = PublicServer([('first', 'e1'), ('second', 'e2')])
+        broadcaster = FrameBroadcaster(server)
+        self.assertFalse(broadcaster.internals)
+
+        broadcaster.broadcast('new-activity', b'\x00', 'room')
+
+        self.assertEqual(server.emitted, [('new-activity', b'\x00', 'first'),
+                                          ('new-activity', b'\x00', 'second')])
+        self.assertEqual(broadcaster.stats(['first', 'second']), {
+            'first': {'sent': 1, 'dropped': 0},
+            'second': {'sent': 1, 'dropped': 0},
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import itertools
+import threading
+import time
+import unittest
+from ..network_pool import NetworkPool
+
+
+class TestNetworkPool(unittest.TestCase):
+    def setUp(self):
+        self.counter = itertools.count()
+        self.build = threading.Semaphore(0)  # no. of networks the builder may build
+        self.pool = NetworkPool(self.new_network, size=2)
+        self.addCleanup(self.pool.stop)
+
+    def new_network(self):
+        self.assertTrue(self.build.acquire(timeout=5))
+        return next(self.counter)
+
+    def wait_for(self, ready):
+        deadline = time.monotonic() + 5
+        while len(self.pool.networks) != ready and time.monotonic() < deadline:
+            time.sleep(.001)
+        self.assertEqual(len(self.pool.networks), ready)
+
+    def test_take_from_empty_pool(self):
+        self.assertIsNone(self.pool.take())
+        self.assertEqual(self.pool.stats()['missed'], 1)
+
+    def test_fills_up_to_size_and_refills(self):
+        self.pool.start()
+        for _ in range(5):
+            self.build.release()
+        self.wait_for(2)
+        time.sleep(.05)
+        # bounded: no more than size networks are built ahead of time
+        self.assertEqual(self.pool.built, 2)
+
+        self.assertEqual(self.pool.take(), 0)
+        self.wait_for(2)
+        self.assertEqual(self.pool.take(), 1)
+        self.assertEqual(self.pool.take(), 2)
+        self.wait_for(2)
+        self.assertEqual(self.pool.stats(), {'size': 2, 'ready': 2, 'built': 5, 'taken': 3, 'missed': 0})
+
+    def test_take_waits_for_network_being_built(self):
+        self.pool.start()
+        deadline = time.monotonic() + 5
+        while not self.pool.building and time.monotonic() < deadline:
+            time.sleep(.001)
+        self.assertTrue(self.pool.building)
+
+        # not built within the timeout
+        self.assertIsNone(self.pool.take(timeout=.05))
+        self.assertEqual(self.pool.stats()['missed'], 1)
+
+        threading.Timer(.05, self.build.release).start()
+        self.assertEqual(self.pool.take(timeout=5), 0)
+        self.assertEqual(self.pool.stats()['missed'], 1)
+        self.build.release(2)  # (lets the builder fill the pool up again, then stop)
+        self.wait_for(2)
+
+    def test_take_right_after_start(self):
+        class SlowPool(NetworkPool):
+            def run(self):
+                time.sleep(.05)  # (the builder thread has not started building yet)
+                super().run()
+
+        pool = SlowPool(self.new_network, size=1)
+        self.addCleanup(pool.stop)
+        pool.start()
+        self.build.release()
+
+        self.assertEqual(pool.take(timeout=5), 0)
+        self.assertEqual(pool.stats()['missed'], 0)
+
+    def test_built_once_without_refill(self):
+        pool = NetworkPool(self.new_network, size=1, refill=False)
+        self.addCleanup(pool.stop)
+        pool.start()
+        self.build.release()
+        self.build.release()
+        pool.thread.join(5)
+        self.assertFalse(pool.thread.is_alive())
+        self.assertEqual(pool.take(), 0)
+        self.assertIsNone(pool.take())
+        self.assertEqual(pool.built, 1)
+
+    def test_empty_pool_is_never_filled(self):
+        pool = NetworkPool(self.new_network, size=0)
+        pool.start()
+        self.assertIsNone(pool.thread)
+        self.assertIsNone(pool.take())
+
+
+if __name__ == "__main__":
+    unittest.main()
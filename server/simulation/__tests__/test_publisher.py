@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+from ..publisher import FramePublisher
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.emitted = []
+        self.event = threading.Event()
+
+    def emit(self, event, data):
+        self.emitted.append((event, data))
+        self.event.set()
+
+
+class TestFramePublisher(unittest.TestCase):
+    def setUp(self):
+        self.socket = RecordingSocket()
+        self.publisher = FramePublisher(self.socket, 'new-activity', max_fps=20)
+        self.publisher.start()
+
+    def tearDown(self):
+        self.publisher.stop()
+
+    def test_emits_latest_frame(self):
+        self.assertTrue(self.publisher.due())
+        self.publisher.publish(1)
+        self.assertTrue(self.socket.event.wait(1))
+        self.assertEqual(self.socket.emitted, [('new-activity', 1)])
+
+    def test_coalesces_frames_published_faster_than_max_fps(self):
+        start = time.monotonic()
+        frame = 0
+        while time.monotonic() - start < .5:
+            frame += 1
+            self.publisher.publish(frame)
+            time.sleep(.001)
+        time.sleep(.1)
+
+        emitted = [data for _, data in self.socket.emitted]
+        # ~20 fps over .5s, the rest coalesced, and the last frame is always sent
+        self.assertLessEqual(len(emitted), 13)
+        self.assertGreater(len(emitted), 3)
+        self.assertEqual(emitted[-1], frame)
+        self.assertEqual(emitted, sorted(emitted))
+        self.assertEqual(self.publisher.published, frame)
+        self.assertEqual(self.publisher.emitted + self.publisher.coalesced, frame)
+
+    def test_not_due_until_next_emission(self):
+        self.publisher.publish(1)
+        self.assertTrue(self.socket.event.wait(1))
+        self.assertFalse(self.publisher.due())
+        time.sleep(1 / 20)
+        self.assertTrue(self.publisher.due())
+
+    def test_stop(self):
+        self.publisher.stop()
+        self.assertFalse(self.publisher.running)
+        self.publisher.publish(1)
+        time.sleep(.05)
+        self.assertEqual(self.socket.emitted, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
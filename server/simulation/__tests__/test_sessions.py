@@ -0,0 +1,164 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from .. import sessions
+from ..sessions import SessionRegistry, execute_command
+from ..simulation_manager import SimulationManager, logger
+from .test_simulation_manager import RecordingSocket
+
+
+class RecordingEmit:
+    def __init__(self):
+        self.emitted = []
+        self.received = threading.Condition()
+
+    def __call__(self, event, data, session_id):
+        with self.received:
+            self.emitted.append((session_id, event, data))
+            self.received.notify_all()
+
+    def wait_for(self, test, timeout=60):
+        with self.received:
+            return self.received.wait_for(lambda: any(test(*emitted) for emitted in self.emitted), timeout)
+
+
+class TestExecuteCommand(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.WARNING)
+        self.socket = RecordingSocket()
+        self.manager = SimulationManager(self.socket)
+
+    def test_commands_before_init(self):
+        execute_command(self.manager, 'continue-simulation', ())
+        execute_command(self.manager, 'get-profile', ())
+        execute_command(self.manager, 'no-such-command', ())
+
+        events = [event for event, _ in self.socket.emitted]
+        self.assertEqual(events, ['error-notification', 'profile', 'error-notification'])
+        self.assertFalse(self.manager.model_running)
+
+    def test_run_steps_commands(self):
+        execute_command(self.manager, 'run-steps', (None, None))
+        execute_command(self.manager, 'run-steps', (10, None))
+        execute_command(self.manager, 'cancel-run', ())
+
+        messages = [data['msg'] for _, data in self.socket.emitted]
+        self.assertEqual(messages, ['Expected a no. of steps or a condition to run until',
+                                    'Network not initialised, or already running steps!',
+                                    'No steps being run!'])
+
+    def test_update_config_is_queued(self):
+        execute_command(self.manager, 'update-config', ('noise', 3))
+        self.assertEqual(self.manager.config_queue.get_nowait(), {'param': 'noise', 'value': 3})
+
+    def test_invalid_activity_config_is_rejected(self):
+        execute_command(self.manager, 'update-config', ('activity-dtype', 'float64'))
+
+        self.assertEqual([event for event, _ in self.socket.emitted], ['error-notification'])
+        self.assertTrue(self.manager.config_queue.empty())
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def setUp(self):
+        for log in (logger, sessions.logger):
+            self.addCleanup(log.setLevel, log.level)
+            log.setLevel(logging.WARNING)
+
+        self.emit = RecordingEmit()
+        base_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(base_dir.cleanup)
+        self.base_dir = base_dir.name
+        self.registry = SessionRegistry(self.emit, base_dir=self.base_dir)
+        self.addCleanup(self.registry.close_all)
+
+    def test_sessions_run_in_their_own_workers(self):
+        first = self.registry.create()
+        second = self.registry.create()
+        self.assertNotEqual(first.id, second.id)
+        self.assertIs(self.registry.get(first.id), first)
+        self.assertNotEqual(first.process.pid, second.process.pid)
+
+        first.send('init-simulation')
+        self.assertTrue(self.emit.wait_for(
+            lambda session_id, event, data: session_id == first.id and data == {'msg': 'Network initialised!'}))
+        first.send('continue-simulation')
+        self.assertTrue(self.emit.wait_for(
+            lambda session_id, event, data: session_id == first.id and event == 'new-activity'))
+
+        profile = first.request_profile(timeout=10)
+        self.assertGreater(profile['currentStep'], 0)
+        # only the first session was initialised
+        self.assertEqual(second.request_profile(timeout=10)['currentStep'], 0)
+        self.assertFalse(any(session_id == second.id and event == 'new-activity'
+                             for session_id, event, _ in self.emit.emitted))
+
+        with self.assertRaises(ValueError):
+            first.send('no-such-command')
+
+        self.registry.close(first.id)
+        self.assertFalse(first.alive())
+        self.assertEqual([info['id'] for info in self.registry.list()], [second.id])
+        with self.assertRaises(KeyError):
+            self.registry.get(first.id)
+
+    def test_session_closed_once_idle(self):
+        class QuickRegistry(SessionRegistry):
+            idle_timeout = .2
+            reap_interval = .05
+
+        registry = QuickRegistry(self.emit, base_dir=self.base_dir)
+        self.addCleanup(registry.close_all)
+        session = registry.create()
+        session.add_client('a')
+        session.add_client('b')
+
+        session.remove_client('a')
+        time.sleep(.4)
+        # still a client attached
+        self.assertIs(registry.get(session.id), session)
+
+        session.remove_client('b')
+        deadline = time.monotonic() + 10
+        while registry.all() and time.monotonic() < deadline:
+            time.sleep(.01)
+        self.assertEqual(registry.all(), [])
+        session.process.join(10)  # (closed by the reaper)
+        self.assertFalse(session.alive())
+
+    def test_sessions_write_to_their_own_directories(self):
+        first = self.registry.create()
+        second = self.registry.create()
+        self.assertNotEqual(first.dir, second.dir)
+
+        for session in (first, second):
+            session.send('init-simulation')
+        for session in (first, second):
+            self.assertTrue(self.emit.wait_for(
+                lambda session_id, event, data: session_id == session.id and data == {'msg': 'Network initialised!'}))
+            # the training saves net0.dat before the first presentation
+            session.send('update-config', 'network-training-activated', True)
+            session.send('update-config', 'compute-ca-overlaps', True)
+            session.send('continue-simulation')
+
+        files = ('net0.dat', 'CA-structure.txt')
+        deadline = time.time() + 60
+        while not all(os.path.exists(os.path.join(session.dir, name))
+                      for session in (first, second) for name in files):
+            self.assertLess(time.time(), deadline, 'The sessions did not write their files')
+            time.sleep(.1)
+
+        self.assertEqual(sorted(os.listdir(self.base_dir)), sorted([first.id, second.id]))
+
+    def test_max_sessions(self):
+        self.registry.max_sessions = 1
+        self.registry.create()
+        with self.assertRaises(RuntimeError):
+            self.registry.create()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import logging
+import threading
+import unittest
+import numpy as np
+from ..simulation_manager import SimulationManager, logger
+from ..activity_encoding import decode_activity
+from ..network_pool import NetworkPool
+from ...models.standardNet6Areas import StandardNet6Areas
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.emitted = []
+        self.ready = threading.Event()
+
+        self.received = threading.Condition()
+
+    def emit(self, event, data):
+        with self.received:
+            self.emitted.append((event, data))
+            self.received.notify_all()
+        if event in ('info-notification', 'error-notification'):
+            self.ready.set()
+
+    def wait_for(self, event, timeout=30):
+        """
+        The data of the first event emitted (None if it is not emitted within timeout seconds)
+        """
+        def first():
+            return next((data for emitted, data in self.emitted if emitted == event), None)
+
+        with self.received:
+            self.received.wait_for(lambda: first() is not None, timeout)
+            return first()
+
+
+class TestSimulationManager(unittest.TestCase):
+    def setUp(self):
+        for log in (logger, StandardNet6Areas.logger):
+            self.addCleanup(log.setLevel, log.level)
+            log.setLevel(logging.WARNING)
+
+        self.socket = RecordingSocket()
+        self.manager = SimulationManager(self.socket)
+        self.addCleanup(self.manager.publisher.stop)
+
+    def test_init_in_background_with_progress(self):
+        self.assertTrue(self.manager.init_simulation())
+        self.assertTrue(self.manager.model_initialising)
+        # only one initialisation at a time
+        self.assertFalse(self.manager.init_simulation())
+
+        self.assertTrue(self.socket.ready.wait(30))
+        self.assertEqual(self.socket.emitted[-1], ('info-notification', {'msg': 'Network initialised!'}))
+        self.assertTrue(self.manager.model_initialised)
+        self.assertFalse(self.manager.model_initialising)
+
+        progress = [data for event, data in self.socket.emitted if event == 'init-progress']
+        projections = len(self.manager.model.J_offsets)
+        self.assertEqual([data['done'] for data in progress], list(range(1, projections + 1)))
+        self.assertTrue(all(data['total'] == projections for data in progress))
+        self.assertEqual(progress[0]['projection'], 'area1-area1')
+
+        self.assertFalse(self.manager.init_simulation())
+
+    def test_init_with_model_from_pool(self):
+        pool = NetworkPool(SimulationManager.pooled_model, size=1)
+        model = SimulationManager.new_model()
+        pool.networks.append(model)
+        manager = SimulationManager(self.socket, pool)
+        self.addCleanup(manager.publisher.stop)
+
+        self.assertTrue(manager.init_simulation())
+        self.assertTrue(self.socket.ready.wait(30))
+        self.assertIs(manager.model, model)
+        projections = len(model.J_offsets)
+        self.assertEqual(self.socket.emitted[0],
+                         ('init-progress', {'done': projections, 'total': projections, 'projection': None}))
+        self.assertEqual(manager.profile()['pool']['taken'], 1)
+
+    def test_profile_before_init(self):
+        self.assertEqual(self.manager.profile()['stages'], {})
+
+    def test_overlaps_only_sent_when_changed(self):
+        model = StandardNet6Areas()
+        model.main_init()
+        model.INIT_RANDOM_ACTIVITY()
+        self.manager.model = model
+        self.manager.overlaps_keyframe = 3
+
+        frames = [decode_activity(self.manager.encode_frame()) for _ in range(2)]
+        model.compute_CAoverlaps([0])
+        frames += [decode_activity(self.manager.encode_frame()) for _ in range(5)]
+
+        self.assertEqual(['cellAssemblyOverlaps' in frame['arrays'] for frame in frames],
+                         [True, False, True, False, False, False, True])
+        self.assertEqual(frames[2]['cellAssemblyOverlapsVersion'], model.ca_ovlps_version)
+        np.testing.assert_allclose(frames[2]['arrays']['cellAssemblyOverlaps'],
+                                   model.ca_ovlps.reshape(model.NAREAS, model.P, model.P), rtol=1e-6)
+
+    def test_rejects_invalid_activity_config(self):
+        for param, value in (('activity-dtype', 'float64'), ('activity-decimation', 0),
+                             ('activity-decimation', '2'), ('activity-decimation', 1.5)):
+            with self.assertRaises(ValueError):
+                self.manager.update_config_parameter(param, value)
+        self.assertTrue(self.manager.config_queue.empty())
+
+        self.manager.update_config_parameter('activity-dtype', 'uint8')
+        self.manager.update_config_parameter('activity-decimation', 2)
+        self.assertEqual(self.manager.config_queue.qsize(), 2)
+
+
+class TestRunSteps(unittest.TestCase):
+    def setUp(self):
+        for log in (logger, StandardNet6Areas.logger):
+            self.addCleanup(log.setLevel, log.level)
+            log.setLevel(logging.WARNING)
+
+        self.socket = RecordingSocket()
+        self.manager = SimulationManager(self.socket)
+        self.addCleanup(self.manager.publisher.stop)
+
+    def initialise(self):
+        self.assertTrue(self.manager.init_simulation())
+        self.assertTrue(self.socket.ready.wait(30))
+        self.socket.emitted.clear()
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            self.manager.run_steps()
+        with self.assertRaises(ValueError):
+            self.manager.run_steps(0)
+        with self.assertRaises(ValueError):
+            self.manager.run_steps(10, until='no-such-condition')
+        # not initialised
+        self.assertFalse(self.manager.run_steps(10))
+        self.assertFalse(self.manager.cancel_run())
+
+    def test_runs_steps_without_frames(self):
+        self.initialise()
+        self.assertTrue(self.manager.run_steps(20))
+
+        done = self.socket.wait_for('run-steps-done')
+        self.assertEqual(done['done'], 20)
+        self.assertEqual(done['reason'], 'steps')
+        self.assertEqual(done['currentStep'], 20)
+        # the model was paused: it stays where the run stopped
+        self.assertEqual(self.manager.model.stp, 20)
+        self.assertIsNone(self.manager.step_run)
+
+        # only the final frame is sent
+        self.assertIsNotNone(self.socket.wait_for('new-activity'))
+        self.assertEqual(self.manager.publisher.published, 1)
+
+    def test_runs_until_condition(self):
+        self.initialise()
+        self.manager.model.net_dir = None  # the training saves the network as it starts
+        self.manager.model.strainNet = True
+        self.assertTrue(self.manager.run_steps(1000, until='presentation'))
+
+        done = self.socket.wait_for('run-steps-done')
+        self.assertEqual(done['reason'], 'presentation')
+        self.assertLess(done['done'], 1000)
+        self.assertEqual(self.manager.model.freq_distrib.sum(), 1)
+
+    def test_cancel(self):
+        self.initialise()
+        self.manager.run_progress_interval = 0
+        self.assertTrue(self.manager.run_steps(100000))
+        self.assertFalse(self.manager.run_steps(10))
+
+        self.assertIsNotNone(self.socket.wait_for('run-steps-progress'))
+        self.assertTrue(self.manager.cancel_run())
+        done = self.socket.wait_for('run-steps-done')
+        self.assertEqual(done['reason'], 'cancelled')
+        self.assertLess(done['done'], 100000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import csv
+import os
+import tempfile
+import unittest
+from .. import sweep
+
+
+class TestSweep(unittest.TestCase):
+    def test_expand_grid(self):
+        runs = sweep.expand_grid({'seed': [1, 2], 'J_PROB': [.2, .28]})
+
+        self.assertEqual(runs, [
+            {'seed': 1, 'J_PROB': .2},
+            {'seed': 1, 'J_PROB': .28},
+            {'seed': 2, 'J_PROB': .2},
+            {'seed': 2, 'J_PROB': .28},
+        ])
+        self.assertEqual(sweep.run_id(runs[1]), 'seed=1,J_PROB=0.28')
+
+    def test_parse_param(self):
+        self.assertEqual(sweep.parse_param('J_PROB=.2,0.28'), ('J_PROB', [.2, .28]))
+        self.assertEqual(sweep.parse_param('seed=1,2'), ('seed', [1, 2]))
+
+    def test_run_and_resume_sweep(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            out_file = os.path.join(out_dir, 'sweep.csv')
+            grid = {'seed': [1, 2], 'sJslow': [18]}
+
+            rows = sweep.run_sweep(grid, out_file, max_steps=2, workers=2)
+            self.assertEqual(len(rows), 2)
+
+            with open(out_file, newline='') as f:
+                recorded = list(csv.DictReader(f))
+            self.assertEqual({row['run'] for row in recorded},
+                             {'seed=1,sJslow=18', 'seed=2,sJslow=18'})
+            self.assertTrue(all(row['steps'] == '2' for row in recorded))
+            self.assertTrue(all((row['max_steps'], row['presentations'], row['sparse']) == ('2', '', 'False')
+                                for row in recorded))
+            self.assertIn('CA size area6', recorded[0])
+
+            # resuming the same sweep does not recompute the finished runs
+            self.assertEqual(sweep.run_sweep(grid, out_file, max_steps=2, workers=2), [])
+
+            # but runs new points of an extended grid
+            grid['seed'].append(3)
+            rows = sweep.run_sweep(grid, out_file, max_steps=2, workers=2)
+            self.assertEqual([row['run'] for row in rows], ['seed=3,sJslow=18'])
+
+            # runs done with other settings are not runs of this sweep
+            rows = sweep.run_sweep({'seed': [1], 'sJslow': [18]}, out_file, max_steps=3, workers=1)
+            self.assertEqual([(row['run'], row['steps']) for row in rows], [('seed=1,sJslow=18', 3)])
+            self.assertEqual(sweep.run_sweep({'seed': [1], 'sJslow': [18]}, out_file, max_steps=3,
+                                             workers=1), [])
+
+            # a grid over other parameters does not fit the file's columns
+            with self.assertRaises(ValueError):
+                sweep.run_sweep({'seed': [1], 'J_PROB': [.2]}, out_file, max_steps=2, workers=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+import numpy as np
+from .. import train
+from ...models.standardNet6Areas import StandardNet6Areas
+
+
+class TestRunTraining(unittest.TestCase):
+    def test_stops_at_step_budget(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            with self.assertLogs(train.logger, logging.INFO) as logs:
+                summary = train.run_training(
+                    seed=1, max_steps=20, checkpoint_every=10, out_dir=out_dir)
+
+            # each step is checkpointed once
+            steps = [json.loads(record.getMessage())['step'] for record in logs.records]
+            self.assertEqual(steps, [10, 20])
+
+            self.assertEqual(summary['steps'], 20)
+            self.assertFalse(summary['completed'])
+            self.assertEqual(len(summary['CA sizes']), StandardNet6Areas.P)
+            self.assertTrue(os.path.exists(os.path.join(out_dir, 'summary.json')))
+            self.assertTrue(os.path.exists(os.path.join(out_dir, 'step10.dat')))
+            self.assertTrue(os.path.exists(os.path.join(out_dir, 'step20.dat')))
+            # the training protocol saves the net. before the first presentation
+            self.assertTrue(os.path.exists(os.path.join(out_dir, 'net0.dat')))
+
+            # the checkpoint restores the trained network
+            net = StandardNet6Areas()
+            net.main_init()
+            net.load_net(os.path.join(out_dir, 'step20.dat'))
+            self.assertEqual(net.stp, 20)
+            self.assertTrue(np.any(net.J != 0))
+
+    def test_restores_model_log_level(self):
+        log = StandardNet6Areas.logger
+        self.addCleanup(log.setLevel, log.level)
+        log.setLevel(logging.INFO)
+
+        train.run_training(seed=1, max_steps=2)
+        self.assertEqual(log.level, logging.INFO)
+
+        # ...also when the training fails
+        with self.assertRaises(ValueError):
+            train.run_training(seed=1, max_steps=2, params={'P': 0})
+        self.assertEqual(log.level, logging.INFO)
+
+    def test_incremental_checkpoints_load(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            # the last step of the loop is a checkpoint step
+            train.run_training(seed=1, max_steps=20, checkpoint_every=10, out_dir=out_dir,
+                               full_every=2)
+
+            net = StandardNet6Areas()
+            net.main_init()
+            net.load_net(os.path.join(out_dir, 'step20.dat'))
+            self.assertEqual(net.stp, 20)
+
+    def test_pattern_count(self):
+        summary = train.main(['--seed', '1', '--max-steps', '5', '--patterns', '20',
+                              '--float32-averages', '--max-pattern-overlap', '3'])
+
+        self.assertEqual(summary['params'], {'P': 20, 'AVG_PATTS_DTYPE': 'float32',
+                                             'MAX_PATTERN_OVERLAP': 3})
+        self.assertEqual(len(summary['CA sizes']), 20)
+        self.assertEqual(len(summary['CA overlaps'][0]), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
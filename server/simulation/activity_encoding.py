@@ -0,0 +1,167 @@
+import json
+import struct
+import numpy as np
+
+# Binary wire format of the 'new-activity' socket event.
+#
+# The per-step activity of the model (potentials, sensory/motor input and CA overlaps) is
+# sent as raw typed arrays instead of nested JSON lists:
+#
+#   header length (uint32, little endian) | JSON header | arrays
+#
+# The JSON header holds the schema of the arrays (name, dtype, shape, offset from the start
+# of the frame and, for quantised arrays, min and scale) and the scalar values (step, config,
+# totals). Each array is C-ordered and aligned to ALIGN bytes, so that the client can view it
+# in place (e.g. as a Float32Array). The decoder in the GUI is app/src/activity.ts.
+#
+# Supported dtypes:
+#   float32  -- exact (as computed by the model, up to float32 precision)
+#   float16  -- half the size, ~3 significant digits
+#   uint8    -- quantised: value ~= min + q * scale, 256 levels per array and frame
+#
+# With decimate > 1, the 2d maps (potentials and inputs) are reduced by averaging blocks of
+# decimate x decimate cells (the last blocks of a row/column may be smaller).
+#
+# The CA overlaps (NAREAS x P x P, i.e. MBs per frame for large P) only change when the CAs are
+# re-computed: a frame without them (overlaps=False) leaves them out of the arrays, and the
+# client keeps the last ones it received. cellAssemblyOverlapsVersion (in every header) is the
+# version of the model's overlaps (see StandardNet6Areas.ca_ovlps_version).
+
+VERSION = 1
+ALIGN = 8
+DTYPES = ('float32', 'float16', 'uint8')
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _json_default(value):
+    # numpy scalars (e.g. counters restored from a network file)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def decimated(maps: np.ndarray, decimate: int) -> np.ndarray:
+    """
+    Averages the last two axes of maps over blocks of decimate x decimate cells
+    """
+    if decimate <= 1:
+        return maps
+
+    rows = np.arange(0, maps.shape[-2], decimate)
+    cols = np.arange(0, maps.shape[-1], decimate)
+    sums = np.add.reduceat(np.add.reduceat(
+        maps, rows, axis=-2), cols, axis=-1)
+    counts = np.outer(np.diff(np.append(rows, maps.shape[-2])),
+                      np.diff(np.append(cols, maps.shape[-1])))
+    return sums / counts
+
+
+def _encoded_array(name: str, array: np.ndarray, dtype: str):
+    """
+    (schema entry, raw data) of one array in the given dtype
+    """
+    entry = {'name': name, 'dtype': dtype, 'shape': list(array.shape)}
+
+    if dtype == 'uint8':
+        low = float(array.min()) if array.size else 0.0
+        high = float(array.max()) if array.size else 0.0
+        scale = (high - low) / 255 if high > low else 1.0
+        data = np.rint((array - low) / scale).astype(np.uint8)
+        entry['min'] = low
+        entry['scale'] = scale
+    else:
+        data = array.astype('<f4' if dtype == 'float32' else '<f2')
+
+    return entry, data.tobytes()
+
+
+def encode_activity(model, dtype: str = 'float32', decimate: int = 1, overlaps: bool = True) -> bytes:
+    """
+    Encodes the current activity of the model (the data of get_current_activity) as one
+    binary frame
+
+    Keyword arguments:
+    model     -- the (StandardNet6Areas) model
+    dtype     -- float32, float16 or uint8 (quantised) for all the arrays
+    decimate  -- block size for averaging the potentials and input maps (1: full resolution)
+    overlaps  -- whether the frame carries the CA overlaps (False: unchanged since last sent)
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported activity dtype '{dtype}'")
+
+    maps_shape = (model.N12, model.N11)  # (rows, columns), as in get_current_activity
+    arrays = {
+        'potentials': decimated(model.pot.reshape(model.NAREAS, *maps_shape), decimate),
+        'sensoryInput1': decimated(model.sensInput.reshape(maps_shape), decimate),
+        'motorInput1': decimated(model.motorInput.reshape(maps_shape), decimate),
+    }
+    if overlaps:
+        arrays['cellAssemblyOverlaps'] = model.ca_ovlps.reshape(
+            model.NAREAS, model.P, model.P)
+
+    entries = []
+    chunks = []
+    offset = 0
+    for name, array in arrays.items():
+        entry, data = _encoded_array(name, array, dtype)
+        entry['offset'] = offset
+        entries.append(entry)
+        chunks.append(data)
+        offset = _aligned(offset + len(data))
+
+    header = {
+        'version': VERSION,
+        'currentStep': model.stp,
+        'config': model.get_current_config(),
+        'totalActivity': model.total_output,
+        'globalInhibition': model.slowinh.tolist(),
+        'longTermPotentiation': model.tot_LTP.tolist(),
+        'longTermDepression': model.tot_LTD.tolist(),
+        'cellAssemblyOverlapsVersion': model.ca_ovlps_version,
+        'arrays': entries,
+    }
+
+    # array offsets are relative to the (aligned) end of the header until now; the header is
+    # padded with spaces so that its length does not depend on the offsets
+    encoded = json.dumps(header, default=_json_default).encode()
+    start = _aligned(4 + len(encoded) + 16 * len(entries))
+    for entry in entries:
+        entry['offset'] += start
+    encoded = json.dumps(header, default=_json_default).encode()
+    encoded += b' ' * (start - 4 - len(encoded))
+
+    frame = bytearray(start + offset)
+    frame[:4] = struct.pack('<I', len(encoded))
+    frame[4:start] = encoded
+    for entry, data in zip(entries, chunks):
+        frame[entry['offset']:entry['offset'] + len(data)] = data
+    return bytes(frame)
+
+
+def decode_activity(frame: bytes) -> dict:
+    """
+    Decodes a frame written by encode_activity into the header (scalar values) and its arrays
+    (as float32 ndarrays), i.e. {..., 'arrays': {name: ndarray}}
+    """
+    length, = struct.unpack_from('<I', frame)
+    header = json.loads(frame[4:4 + length])
+    if header['version'] != VERSION:
+        raise ValueError(
+            f"Unsupported activity frame version {header['version']}")
+
+    arrays = dict()
+    for entry in header['arrays']:
+        dtype = {'float32': '<f4', 'float16': '<f2',
+                 'uint8': np.uint8}[entry['dtype']]
+        count = int(np.prod(entry['shape']))
+        data = np.frombuffer(frame, dtype=dtype, count=count,
+                             offset=entry['offset']).reshape(entry['shape'])
+        if entry['dtype'] == 'uint8':
+            data = entry['min'] + data * entry['scale']
+        arrays[entry['name']] = data.astype(np.float32)
+
+    header['arrays'] = arrays
+    return header
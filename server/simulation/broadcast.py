@@ -0,0 +1,86 @@
+import collections
+import json
+import logging
+from socketio import packet
+from engineio import packet as eio_packet
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('broadcast')
+logger.setLevel(logging.DEBUG)
+
+# Sends the activity frames of a session to all its viewers (a Socket.IO room): each frame is
+# encoded once, into the same packets for everyone, and a viewer whose connection is already
+# MAX_BACKLOG packets behind is skipped (the frame is dropped for that viewer only), so that a
+# slow viewer neither holds up the others nor piles up frames in the server's memory.
+#
+# Encoding once and the backlog check use internals of python-socketio/python-engineio (the
+# versions pinned in requirements.txt): if a server lacks them, the broadcaster falls back to
+# emitting the frame to each viewer (encoded for each, and never dropped).
+
+MAX_BACKLOG = 2  # packets queued to a viewer, above which its frames are dropped
+
+
+class FrameBroadcaster:
+    def __init__(self, server, max_backlog: int = MAX_BACKLOG, namespace: str = '/'):
+        """
+        Keyword arguments:
+        server       -- the socketio.Server (SocketIO(...).server)
+        max_backlog  -- packets queued to a viewer, above which its frames are dropped
+        """
+        self.server = server
+        self.max_backlog = max_backlog
+        self.namespace = namespace
+
+        self.sent = collections.Counter()     # frames sent, per viewer (sid)
+        self.dropped = collections.Counter()  # frames dropped, per viewer (sid)
+
+        self.internals = (hasattr(server, 'packet_class') and hasattr(server, '_send_eio_packet')
+                          and hasattr(server.eio, '_get_socket'))
+        if not self.internals:
+            logger.warning(json.dumps({
+                'op': 'FrameBroadcaster',
+                'warning': 'Unsupported python-socketio/engineio version: frames are emitted to each viewer',
+            }, sort_keys=False, indent=4))
+
+    def backlog(self, eio_sid) -> int:
+        """
+        No. of packets queued to a connection, not sent yet
+        """
+        try:
+            return self.server.eio._get_socket(eio_sid).queue.qsize()
+        except KeyError:
+            return 0  # (disconnected)
+        except AttributeError:
+            return 0  # (unsupported engineio version: unknown)
+
+    def broadcast(self, event: str, frame, room: str):
+        """
+        Sends frame to the viewers in room that are keeping up
+        """
+        if not self.internals:
+            for sid, _ in list(self.server.manager.get_participants(self.namespace, room)):
+                self.server.emit(event, frame, to=sid, namespace=self.namespace)
+                self.sent[sid] += 1
+            return
+
+        encoded = self.server.packet_class(
+            packet.EVENT, namespace=self.namespace, data=[event, frame]).encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]  # (binary frames are several packets)
+        eio_packets = [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+
+        for sid, eio_sid in list(self.server.manager.get_participants(self.namespace, room)):
+            if self.backlog(eio_sid) > self.max_backlog:
+                self.dropped[sid] += 1
+                continue
+            for eio_pkt in eio_packets:
+                self.server._send_eio_packet(eio_sid, eio_pkt)
+            self.sent[sid] += 1
+
+    def forget(self, sid):
+        self.sent.pop(sid, None)
+        self.dropped.pop(sid, None)
+
+    def stats(self, sids) -> dict:
+        return {sid: {'sent': self.sent[sid], 'dropped': self.dropped[sid]} for sid in sids}
@@ -0,0 +1,109 @@
+import collections
+import threading
+import logging
+import json
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('network-pool')
+logger.setLevel(logging.DEBUG)
+
+# Keeps a few networks initialised ahead of time, so that "Init" can hand one out at once
+# instead of paying for main_init() + init(). A background thread builds networks until the
+# pool holds size of them, then sleeps until one is taken: the pool is refilled after each
+# hand-out (unless refill is False: the networks are then only built once), and never holds
+# more than size networks (memory is bounded). Taking a network while the pool is empty but one
+# is being built waits for it, rather than building another one alongside.
+
+
+class NetworkPool:
+    def __init__(self, new_network, size: int = 1, refill: bool = True):
+        self.new_network = new_network  # builds a new, initialised network
+        self.size = size
+        self.refill_pool = refill
+
+        self.lock = threading.Lock()
+        self.refill = threading.Condition(self.lock)
+        self.networks = collections.deque()
+        self.running = False
+        self.building = False  # a network is being built
+        self.thread = None
+
+        self.built = 0   # networks built
+        self.taken = 0   # networks handed out
+        self.missed = 0  # take() calls with the pool empty
+
+    def start(self):
+        with self.lock:
+            if self.running or self.size <= 0:
+                return
+            self.running = True
+            self.building = True  # (the first network: take() waits for it from now on)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.refill:
+            self.running = False
+            self.refill.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def take(self, timeout: float = None):
+        """
+        A ready network, removed from the pool: if the pool is empty, the network being built
+        (waiting for it at most timeout seconds, None: no limit), else None
+        """
+        with self.refill:
+            self.refill.wait_for(
+                lambda: self.networks or not (self.building and self.running), timeout)
+            if not self.networks:
+                self.missed += 1
+                return None
+            self.taken += 1
+            self.refill.notify_all()
+            return self.networks.popleft()
+
+    def run(self):
+        """
+        Builder: tops the pool up to size networks
+        """
+        while True:
+            with self.refill:
+                if not self.refill_pool and self.built >= self.size:
+                    self.building = False
+                    self.refill.notify_all()
+                    return
+                while self.running and len(self.networks) >= self.size:
+                    self.building = False
+                    self.refill.wait()
+                if not self.running:
+                    return
+                self.building = True
+
+            try:
+                network = self.new_network()
+            except Exception:
+                logger.exception(json.dumps(
+                    {'op': 'network pool', 'error': 'Could not build a network'}))
+                with self.refill:
+                    self.running = False
+                    self.building = False
+                    self.refill.notify_all()
+                return
+
+            with self.refill:
+                self.networks.append(network)
+                self.built += 1
+                self.building = False
+                self.refill.notify_all()
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'ready': len(self.networks),
+            'built': self.built,
+            'taken': self.taken,
+            'missed': self.missed,
+        }
@@ -0,0 +1,105 @@
+import threading
+import time
+import logging
+import json
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('publisher')
+logger.setLevel(logging.DEBUG)
+
+# Decouples the simulation from the GUI: the model thread puts frames (the activity after
+# a step) into a latest-frame slot, and an emitter thread sends the slot to the client at
+# most max_fps times per second. Frames that are not sent before the next one arrives are
+# coalesced (dropped): the simulation runs as fast as it can compute, whatever the client.
+#
+# The model thread should only build a frame when due() says one would be sent, so that
+# the steps in between skip the conversion altogether.
+
+
+class FramePublisher:
+    def __init__(self, socket, event: str = 'new-activity', max_fps: float = 30):
+        self.socket = socket
+        self.event = event
+        self.max_fps = max_fps
+
+        self.lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.lock)
+        self.frame = None
+        self.next_emit_time = 0.0
+        self.running = False
+        self.thread = None
+
+        self.published = 0  # frames put in the slot
+        self.emitted = 0    # frames sent
+        self.coalesced = 0  # frames replaced in the slot before being sent
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.frame_ready:
+            self.running = False
+            self.frame_ready.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def due(self) -> bool:
+        """
+        Whether a frame published now would be sent without waiting
+        """
+        return self.frame is None and time.monotonic() >= self.next_emit_time
+
+    def publish(self, frame):
+        """
+        Puts a frame in the slot, replacing the one not yet sent (if any)
+        """
+        with self.frame_ready:
+            if self.frame is not None:
+                self.coalesced += 1
+            self.frame = frame
+            self.published += 1
+            self.frame_ready.notify_all()
+
+    def run(self):
+        """
+        Emitter: sends the latest frame, at most max_fps times per second
+        """
+        while True:
+            with self.frame_ready:
+                while self.running and self.frame is None:
+                    self.frame_ready.wait()
+                if not self.running:
+                    return
+
+            # let frames coalesce until the next emission is due
+            delay = self.next_emit_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self.lock:
+                frame, self.frame = self.frame, None
+                if frame is None:
+                    continue
+                self.next_emit_time = time.monotonic() + 1 / self.max_fps
+                self.emitted += 1
+
+            try:
+                self.socket.emit(self.event, frame)
+            except Exception:
+                logger.exception(json.dumps(
+                    {'op': 'publisher', 'error': f"Could not emit '{self.event}'"}))
+
+    def stats(self):
+        return {
+            'published': self.published,
+            'emitted': self.emitted,
+            'coalesced': self.coalesced,
+            'max fps': self.max_fps,
+        }
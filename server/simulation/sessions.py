@@ -0,0 +1,340 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import logging
+import json
+from .simulation_manager import SimulationManager
+from .network_pool import NetworkPool
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('sessions')
+logger.setLevel(logging.DEBUG)
+
+# Several simulations on one server: each session owns a model, stepped by a SimulationManager
+# in a worker process of its own (so that sessions run in parallel, on separate cores, rather
+# than contending for one GIL). The server only routes messages: the commands of the clients
+# attached to a session go to its worker through a pipe, and the worker's events ('new-activity',
+# 'init-progress', notifications...) come back through the same pipe, to be relayed to them.
+#
+# Workers are started with 'spawn': they do not inherit the server's (eventlet) state.
+#
+# Each session's model writes its files (network saves, CA-structure) to a directory of its
+# own, SESSIONS_DIR/<session id>, so that concurrent sessions do not overwrite each other's.
+#
+# A client can leave a session and attach to it again later, but a session left without any
+# client for SessionRegistry.idle_timeout is closed (e.g. the tab of the GUI was closed), so that
+# abandoned sessions do not hold on to their worker (and a slot of max_sessions) forever.
+
+RELAY_INTERVAL = .005  # s between polls of a worker's pipe when there is nothing to relay
+SESSIONS_DIR = 'sessions'  # where the directories of the sessions are created
+
+# Commands sent to the workers (see execute_command)
+COMMANDS = ('init-simulation', 'continue-simulation', 'update-config', 'get-profile',
+            'run-steps', 'cancel-run')
+
+
+class PipeSocket:
+    """
+    Stands in for the SocketIO of a worker's SimulationManager: emits go to the server
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()  # emits come from the model & the publisher threads
+
+    def emit(self, event, data):
+        with self.lock:
+            self.conn.send((event, data))
+
+
+def execute_command(manager: SimulationManager, command: str, args: tuple):
+    """
+    Executes a command from the clients of the session on its SimulationManager
+    """
+    socket = manager.socket
+    if command == 'init-simulation':
+        if manager.init_simulation():
+            socket.emit('info-notification', {'msg': 'Initialising network...'})
+        else:
+            socket.emit('error-notification', {'msg': 'Network already initialised!'})
+    elif command == 'continue-simulation':
+        if manager.model_initialised:
+            manager.continue_simulation()
+        else:
+            socket.emit('error-notification', {'msg': 'Network not initialised!'})
+    elif command == 'update-config':
+        try:
+            manager.update_config_parameter(*args)
+        except ValueError as e:
+            socket.emit('error-notification', {'msg': str(e)})
+    elif command == 'get-profile':
+        socket.emit('profile', manager.profile())
+    elif command == 'run-steps':
+        try:
+            if not manager.run_steps(*args):
+                socket.emit('error-notification', {'msg': 'Network not initialised, or already running steps!'})
+        except ValueError as e:
+            socket.emit('error-notification', {'msg': str(e)})
+    elif command == 'cancel-run':
+        if not manager.cancel_run():
+            socket.emit('error-notification', {'msg': 'No steps being run!'})
+    else:
+        socket.emit('error-notification', {'msg': f"Unknown command '{command}'"})
+
+
+def run_session(conn, session_id: str, net_dir: str):
+    """
+    Worker process of a session: executes the commands received through conn until 'close'
+    (or until the server goes away). The model's files are written to net_dir
+    """
+    os.makedirs(net_dir, exist_ok=True)
+
+    # A session is only initialised once: its model is built ahead of time, but not replaced
+    pool = NetworkPool(SimulationManager.pooled_model, SimulationManager.pool_size, refill=False)
+    pool.start()
+    manager = SimulationManager(PipeSocket(conn), pool, net_dir)
+
+    logger.info(json.dumps({
+        'op': 'run_session',
+        'session': session_id,
+        'dir': net_dir,
+    }, sort_keys=False, indent=4))
+
+    while True:
+        try:
+            command, args = conn.recv()
+        except EOFError:
+            break
+        if command == 'close':
+            break
+        execute_command(manager, command, args)
+
+    manager.publisher.stop()
+    pool.stop()
+
+
+class Session:
+    def __init__(self, session_id: str, emit, context=None, base_dir: str = SESSIONS_DIR):
+        """
+        Starts the worker process of a new session
+
+        Keyword arguments:
+        session_id  -- id of the session (the clients attach to it by this id)
+        emit        -- called as emit(event, data, session_id) with the events of the worker
+        context     -- multiprocessing context of the worker (default: spawn)
+        base_dir    -- where the directory of the session (for its model's files) is created
+        """
+        self.id = session_id
+        self.dir = os.path.join(base_dir, session_id)
+        self.emit = emit
+        self.clients = set()  # socket ids of the clients attached to the session
+        self.controller = None  # the one client controlling the simulation (the others observe)
+        self.created = time.time()
+        self.idle_since = time.monotonic()  # since when no client is attached (None: some are)
+
+        context = context or multiprocessing.get_context('spawn')
+        self.conn, worker_conn = context.Pipe()
+        self.lock = threading.Lock()
+        self.process = context.Process(target=run_session, args=(worker_conn, session_id, self.dir),
+                                       name=f'session-{session_id}', daemon=True)
+        self.process.start()
+        worker_conn.close()
+
+        self.profile = None  # latest 'profile' of the worker (see request_profile)
+        self.profile_ready = threading.Event()
+
+        self.relay_thread = threading.Thread(target=self.relay, daemon=True)
+        self.relay_thread.start()
+
+    def send(self, command: str, *args):
+        """
+        Sends a command (see COMMANDS) to the worker
+        """
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command '{command}'")
+        with self.lock:
+            self.conn.send((command, args))
+
+    def relay(self):
+        """
+        Relays the events of the worker (until it exits)
+        """
+        while True:
+            try:
+                if not self.conn.poll():
+                    # (non-blocking polls: a green thread under eventlet)
+                    time.sleep(RELAY_INTERVAL)
+                    continue
+                event, data = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if event == 'profile':
+                self.profile = data
+                self.profile_ready.set()
+            self.emit(event, data, self.id)
+
+    def request_profile(self, timeout: float = 2) -> dict:
+        """
+        Asks the worker for its profile (see SimulationManager.profile) and waits for it
+        (None if it does not come within timeout seconds)
+        """
+        self.profile_ready.clear()
+        self.send('get-profile')
+        if not self.profile_ready.wait(timeout):
+            return None
+        return self.profile
+
+    def add_client(self, sid):
+        self.clients.add(sid)
+        self.idle_since = None
+
+    def remove_client(self, sid):
+        self.clients.discard(sid)
+        if not self.clients and self.idle_since is None:
+            self.idle_since = time.monotonic()
+
+    def idle(self) -> float:
+        """
+        Seconds since the last client left (0 while clients are attached)
+        """
+        return 0.0 if self.idle_since is None else time.monotonic() - self.idle_since
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def close(self, timeout: float = 5):
+        """
+        Stops the worker (killed if it does not exit within timeout seconds)
+        """
+        with self.lock:
+            try:
+                self.conn.send(('close', ()))
+            except OSError:
+                pass  # the worker is gone already
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+    def info(self) -> dict:
+        return {
+            'id': self.id,
+            'clients': len(self.clients),
+            'controlled': self.controller is not None,
+            'idle (s)': round(self.idle(), 3),
+            'alive': self.alive(),
+            'pid': self.process.pid,
+            'dir': self.dir,
+            'created': self.created,
+        }
+
+
+class SessionRegistry:
+    max_sessions = 8       # max. no. of sessions (worker processes) at a time
+    idle_timeout = 10 * 60  # s without clients after which a session is closed (None: never)
+    reap_interval = 10     # s between checks for idle sessions
+
+    def __init__(self, emit, context=None, base_dir: str = SESSIONS_DIR):
+        """
+        Keyword arguments:
+        emit      -- called as emit(event, data, session_id) with the events of the sessions
+        context   -- multiprocessing context of the workers (default: spawn)
+        base_dir  -- where the directories of the sessions (for their models' files) are created
+        """
+        self.emit = emit
+        self.context = context
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.sessions = dict()
+
+        self.stopped = threading.Event()
+        self.reaper = None
+        if self.idle_timeout is not None:
+            self.reaper = threading.Thread(target=self.reap, daemon=True)
+            self.reaper.start()
+
+    def create(self) -> Session:
+        """
+        A new session, with its worker started. Raises RuntimeError if there are already
+        max_sessions sessions
+        """
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise RuntimeError(f'Too many sessions (max. {self.max_sessions})')
+            session = Session(uuid.uuid4().hex, self.emit, self.context, self.base_dir)
+            self.sessions[session.id] = session
+
+        logger.info(json.dumps({
+            'op': 'create session',
+            'session': session.id,
+            'sessions': len(self.sessions),
+        }, sort_keys=False, indent=4))
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """
+        The session session_id. Raises KeyError if there is no such session
+        """
+        with self.lock:
+            return self.sessions[session_id]
+
+    def close(self, session_id: str):
+        """
+        Stops the worker of the session and forgets it. Raises KeyError if there is no such session
+        """
+        with self.lock:
+            session = self.sessions.pop(session_id)
+        session.close()
+
+        logger.info(json.dumps({
+            'op': 'close session',
+            'session': session_id,
+            'sessions': len(self.sessions),
+        }, sort_keys=False, indent=4))
+
+    def close_idle(self) -> list:
+        """
+        Closes the sessions without clients for idle_timeout seconds; returns their ids
+        """
+        with self.lock:
+            idle = [session for session in self.sessions.values()
+                    if session.idle() >= self.idle_timeout and not session.clients]
+            for session in idle:
+                del self.sessions[session.id]
+
+        for session in idle:
+            session.close()
+            logger.info(json.dumps({
+                'op': 'close idle session',
+                'session': session.id,
+                'idle (s)': round(session.idle(), 3),
+                'sessions': len(self.sessions),
+            }, sort_keys=False, indent=4))
+        return [session.id for session in idle]
+
+    def reap(self):
+        """
+        Reaper: closes the idle sessions (see close_idle) every reap_interval seconds, until
+        close_all
+        """
+        while not self.stopped.wait(self.reap_interval):
+            try:
+                self.close_idle()
+            except Exception:
+                logger.exception(json.dumps({'op': 'reap', 'error': 'Could not close the idle sessions'}))
+
+    def close_all(self):
+        self.stopped.set()
+        for session_id in list(self.sessions):
+            self.close(session_id)
+
+    def all(self) -> list:
+        with self.lock:
+            return list(self.sessions.values())
+
+    def list(self) -> list:
+        return [session.info() for session in self.all()]
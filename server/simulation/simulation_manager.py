@@ -3,6 +3,9 @@ import time
 from queue import Queue
 from flask_socketio import SocketIO
 from ..models.standardNet6Areas import StandardNet6Areas
+from . import activity_encoding
+from .publisher import FramePublisher
+from .network_pool import NetworkPool
 import logging
 import json
 
@@ -16,46 +19,180 @@ logger.setLevel(logging.DEBUG)
 # Gives us a generic socket interface/server, into which we can plug and pull different neural networks as we wish
 
 
+def until_training_phase(model: StandardNet6Areas):
+    phase = model.training_phase
+    return lambda: model.training_phase != phase
+
+
+def until_presentation(model: StandardNet6Areas):
+    presentations = model.freq_distrib.sum()
+    return lambda: model.freq_distrib.sum() != presentations
+
+
+def until_training_end(model: StandardNet6Areas):
+    return lambda: not model.strainNet
+
+
+# Conditions to run steps until (see run_steps): each builds, when the run starts, a
+# function telling whether to stop
+RUN_UNTIL = {
+    'training-phase': until_training_phase,  # the training moves to its next phase
+    'presentation': until_presentation,      # the next input pattern is presented
+    'training-end': until_training_end,      # the training is over (or switched off)
+}
+
+
+class StepRun:
+    def __init__(self, steps: int, until: str):
+        self.steps = steps
+        self.until = until
+        self.done = 0
+        self.cancelled = False
+
+
 class SimulationManager:
-    def __init__(self, socket):
+    # 'new-activity' is emitted as a binary frame (see activity_encoding)
+    activity_dtype = 'float32'  # float32, float16 or uint8 (quantised)
+    activity_decimate = 1       # averaging block size of the 2d maps (1: full resolution)
+    max_fps = 30                # max. no. of 'new-activity' frames sent per second
+    overlaps_keyframe = 30      # frames between two sends of the CA overlaps, even if unchanged
+    profiling = True            # record per-stage timings of the steps (see profile())
+    seed = None                 # seed of the model (None: not reproducible)
+    kernel_cache_dir = None     # cache of the initial kernels, for a seed (see KERNEL_CACHE_DIR)
+    pool_size = 1               # max. no. of models initialised ahead of time (see NetworkPool)
+    run_progress_interval = .5  # s between 'run-steps-progress' events (see run_steps)
+
+    def __init__(self, socket, pool: NetworkPool = None, net_dir: str = '.'):
         self.socket: SocketIO = socket
+        self.pool = pool  # models initialised ahead of time (None: none)
+        self.net_dir = net_dir  # where the model writes its files (see StandardNet6Areas.net_dir)
 
         self.config_queue = Queue()
         self.simulation_lock = threading.Lock()
         self.simulation_condition = threading.Condition(self.simulation_lock)
         self.simulation_thread = None
 
-        self.model = StandardNet6Areas()
-        self.model.main_init()
+        # taken from the pool or initialised in the simulation thread (see init_simulation)
+        self.model: StandardNet6Areas = None
 
+        self.model_initialising = False
         self.model_initialised = False
         self.model_running = False
+        self.step_run: StepRun = None  # steps being run (see run_steps)
+
+        self.publisher = FramePublisher(
+            self.socket, 'new-activity', self.max_fps)
+        # version of the CA overlaps last put in a frame, and the frames since (see frame_overlaps)
+        self.overlaps_sent = None
+        self.frames_since_overlaps = 0
+
+    @classmethod
+    def new_model(cls, progress=None) -> StandardNet6Areas:
+        """
+        A new model, initialised (see StandardNet6Areas.init for progress)
+        """
+        model = StandardNet6Areas()
+        model.seed = cls.seed
+        model.KERNEL_CACHE_DIR = cls.kernel_cache_dir
+        model.main_init()
+        model.profiler.enabled = cls.profiling
+        model.init(progress=progress)
+        return model
+
+    @classmethod
+    def pooled_model(cls) -> StandardNet6Areas:
+        """
+        A new model for the pool: initialised without holding up the socket handlers
+        (green threads under eventlet) for more than one projection at a time
+        """
+        return cls.new_model(progress=lambda *_: time.sleep(0))
 
-    def init_simulation(self):
+    def init_simulation(self) -> bool:
         """
-        Initialises the model to run in a background thread
+        Takes a model from the pool or, if it is empty, initialises one in a background
+        thread, which then runs it: the socket handlers carry on meanwhile, and the client
+        is sent 'init-progress' events (one per projection initialised) and an
+        'info-notification' once the model is ready. False if the model is already
+        initialised (or being initialised)
 
         Init ->
         """
         with self.simulation_lock:
-            if self.model_running or self.model_initialised:
+            if self.model_running or self.model_initialised or self.model_initialising:
                 logger.error(json.dumps({
                     'op': 'init_simulation',
-                    'error': 'Cannot start simulation: model already running!',
+                    'error': 'Cannot start simulation: model already initialised!',
                 }, sort_keys=False, indent=4))
-                return
+                return False
 
             logger.info(json.dumps({
                 'op': 'init_simulation',
                 'info': 'Initialising model in background',
             }, sort_keys=False, indent=4))
 
-            self.model.init()
+            self.model_initialising = True
+            self.simulation_thread = threading.Thread(
+                target=self.run_simulation, daemon=True)
+            self.simulation_thread.start()
+            return True
+
+    def run_simulation(self):
+        """
+        Simulation thread: initialises the model, then executes it
+        """
+        try:
+            self.initialise_model()
+        except Exception as e:
+            logger.exception(json.dumps({
+                'op': 'init_simulation',
+                'error': str(e),
+            }, sort_keys=False, indent=4))
+            with self.simulation_lock:
+                self.model_initialising = False
+            self.socket.emit('error-notification',
+                             {'msg': 'Network initialisation failed!'})
+            return
+
+        self.execute_model()
+
+    def initialise_model(self):
+        start_time = time.perf_counter()
+
+        model = self.pool.take() if self.pool is not None else None
+        if model is not None:
+            projections = len(model.J_offsets)
+            self.report_init_progress(projections, projections, None)
+        else:
+            model = self.new_model(progress=self.report_init_progress)
+        model.net_dir = self.net_dir
+        self.model = model
+
+        with self.simulation_lock:
+            self.model_initialising = False
             self.model_initialised = True
+        self.publisher.start()
+
+        logger.info(json.dumps({
+            'op': 'init_simulation',
+            'info': 'Model initialised',
+            'time (s)': round(time.perf_counter() - start_time, 3),
+            'pool': None if self.pool is None else self.pool.stats(),
+        }, sort_keys=False, indent=4))
+        self.socket.emit('info-notification',
+                         {'msg': 'Network initialised!'})
 
-            simulation_thread = threading.Thread(
-                target=self.execute_model)
-            simulation_thread.start()
+    def report_init_progress(self, done: int, total: int, projection: tuple):
+        """
+        Sends the progress of model.init() to the client ('init-progress')
+        """
+        self.socket.emit('init-progress', {
+            'done': done,
+            'total': total,
+            # e.g. 'area1-area2' (None: from the kernel cache, or a model from the pool)
+            'projection': None if projection is None else 'area%d-area%d' % (projection[0] + 1, projection[1] + 1),
+        })
+        # yield to the socket handlers between projections (green threads under eventlet)
+        time.sleep(0)
 
     def continue_simulation(self):
         with self.simulation_lock:
@@ -64,53 +201,201 @@ class SimulationManager:
                 self.simulation_condition.notify_all()
 
     def execute_model(self):
-        with self.simulation_condition:
-            while not self.model_running:
-                self.simulation_condition.wait()
-
-        while self.model_running:
-            # Check for updated config from the main thread
-            if not self.config_queue.empty():
-                config_change = self.config_queue.get()
-                param = config_change['param']
-                value = config_change['value']
-                if param == 'noise':
-                    self.model.config_set_noise(value)
-                elif param == 'global-inhibition':
-                    self.model.config_set_global_inhibition(value)
-                elif param == 'pattern-number':
-                    self.model.config_set_pattern_number(value)
-                elif param == 'is-receiving-sensory-input':
-                    self.model.config_set_is_receiving_sensory_input(value)
-                elif param == 'is-receiving-motor-input':
-                    self.model.config_set_is_receiving_motor_input(value)
-                elif param == 'sensory-stimulation-amplitude':
-                    self.model.config_set_sensory_stimulation_amplitude(value)
-                elif param == 'motor-stimulation-amplitude':
-                    self.model.config_set_motor_stimulation_amplitude(value)
-                elif param == 'network-training-activated':
-                    self.model.config_set_network_training_activated(value)
-                elif param == 'compute-ca-overlaps':
-                    self.model.config_set_compute_ca_overlaps(value)
-
-            current_activity = self.model.step()
-            self.socket.emit('new-activity', {
-                'currentStep': current_activity['currentStep'],
-                'config': current_activity['config'],
-                'totalActivity': current_activity['totalActivity'],
-                'sensoryInput1': current_activity['sensInput'],
-                'motorInput1': current_activity['motorInput'],
-                'globalInhibition': current_activity['globalInhibition'],
-                'longTermPotentiation': current_activity['longTermPotentiation'],
-                'longTermDepression': current_activity['longTermDepression'],
-                'potentials': current_activity['potentials'],
-                'cellAssemblyOverlaps': current_activity['cellAssemblyOverlaps']
-            })
-            time.sleep(0.01)
+        while True:
+            with self.simulation_condition:
+                while not self.model_running and self.step_run is None:
+                    self.simulation_condition.wait()
+                step_run = self.step_run
+
+            if step_run is not None:
+                self.execute_step_run(step_run)
+                continue
+
+            self.apply_config_changes()
+            self.model.step(output=False)
+            # only build a frame when the publisher would send it: the steps in between
+            # are coalesced
+            if self.publisher.due():
+                self.publisher.publish(self.current_frame())
+
+            # yield to the emitter and the socket handlers (green threads under eventlet)
+            time.sleep(0)
+
+    def apply_config_changes(self):
+        """
+        Applies the config updated from the main thread (see update_config_parameter), if any
+        """
+        if self.config_queue.empty():
+            return
+
+        config_change = self.config_queue.get()
+        param = config_change['param']
+        value = config_change['value']
+        if param == 'noise':
+            self.model.config_set_noise(value)
+        elif param == 'global-inhibition':
+            self.model.config_set_global_inhibition(value)
+        elif param == 'pattern-number':
+            self.model.config_set_pattern_number(value)
+        elif param == 'is-receiving-sensory-input':
+            self.model.config_set_is_receiving_sensory_input(value)
+        elif param == 'is-receiving-motor-input':
+            self.model.config_set_is_receiving_motor_input(value)
+        elif param == 'sensory-stimulation-amplitude':
+            self.model.config_set_sensory_stimulation_amplitude(value)
+        elif param == 'motor-stimulation-amplitude':
+            self.model.config_set_motor_stimulation_amplitude(value)
+        elif param == 'network-training-activated':
+            self.model.config_set_network_training_activated(value)
+        elif param == 'compute-ca-overlaps':
+            self.model.config_set_compute_ca_overlaps(value)
+        elif param == 'activity-dtype':
+            self.activity_dtype = value
+        elif param == 'activity-decimation':
+            self.activity_decimate = int(value)
+        elif param == 'max-fps':
+            self.publisher.max_fps = float(value)
+        elif param == 'profiling':
+            self.model.profiler.enabled = bool(value)
+
+    def run_steps(self, steps: int = None, until: str = None) -> bool:
+        """
+        Fast-forwards the model: runs steps steps, or until the condition until (see RUN_UNTIL)
+        is met, whichever comes first, without building any frame. The client is sent
+        'run-steps-progress' events every run_progress_interval seconds, then the final frame
+        and 'run-steps-done'; the model then carries on as before (running or paused).
+        False if the model is not initialised, or is already running steps
+
+        Keyword arguments:
+        steps  -- max. no. of steps (None: no limit, until must then be given)
+        until  -- name of the condition to stop at, e.g. 'training-phase' (None: none)
+        """
+        if steps is None and until is None:
+            raise ValueError('Expected a no. of steps or a condition to run until')
+        if steps is not None and steps <= 0:
+            raise ValueError(f'Expected a positive no. of steps, not {steps}')
+        if until is not None and until not in RUN_UNTIL:
+            raise ValueError(f"Unknown condition '{until}', expected one of {list(RUN_UNTIL)}")
+
+        with self.simulation_lock:
+            if not self.model_initialised or self.step_run is not None:
+                return False
+            self.step_run = StepRun(steps, until)
+            self.simulation_condition.notify_all()
+            return True
+
+    def cancel_run(self) -> bool:
+        """
+        Stops the steps being run (see run_steps) after the current one; False if there are none
+        """
+        with self.simulation_lock:
+            if self.step_run is None:
+                return False
+            self.step_run.cancelled = True
+            return True
+
+    def execute_step_run(self, step_run: StepRun):
+        start_time = time.perf_counter()
+        progress_time = start_time
+        condition = None if step_run.until is None else RUN_UNTIL[step_run.until](self.model)
+
+        while True:
+            if step_run.cancelled:
+                reason = 'cancelled'
+                break
+            if step_run.steps is not None and step_run.done >= step_run.steps:
+                reason = 'steps'
+                break
+            if condition is not None and condition():
+                reason = step_run.until
+                break
+
+            self.apply_config_changes()
+            self.model.step(output=False)
+            step_run.done += 1
+
+            now = time.perf_counter()
+            if now - progress_time >= self.run_progress_interval:
+                progress_time = now
+                self.socket.emit('run-steps-progress', {
+                    'done': step_run.done,
+                    'steps': step_run.steps,
+                    'currentStep': self.model.stp,
+                })
+
+            # yield to the socket handlers (green threads under eventlet), e.g. to cancel
+            time.sleep(0)
+
+        run_time = time.perf_counter() - start_time
+        with self.simulation_lock:
+            self.step_run = None
+
+        self.publisher.publish(self.current_frame())
+        self.socket.emit('run-steps-done', {
+            'done': step_run.done,
+            'currentStep': self.model.stp,
+            'reason': reason,
+            'time (s)': run_time,
+            'steps/s': step_run.done / run_time if run_time > 0 else None,
+        })
+
+    def current_frame(self):
+        """
+        The current activity of the model, as sent to the client ('new-activity')
+        """
+        with self.model.profiler.stage('serialisation'):
+            return self.encode_frame()
+
+    def frame_overlaps(self) -> bool:
+        """
+        Whether the next frame carries the CA overlaps (NAREAS x P x P): only if they changed
+        since they were last sent, or every overlaps_keyframe frames (for the viewers that
+        attached since, or missed the frame with the last change)
+        """
+        if self.model.ca_ovlps_version == self.overlaps_sent and \
+                self.frames_since_overlaps < self.overlaps_keyframe:
+            self.frames_since_overlaps += 1
+            return False
+
+        self.overlaps_sent = self.model.ca_ovlps_version
+        self.frames_since_overlaps = 0
+        return True
+
+    def encode_frame(self):
+        return activity_encoding.encode_activity(
+            self.model, self.activity_dtype, self.activity_decimate, self.frame_overlaps())
 
     def update_config_parameter(self, param, new_value):
+        """
+        Queues a config change, applied by the simulation thread before its next step (see
+        apply_config_changes). Raises ValueError for an invalid activity dtype or decimation,
+        which would break the frames of all the viewers
+        """
+        if param == 'activity-dtype' and new_value not in activity_encoding.DTYPES:
+            raise ValueError(
+                f"Unsupported activity dtype '{new_value}', expected one of {list(activity_encoding.DTYPES)}")
+        if param == 'activity-decimation' and not (
+                isinstance(new_value, int) and not isinstance(new_value, bool) and new_value >= 1):
+            raise ValueError(f'Expected a positive integer activity decimation, not {new_value!r}')
+
         with self.simulation_lock:
             self.config_queue.put({'param': param, 'value': new_value})
 
     def current_step(self):
         return self.model.stp
+
+    def profile(self):
+        """
+        Per-stage timings of the steps so far (see profiling.StageProfiler.snapshot), with the
+        current step, the frames published to the client and the state of the pool
+        """
+        pool = None if self.pool is None else self.pool.stats()
+        if not self.model_initialised:
+            return {'currentStep': 0, 'enabled': self.profiling, 'stages': {},
+                    'frames': self.publisher.stats(), 'pool': pool}
+        return {
+            'currentStep': self.model.stp,
+            **self.model.profiler.snapshot(),
+            'frames': self.publisher.stats(),
+            'pool': pool,
+        }
@@ -1,12 +1,16 @@
 import logging
 import json
-from .simulation_manager import SimulationManager
-from flask_socketio import SocketIO
-from flask import Flask, request
+from .sessions import SessionRegistry, Session
+from .broadcast import FrameBroadcaster
+from flask_socketio import SocketIO, join_room, leave_room
+from flask import Flask, request, jsonify
 import eventlet
 
 # https://stackoverflow.com/questions/34581255/python-flask-socketio-send-message-from-thread-not-always-working
-eventlet.monkey_patch()
+# (not in the session workers: spawned, they import this module as __mp_main__, and their
+# threads must stay real ones)
+if __name__ != '__mp_main__':
+    eventlet.monkey_patch()
 
 
 app = Flask(__name__)
@@ -19,6 +23,26 @@ logger = logging.getLogger('simulation-server')
 logger.setLevel(logging.DEBUG)
 
 
+def emit_to_session(event, data, session_id):
+    """
+    Sends an event of a session's worker to all the clients attached to the session: the
+    activity frames to those keeping up (see broadcast), the other events to all
+    """
+    if event == 'new-activity':
+        broadcaster.broadcast(event, data, session_id)
+    else:
+        socketio.emit(event, data, to=session_id)
+
+
+broadcaster = FrameBroadcaster(socketio.server)
+
+
+# Each session runs its own model in a worker process (see sessions); this server only
+# routes the messages between the clients and the workers
+sessions = SessionRegistry(emit_to_session)
+client_sessions = dict()  # client (socket) id -> id of the session it is attached to
+
+
 @app.route('/')
 def home():
     """
@@ -27,8 +51,86 @@ def home():
     return 'Home'
 
 
-active_client_connection = None
-sim_manager: SimulationManager = None
+@app.route('/sessions')
+def list_sessions():
+    """
+    The running sessions (see Session.info), with the frames sent to & dropped for each client
+    """
+    return jsonify([{**session.info(), 'viewers': broadcaster.stats(session.clients)}
+                    for session in sessions.all()])
+
+
+@app.route('/sessions/<session_id>/profile')
+def profile(session_id):
+    """
+    Per-stage timings of a session's simulation (see SimulationManager.profile)
+    """
+    try:
+        session = sessions.get(session_id)
+    except KeyError:
+        return jsonify({'msg': 'No such session!'}), 404
+
+    session_profile = session.request_profile()
+    if session_profile is None:
+        return jsonify({'msg': 'Session not responding!'}), 504
+    return jsonify(session_profile)
+
+
+def attached_session(event: str, control: bool = True) -> Session:
+    """
+    The session the requesting client is attached to (None, with the client notified, if none,
+    or if control is needed and the client is only observing the session)
+    """
+    session_id = client_sessions.get(request.sid)
+    try:
+        session = sessions.get(session_id)
+    except KeyError:
+        logger.error(json.dumps({
+            'socket-event': event,
+            'client id': request.sid,
+            'error': 'Client not attached to a session!',
+        }, sort_keys=False, indent=4))
+
+        socketio.emit('error-notification',
+                      {'msg': 'No session! Create or attach to one first'}, to=request.sid)
+        return None
+
+    if control and session.controller != request.sid:
+        socketio.emit('error-notification',
+                      {'msg': 'Observing only: another client controls the simulation!'}, to=request.sid)
+        return None
+    return session
+
+
+def attach(session: Session, role: str = 'controller'):
+    """
+    Attaches the requesting client to session (detaching it from its previous one, if any), as
+    its controller if asked for and nobody controls it already, otherwise as an observer
+    """
+    detach()
+    join_room(session.id)
+    session.add_client(request.sid)
+    if role == 'controller' and session.controller is None:
+        session.controller = request.sid
+    client_sessions[request.sid] = session.id
+
+    role = 'controller' if session.controller == request.sid else 'observer'
+    socketio.emit('session', {'id': session.id, 'role': role}, to=request.sid)
+
+
+def detach():
+    session_id = client_sessions.pop(request.sid, None)
+    broadcaster.forget(request.sid)
+    if session_id is None:
+        return
+    leave_room(session_id)
+    try:
+        session = sessions.get(session_id)
+    except KeyError:
+        return  # closed
+    session.remove_client(request.sid)
+    if session.controller == request.sid:
+        session.controller = None  # free for another client to take
 
 
 @socketio.on('connect')
@@ -38,126 +140,195 @@ def handle_connection():
 
     Establishes a connection with the client ready for realtime bidirectional communication between
     the gui (sending to the net user-modified parameter values) and the neural net (sending to the gui network activity at each step)
-    We allow only one client connection at a time here, and assume only a single (local) user who can
-    disconnect and reconnect to a simulation as it runs server side
+    The client then creates a session, or attaches to an existing one: any number of clients can be
+    connected, to as many sessions; a client can disconnect and reattach to its session as it runs server side
     """
-    global active_client_connection
     logger.info(json.dumps({
         'socket-event': 'connect',
         'new client id': request.sid,
     }, sort_keys=False, indent=4))
 
-    if active_client_connection is not None:
-        logger.info(json.dumps({
-            'socket-event': 'connect',
-            'requester client id': request.sid,
-            'active client id': active_client_connection,
-        }, sort_keys=False, indent=4))
 
-        # Disconnect the new connection if there is already an active connection
-        socketio.send('disconnect', {'msg': 'Connection already active.'})
-        return False
+@socketio.on('create-session')
+def handle_create_session():
+    """
+    create-session
 
-    # Store the session ID of the active connection
-    active_client_connection = request.sid
+    Starts a new session (with its own model, in a worker process) and attaches the client to it:
+    the client is sent its id ('session')
+    """
+    try:
+        session = sessions.create()
+    except RuntimeError as e:
+        socketio.emit('error-notification', {'msg': str(e)}, to=request.sid)
+        return
 
+    attach(session)
 
-@socketio.on('init-simulation')
-def handle_init_simulation():
+    logger.info(json.dumps({
+        'socket-event': 'create-session',
+        'client id': request.sid,
+        'session': session.id,
+    }, sort_keys=False, indent=4))
+
+
+@socketio.on('attach-session')
+def handle_attach_session(session_id, role='controller'):
     """
-    init-simulation
+    attach-session
 
-    Sets up the simulation, with a model initialised in a background thread, ready to run
+    Attaches the client to a running session, by id, as its controller (if no other client
+    controls it) or as an observer (role 'observer'): observers receive all the activity of
+    the simulation, but cannot change it
     """
+    try:
+        session = sessions.get(session_id)
+    except KeyError:
+        socketio.emit('error-notification', {'msg': 'No such session!'}, to=request.sid)
+        return
+
+    attach(session, role)
+
     logger.info(json.dumps({
-        'socket-event': 'init-simulation',
+        'socket-event': 'attach-session',
         'client id': request.sid,
-        'active client id': active_client_connection,
+        'session': session.id,
+        'clients': len(session.clients),
+        'controller': session.controller == request.sid,
     }, sort_keys=False, indent=4))
 
-    global sim_manager
-    if sim_manager and sim_manager.model_initialised is True:
-        logger.error(json.dumps({
-            'socket-event': 'init-simulation',
-            'error': 'Model already initialised!',
-        }, sort_keys=False, indent=4))
 
-        socketio.emit('error-notification',
-                      {'msg': 'Network already initialised!'})
+@socketio.on('close-session')
+def handle_close_session():
+    """
+    close-session
+
+    Stops the session the client is attached to (for all its clients)
+    """
+    session = attached_session('close-session')
+    if session is None:
         return
 
-    # Setup a new simulation with the model initialised
-    sim_manager = SimulationManager(socketio)
-    sim_manager.init_simulation()
+    socketio.emit('info-notification', {'msg': 'Session closed!'}, to=session.id)
+    for client in list(session.clients):
+        client_sessions.pop(client, None)
+        leave_room(session.id, sid=client)
+    sessions.close(session.id)
+
+
+@socketio.on('init-simulation')
+def handle_init_simulation():
+    """
+    init-simulation
 
-    socketio.emit('info-notification',
-                  {'msg': 'Network initialised!'})
+    Sets up the simulation of the session, with a model initialised in the background, ready to run.
+    The progress is sent as 'init-progress' events, and an 'info-notification' once the model is initialised
+    """
+    session = attached_session('init-simulation')
+    if session is None:
+        return
 
     logger.info(json.dumps({
         'socket-event': 'init-simulation',
-        'simulation initialised': sim_manager.model_initialised,
-        'model running': sim_manager.model_running,
+        'client id': request.sid,
+        'session': session.id,
     }, sort_keys=False, indent=4))
 
+    session.send('init-simulation')
+
 
 @socketio.on('continue-simulation')
 def handle_start_simulation():
     """
     continue-simulation
 
-    Resumes execution of the model running in the background
+    Resumes execution of the session's model running in the background
     """
-    logger.info(json.dumps({
-        'socket-event': 'continue-simulation',
-        'client id': request.sid,
-        'active client id': active_client_connection,
-    }, sort_keys=False, indent=4))
-
-    global sim_manager
-    if not sim_manager or (sim_manager and not sim_manager.model_initialised):
-        logger.error(json.dumps({
-            'socket-event': 'continue-simulation',
-            'error': 'Model not yet initialised! Run "Init" first',
-        }, sort_keys=False, indent=4))
-
-        socketio.emit('error-notification',
-                      {'msg': 'Network not initialised!'})
+    session = attached_session('continue-simulation')
+    if session is None:
         return
 
-    # Resume the simulation run, executing the next step of an initialised model
-    sim_manager.continue_simulation()
-
     logger.info(json.dumps({
         'socket-event': 'continue-simulation',
-        'simulation initialised': sim_manager.model_initialised,
-        'model running': sim_manager.model_running,
-        'model step': sim_manager.current_step()
+        'client id': request.sid,
+        'session': session.id,
     }, sort_keys=False, indent=4))
 
+    session.send('continue-simulation')
+
 
 @socketio.on('update-config')
 def handle_update_config(param, new_value):
     """
     update-config
 
-    Updates a simulation parameter for the initialised model 
+    Updates a simulation parameter for the session's model
     """
+    session = attached_session('update-config')
+    if session is None:
+        return
+
     logger.info(json.dumps({
         'socket-event': 'update-config',
         'client id': request.sid,
-        'active client id': active_client_connection,
+        'session': session.id,
         'param': param,
         'value': new_value
     }, sort_keys=False, indent=4))
 
-    global sim_manager
-    if not sim_manager or (sim_manager and not sim_manager.model_initialised):
-        logger.error(json.dumps({
-            'socket-event': 'update-config',
-            'error': 'Model not yet initialised! Run "Init" first',
-        }, sort_keys=False, indent=4))
+    session.send('update-config', param, new_value)
+
+
+@socketio.on('run-steps')
+def handle_run_steps(steps=None, until=None):
+    """
+    run-steps
+
+    Fast-forwards the session's model by steps steps, or until a condition is met (see
+    SimulationManager.run_steps): only progress events, the final frame and 'run-steps-done'
+    are sent meanwhile
+    """
+    session = attached_session('run-steps')
+    if session is None:
+        return
+
+    logger.info(json.dumps({
+        'socket-event': 'run-steps',
+        'client id': request.sid,
+        'session': session.id,
+        'steps': steps,
+        'until': until,
+    }, sort_keys=False, indent=4))
+
+    session.send('run-steps', steps, until)
+
 
-    sim_manager.update_config_parameter(param, new_value)
+@socketio.on('cancel-run')
+def handle_cancel_run():
+    """
+    cancel-run
+
+    Stops the steps being run by the session's model (see run-steps)
+    """
+    session = attached_session('cancel-run')
+    if session is None:
+        return
+
+    session.send('cancel-run')
+
+
+@socketio.on('get-profile')
+def handle_get_profile():
+    """
+    get-profile
+
+    Sends the per-stage timings of the session's simulation to its clients ('profile')
+    """
+    session = attached_session('get-profile', control=False)
+    if session is None:
+        return
+
+    session.send('get-profile')
 
 
 @socketio.on('disconnect')
@@ -165,16 +336,10 @@ def handle_disconnection():
     """
     Disconnect
 
-    The client can disconnect and then connect again, "resuming" the simulation as they left off
-    We ensure only one client can be connected at a time
+    The client can disconnect and then attach again to its session, "resuming" the simulation as
+    they left off: the session keeps running until closed
     """
-    # global sim_manager
-    # if sim_manager is not None:
-    #     del sim_manager
-    #     sim_manager = None
-
-    global active_client_connection
-    active_client_connection = None
+    detach()
 
     logger.info(json.dumps({
         'socket-event': 'disconnect',
@@ -185,4 +350,7 @@ def handle_disconnection():
 if __name__ == '__main__':
     # Start the WebSocket server
     # socketio.run(app, host='localhost', port=9000)
-    socketio.run(app, host='0.0.0.0')
+    try:
+        socketio.run(app, host='0.0.0.0')
+    finally:
+        sessions.close_all()
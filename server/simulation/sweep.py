@@ -0,0 +1,216 @@
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from . import train
+from ..models.standardNet6Areas import StandardNet6Areas
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('sweep')
+logger.setLevel(logging.DEBUG)
+
+# Parameter sweeps: many independent (headless) training runs, one per point of a parameter
+# grid, spread over a pool of worker processes. Each finished run is appended as one row of a
+# CSV file; re-running the same sweep skips the runs that are already in the file (with the
+# same settings: max. steps, presentations and sparse mode), e.g.
+#
+#   python3 -m server.simulation.sweep --param seed=1,2,3,4 --param J_PROB=.2,.28 --out sweep.csv
+
+
+def expand_grid(grid: dict):
+    """
+    All the combinations of the values in grid ({parameter: [values]}), as a list of {parameter: value}
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_id(params: dict) -> str:
+    """
+    Identifies a run of the sweep by its parameter values, e.g. "seed=1,J_PROB=0.28"
+    """
+    return ','.join(f'{name}={value}' for name, value in params.items())
+
+
+def run_settings(max_steps: int = None, presentations: int = None, sparse: bool = False) -> dict:
+    """
+    The settings shared by all the runs of a sweep (recorded with each run: a run done with
+    other settings is not a run of this sweep)
+    """
+    return {'max_steps': max_steps, 'presentations': presentations, 'sparse': sparse}
+
+
+def csv_value(value) -> str:
+    """
+    value as read back from the results file
+    """
+    return '' if value is None else str(value)
+
+
+def metric_columns():
+    net = StandardNet6Areas
+    return (['completed', 'steps', 'wall time (s)'] +
+            [f'CA size area{area + 1}' for area in range(net.NAREAS)] +
+            [f'CA overlap area{area + 1}' for area in range(net.NAREAS)])
+
+
+def run_one(params: dict, max_steps: int = None, presentations: int = None, sparse: bool = False):
+    """
+    Trains one network (in a worker process) and reduces its summary to one row of the results:
+    the mean CA size (over all patterns) and the mean overlap between different CAs, in each area
+    """
+    params = dict(params)
+    seed = params.pop('seed', None)
+
+    start_time = time.perf_counter()
+    summary = train.run_training(seed=seed, max_steps=max_steps, presentations=presentations,
+                                 sparse=sparse, params=params)
+    wall_time = time.perf_counter() - start_time
+
+    sizes = np.array(summary['CA sizes'], dtype=float)   # P x NAREAS
+    overlaps = np.array(summary['CA overlaps'])          # NAREAS x P x P
+    p = overlaps.shape[1]
+    off_diagonal = ~np.eye(p, dtype=bool)
+
+    row = {'completed': summary['completed'],
+           'steps': summary['steps'], 'wall time (s)': round(wall_time, 3)}
+    for area in range(overlaps.shape[0]):
+        row[f'CA size area{area + 1}'] = sizes[:, area].mean()
+        row[f'CA overlap area{area + 1}'] = overlaps[area][off_diagonal].mean()
+    return row
+
+
+def check_columns(out_file: str, fieldnames: list):
+    """
+    Raises ValueError if the results file exists with other columns than fieldnames (the rows
+    of this sweep would not line up with its header)
+    """
+    if not os.path.exists(out_file) or os.path.getsize(out_file) == 0:
+        return
+    with open(out_file, newline='') as f:
+        header = next(csv.reader(f), [])
+    if header != fieldnames:
+        raise ValueError(
+            f"'{out_file}' has the columns {header}, not those of this sweep: {fieldnames}")
+
+
+def completed_runs(out_file: str, settings: dict = None):
+    """
+    Ids of the runs already recorded in the results file with the given settings (see
+    run_settings), for resuming a sweep
+    """
+    if not os.path.exists(out_file):
+        return set()
+    settings = settings or dict()
+    with open(out_file, newline='') as f:
+        return {row['run'] for row in csv.DictReader(f)
+                if all(row.get(name) == csv_value(value) for name, value in settings.items())}
+
+
+def run_sweep(grid: dict, out_file: str, max_steps: int = None, presentations: int = None,
+              sparse: bool = False, workers: int = None):
+    """
+    Runs (in parallel) all the runs of the grid that are not yet recorded in out_file, appending
+    one row per run to it as soon as it finishes. Returns the rows of the new runs.
+
+    Keyword arguments:
+    grid           -- {parameter: [values]}; "seed" or any model parameter/slider (e.g. J_PROB, LEARN_RATE, sJslow)
+    out_file       -- CSV file of results (created if needed)
+    max_steps      -- step budget of each run (None: until the training is over)
+    presentations  -- presentations to train for (default TOT_TRAINING)
+    sparse         -- use the sparse synapses mode in each run
+    workers        -- no. of worker processes (default: all cores)
+
+    Raises ValueError if out_file holds the results of a sweep over other parameters.
+    """
+    settings = run_settings(max_steps, presentations, sparse)
+    fieldnames = ['run'] + list(grid) + list(settings) + metric_columns()
+    check_columns(out_file, fieldnames)
+
+    done = completed_runs(out_file, settings)
+    todo = [params for params in expand_grid(grid) if run_id(params) not in done]
+
+    logger.info(json.dumps({
+        'op': 'run_sweep',
+        'runs': len(done) + len(todo),
+        'already completed': len(done),
+        'to run': len(todo),
+    }, sort_keys=False, indent=4))
+
+    write_header = not os.path.exists(out_file) or os.path.getsize(out_file) == 0
+    rows = []
+
+    with open(out_file, 'a', newline='') as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if write_header:
+            writer.writeheader()
+            f.flush()
+
+        futures = {pool.submit(run_one, params, max_steps, presentations, sparse): params
+                   for params in todo}
+        for future in as_completed(futures):
+            params = futures[future]
+            try:
+                row = {'run': run_id(params), **params, **settings, **future.result()}
+            except Exception:
+                # not recorded: the run will be retried when the sweep is resumed
+                logger.exception(f'Run {run_id(params)} failed')
+                continue
+
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            logger.info(json.dumps({'op': 'run_sweep', 'finished': row['run'],
+                                    'remaining': len(todo) - len(rows)}, sort_keys=False, indent=4))
+
+    return rows
+
+
+def parse_param(arg: str):
+    """
+    "NAME=v1,v2,..." -> (NAME, [v1, v2, ...]), with numbers parsed as numbers
+    """
+    name, _, values = arg.partition('=')
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"Expected NAME=v1,v2,... but got '{arg}'")
+
+    def parse(value):
+        for number in (int, float):
+            try:
+                return number(value)
+            except ValueError:
+                pass
+        return value
+
+    return name, [parse(value) for value in values.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Train many StandardNet6Areas networks over a parameter grid, in parallel')
+    parser.add_argument('--param', type=parse_param, action='append', required=True,
+                        help='NAME=v1,v2,... (repeatable), e.g. seed=1,2,3 or J_PROB=.2,.28')
+    parser.add_argument('--out', required=True,
+                        help='CSV file of results (an existing one is resumed)')
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help='step budget of each run (default: until the training is over)')
+    parser.add_argument('--presentations', type=int, default=None,
+                        help='presentations to train for (default: TOT_TRAINING)')
+    parser.add_argument('--sparse', action='store_true',
+                        help='only visit existing synapses (sparse mode)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='no. of worker processes (default: all cores)')
+    args = parser.parse_args(argv)
+
+    return run_sweep(dict(args.param), args.out, max_steps=args.max_steps, presentations=args.presentations,
+                     sparse=args.sparse, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import logging
+import os
+import time
+from ..models.standardNet6Areas import StandardNet6Areas
+from ..models import util
+
+logging.basicConfig()
+logging.root.setLevel(logging.NOTSET)
+logger = logging.getLogger('train')
+logger.setLevel(logging.DEBUG)
+
+# Headless (batch) training of the model: no Flask/SocketIO, no per-step output or sleep.
+# Runs the automated training protocol (see StandardNet6Areas.manage_network_training)
+# until TOT_TRAINING presentations, or until the step budget is used up, e.g.
+#
+#   python3 -m server.simulation.train --seed 1 --max-steps 200000 --out runs/seed1
+
+CHECKPOINT_WR = "step%d.dat"
+
+
+def ca_sizes(model: StandardNet6Areas):
+    """
+    Number of cells of each emerging CA (pattern) in each area, as a P x NAREAS nested list
+    """
+    model.compute_CApatts(model.CA_THRESH)
+    ca_patts = model.ca_patts.reshape(model.P, model.NAREAS, model.N1)
+    return ca_patts.sum(axis=2).tolist()
+
+
+def ca_overlaps(model: StandardNet6Areas):
+    """
+    Overlaps between the emerging CAs in each area (call ca_sizes first), as a NAREAS x P x P nested list
+    """
+    model.compute_CAoverlaps()
+    return model.ca_ovlps.reshape(model.NAREAS, model.P, model.P).tolist()
+
+
+def run_training(seed: int = None, max_steps: int = None, presentations: int = None,
+                 checkpoint_every: int = 0, out_dir: str = None, sparse: bool = False, params: dict = None,
+                 full_every: int = 0, kernel_cache: str = None):
+    """
+    Initialises a new network and trains it, returning a summary of the run.
+
+    Keyword arguments:
+    seed              -- seed for all random numbers (None: not reproducible)
+    max_steps         -- step budget (None: run until the training is over)
+    presentations     -- presentations of pattern #1 to train for (default TOT_TRAINING)
+    checkpoint_every  -- save the network (CHECKPOINT_WR) every so many steps (0: only at the end)
+    out_dir           -- where to write checkpoints and the summary (None: nowhere)
+    sparse            -- use the sparse synapses mode (see SPARSE_SYNAPSES)
+    params            -- other model parameters or sliders to override, e.g. {'J_PROB': .2, 'sJslow': 20}
+    full_every        -- every so many checkpoints is a full snapshot, the others only hold the
+                         changed weight blocks (see FULL_SAVE_CYCLE; 0: all full)
+    kernel_cache      -- directory of cached initial kernels, to skip drawing them again for a
+                         known seed (see KERNEL_CACHE_DIR; None: no cache)
+    """
+    model = StandardNet6Areas()
+    model.seed = seed
+    if presentations is not None:
+        model.TOT_TRAINING = presentations
+    model.SPARSE_SYNAPSES = sparse
+    model.FULL_SAVE_CYCLE = full_every
+    model.KERNEL_CACHE_DIR = kernel_cache
+    for name, value in (params or {}).items():
+        if not hasattr(model, name):
+            raise AttributeError(f"Unknown model parameter '{name}'")
+        setattr(model, name, value)
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    # the network is also saved every SAVE_CYCLE presentations (NET_WR) during training
+    model.net_dir = out_dir
+
+    def checkpoint():
+        if out_dir is not None:
+            filename = os.path.join(out_dir, CHECKPOINT_WR % model.stp)
+            model.checkpoint_net(filename)
+            logger.info(json.dumps({
+                'op': 'checkpoint',
+                'step': model.stp,
+                'file': filename,
+            }, sort_keys=False, indent=4))
+
+    # no per-step logging (model.logger is shared by all the models of the process: its
+    # level is restored once the training is over)
+    level = model.logger.level
+    model.logger.setLevel(logging.WARNING)
+    try:
+        start_time = time.perf_counter()
+
+        model.main_init()
+        model.init()
+
+        # train with both the sensory and the motor patterns as input
+        model.sSInp = True
+        model.sMInp = True
+        model.strainNet = True
+
+        init_time = time.perf_counter() - start_time
+
+        while model.strainNet and (max_steps is None or model.stp < max_steps):
+            model.step(output=False)
+            if checkpoint_every and model.stp % checkpoint_every == 0:
+                checkpoint()
+
+        train_time = time.perf_counter() - start_time - init_time
+        if not checkpoint_every or model.stp % checkpoint_every != 0:
+            checkpoint()  # (unless the last step was checkpointed already)
+
+        summary = {
+            'seed': seed,
+            'params': params or {},
+            'completed': not model.strainNet,
+            'steps': model.stp,
+            'presentations': model.freq_distrib.tolist(),
+            'init time (s)': init_time,
+            'training time (s)': train_time,
+            'steps/s': model.stp / train_time if train_time > 0 else None,
+            'CA sizes': ca_sizes(model),
+            'CA overlaps': ca_overlaps(model),
+            'total LTP': util.Sum(model.tot_LTP),
+            'total LTD': util.Sum(model.tot_LTD),
+        }
+
+        if out_dir is not None:
+            with open(os.path.join(out_dir, 'summary.json'), 'w') as f:
+                json.dump(summary, f, indent=4)
+
+        return summary
+    finally:
+        model.logger.setLevel(level)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Train a StandardNet6Areas network headless (no GUI)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for all random numbers')
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help='step budget (default: until the training is over)')
+    parser.add_argument('--presentations', type=int, default=None,
+                        help='presentations to train for (default: TOT_TRAINING)')
+    parser.add_argument('--checkpoint-every', type=int, default=0,
+                        help='save the network every N steps (default: only at the end)')
+    parser.add_argument('--out', default=None,
+                        help='directory for the checkpoints and summary.json')
+    parser.add_argument('--sparse', action='store_true',
+                        help='only visit existing synapses (sparse mode)')
+    parser.add_argument('--full-every', type=int, default=0,
+                        help='every Nth checkpoint is a full snapshot, the others are incremental (default: all full)')
+    parser.add_argument('--kernel-cache', default=None,
+                        help='directory caching the initial kernels per seed (default: no cache)')
+    parser.add_argument('--patterns', type=int, default=None,
+                        help='no. of patterns to learn (default: P)')
+    parser.add_argument('--float32-averages', action='store_true',
+                        help='keep the pattern-specific average rates in single precision')
+    parser.add_argument('--max-pattern-overlap', type=int, default=None,
+                        help='max. no. of cells shared by two input patterns (default: no constraint)')
+    args = parser.parse_args(argv)
+
+    params = dict()
+    if args.patterns is not None:
+        params['P'] = args.patterns
+    if args.float32_averages:
+        params['AVG_PATTS_DTYPE'] = 'float32'
+    if args.max_pattern_overlap is not None:
+        params['MAX_PATTERN_OVERLAP'] = args.max_pattern_overlap
+
+    summary = run_training(seed=args.seed, max_steps=args.max_steps, presentations=args.presentations,
+                           checkpoint_every=args.checkpoint_every, out_dir=args.out, sparse=args.sparse,
+                           full_every=args.full_every, kernel_cache=args.kernel_cache, params=params)
+
+    logger.info(json.dumps({'op': 'summary', **summary},
+                sort_keys=False, indent=4))
+    return summary
+
+
+if __name__ == '__main__':
+    main()